@@ -0,0 +1,148 @@
+# FILE: agents/chat_history.py
+
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_openai import ChatOpenAI
+
+from agents.knowledgbase_agent.text_splitter import get_encoding, PROMPT_ENCODING
+from agents.llm_metrics import LLMMetricsCallback
+from agents.sync_runner import run_sync
+
+# ==== Load Environment ====
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# ==== History Window Config ====
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "6"))           # newest messages kept verbatim
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))        # for the verbatim window
+HISTORY_MESSAGE_MAX_TOKENS = int(os.getenv("HISTORY_MESSAGE_MAX_TOKENS", "400"))  # long replies (reports) are clipped
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "250"))
+HISTORY_SUMMARY_CACHE_SIZE = int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", "1024"))
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a patient and a health assistant.
+Fold the new messages into the existing summary. Keep the condition discussed, the patient's questions and concerns,
+and key facts from the answers; drop pleasantries and long report text. Reply with the updated summary only, under {limit} words.
+
+Existing summary:
+{summary}
+
+New messages:
+{messages}"""
+
+
+def clip_message(message: BaseMessage, max_tokens: int = HISTORY_MESSAGE_MAX_TOKENS) -> Tuple[BaseMessage, int]:
+    """The message with its content cut to `max_tokens`, and its token count after clipping."""
+    encoding = get_encoding(PROMPT_ENCODING)
+    tokens = encoding.encode(message.content)
+    if len(tokens) <= max_tokens:
+        return message, len(tokens)
+    clipped = encoding.decode(tokens[:max_tokens]) + " …[truncated]"
+    return message.__class__(content=clipped), max_tokens
+
+
+def chain_key(previous: str, message: BaseMessage) -> str:
+    """Key of a history prefix: hash of the previous prefix key plus this message."""
+    return hashlib.sha256(f"{previous}\n{message.type}\n{message.content}".encode("utf-8")).hexdigest()
+
+
+# ==== Token-Bounded History Window ====
+class HistoryWindow:
+    """
+    Keeps the newest turns verbatim under a token budget and folds everything
+    older into a rolling summary, so the prompt stays flat as a chat grows.
+
+    Summaries are cached by a hash chain over the folded messages: when one
+    more turn falls out of the window, the cached summary of the earlier prefix
+    is extended with just that turn instead of re-summarizing the whole chat.
+    """
+
+    def __init__(self, llm=None, max_messages: int = HISTORY_MAX_MESSAGES, token_budget: int = HISTORY_TOKEN_BUDGET,
+                 cache_size: int = HISTORY_SUMMARY_CACHE_SIZE):
+        self.llm = llm or ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=OPENAI_API_KEY,
+                                     max_tokens=HISTORY_SUMMARY_MAX_TOKENS,
+                                     callbacks=[LLMMetricsCallback("knowledge.history_summary")])
+        self.max_messages = max_messages
+        self.token_budget = token_budget
+        self.cache_size = cache_size
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def split(self, messages: List[BaseMessage]) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+        """(older messages to fold, newest messages kept verbatim, clipped)."""
+        recent, used = [], 0
+        for idx in range(len(messages) - 1, -1, -1):
+            if len(recent) >= self.max_messages:
+                return messages[:idx + 1], recent
+            clipped, tokens = clip_message(messages[idx])
+            if recent and used + tokens > self.token_budget:
+                return messages[:idx + 1], recent
+            recent.insert(0, clipped)
+            used += tokens
+        return [], recent
+
+    # ---- Summary cache ----
+    def _cached(self, key: str) -> Optional[str]:
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is not None:
+                self._summaries.move_to_end(key)
+            return summary
+
+    def _store(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._summaries[key] = summary
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+
+    async def summarize(self, older: List[BaseMessage]) -> str:
+        keys, key = [], ""
+        for message in older:
+            key = chain_key(key, message)
+            keys.append(key)
+
+        # Longest already-summarized prefix; only the messages after it are folded in
+        summary, start = "", 0
+        for idx in range(len(keys) - 1, -1, -1):
+            cached = self._cached(keys[idx])
+            if cached is not None:
+                summary, start = cached, idx + 1
+                break
+        if start == len(older):
+            return summary
+
+        new_messages = "\n".join(
+            f"{'Patient' if m.type == 'human' else 'Assistant'}: {clip_message(m)[0].content}" for m in older[start:]
+        )
+        response = await self.llm.ainvoke(SUMMARY_PROMPT.format(
+            limit=int(HISTORY_SUMMARY_MAX_TOKENS * 0.7), summary=summary or "(none)", messages=new_messages
+        ))
+        summary = response.content.strip() if response else summary
+        self._store(keys[-1], summary)
+        print(f"🧾 Folded {len(older) - start} messages into the rolling summary ({len(older)} summarized in total)")
+        return summary
+
+    async def abuild(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Chat history to put in the prompt: [summary of older turns] + newest turns verbatim."""
+        older, recent = self.split(messages)
+        if not older:
+            return recent
+        try:
+            summary = await self.summarize(older)
+        except Exception as e:
+            print(f"⚠️ History summary failed, dropping {len(older)} older messages: {str(e)}")
+            return recent
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + recent
+
+    def build(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Blocking wrapper around `abuild` for scripts and notebooks."""
+        return run_sync(self.abuild(messages))
@@ -0,0 +1,224 @@
+# FILE: agents/intent_router.py
+
+import os
+import re
+import time
+import asyncio
+import threading
+import statistics
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from agents.knowledgbase_agent.bm25_index import tokenize
+
+# ==== Load Environment ====
+load_dotenv()
+
+# ==== Router Config ====
+# "fast": keyword rules, then nearest centroid, then the LLM oracle for what is left
+# "oracle": every message goes to the LLM oracle
+ROUTER_MODE = os.getenv("ROUTER_MODE", "fast")
+ROUTER_MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", "0.35"))
+ROUTER_MARGIN = float(os.getenv("ROUTER_MARGIN", "0.06"))  # best centroid must beat the runner-up by this much
+LATENCY_WINDOW = 1000
+
+# A summary request asks for the report on the whole condition: besides the words
+# below, it may only name the condition. "Summarize the potassium limits" names a
+# topic, so it is left to the question rules, the centroids or the oracle.
+SUMMARY_KEYWORDS = re.compile(r"\b(summar(y|ies|ise|ize)|report|overview|everything)\b", re.IGNORECASE)
+SUMMARY_FILLER = frozenset(
+    "please can could would you me i i'd id want like give show generate create write make tell get "
+    "a an the my this that of on about for full complete overall whole entire everything "
+    "summary summarise summarize report overview condition disease illness diagnosis it".split()
+)
+QUESTION_RULES = [
+    re.compile(r"\?\s*$"),
+    re.compile(r"^\s*(what|which|how|why|when|where|who|can|could|should|is|are|does|do|will|would|may|must)\b", re.IGNORECASE),
+]
+
+# With chat history, a message only takes the fast path when it stands alone;
+# follow-ups ("and for stage 3?", "is it safe?") go to the oracle, which sees the history
+FOLLOW_UP_RULES = [
+    re.compile(r"^\W*(and|also|but|so|then|or|what about|how about|same|instead)\b", re.IGNORECASE),
+    re.compile(r"\b(it|its|they|them|their|those|these)\b", re.IGNORECASE),
+]
+STANDALONE_MIN_TERMS = 3
+CONDITION_ALIASES = {
+    "CKD": ["kidney", "renal"],
+    "Type2": ["diabetes", "diabetic"],
+    "Hypertension": ["blood pressure"],
+    "Gluten": ["celiac", "coeliac"],
+    "Polycystic": ["pcos", "pcod"],
+}
+CONDITION_REFERENCE = re.compile(r"\b(this|that|my|the)\s+(condition|disease|illness|diagnosis)\b", re.IGNORECASE)
+
+
+def condition_terms(condition: Optional[str]) -> List[str]:
+    """Lowercased names a message may use for the selected condition."""
+    if not condition:
+        return []
+    return [condition.lower()] + CONDITION_ALIASES.get(condition, [])
+
+
+def is_summary_request(text: str, condition: Optional[str] = None) -> bool:
+    if not SUMMARY_KEYWORDS.search(text):
+        return False
+    allowed = SUMMARY_FILLER | {word for term in condition_terms(condition) for word in term.split()}
+    words = re.findall(r"[a-z0-9']+", text.lower().replace("\u2019", "'"))
+    return bool(words) and all(word in allowed for word in words)
+
+
+def names_condition(text: str, condition: Optional[str]) -> bool:
+    lowered = text.lower()
+    if CONDITION_REFERENCE.search(lowered):
+        return True
+    return any(re.search(rf"\b{re.escape(term)}\b", lowered) for term in condition_terms(condition))
+
+
+def is_standalone(text: str, condition: Optional[str] = None) -> bool:
+    """Whether the message can be routed and searched without the chat history."""
+    if names_condition(text, condition):
+        return True
+    if any(rule.search(text) for rule in FOLLOW_UP_RULES):
+        return False
+    return len(tokenize(text)) >= STANDALONE_MIN_TERMS
+
+# Exemplars whose embeddings (through the embedding cache) form each tool's centroid
+EXEMPLARS = {
+    "generate_summary": [
+        "generate report",
+        "give me a full summary of my condition",
+        "overview of this disease",
+        "tell me everything about this condition",
+        "explain the condition from start to finish",
+        "I want the complete report",
+    ],
+    "vector_search": [
+        "what are the symptoms",
+        "which foods should I avoid",
+        "how much protein can I eat per day",
+        "is coffee bad for blood pressure",
+        "side effects of metformin",
+        "tell me about potassium limits",
+        "foods that lower cholesterol",
+    ],
+}
+
+
+# ==== Intent Router ====
+class IntentRouter:
+    """
+    Deterministic fast path in front of the LLM oracle for the knowledge orchestrator.
+
+    Keyword rules decide the obvious cases (a report on the whole condition,
+    direct questions); otherwise the message embedding is matched to the
+    nearest tool centroid. Returns None when both are ambiguous, or when a
+    follow-up needs the chat history, so the caller can ask the oracle.
+    Decisions and latencies are counted per path.
+    """
+
+    def __init__(self, embeddings, exemplars: Dict[str, List[str]] = None,
+                 min_similarity: float = ROUTER_MIN_SIMILARITY, margin: float = ROUTER_MARGIN):
+        self.embeddings = embeddings
+        self.exemplars = exemplars or EXEMPLARS
+        self.min_similarity = min_similarity
+        self.margin = margin
+
+        self._centroids: Optional[Dict[str, np.ndarray]] = None
+        self._centroid_lock = asyncio.Lock()
+        self._stats_lock = threading.Lock()
+        self._counts = {"rule": 0, "centroid": 0, "oracle": 0}
+        self._latencies = {path: deque(maxlen=LATENCY_WINDOW) for path in self._counts}
+
+    # ---- Rules ----
+    @staticmethod
+    def match_rules(text: str, condition: Optional[str] = None) -> Optional[str]:
+        if is_summary_request(text, condition):
+            return "generate_summary"
+        if any(rule.search(text) for rule in QUESTION_RULES):
+            return "vector_search"
+        return None
+
+    # ---- Centroids ----
+    async def _get_centroids(self) -> Dict[str, np.ndarray]:
+        if self._centroids is None:
+            async with self._centroid_lock:
+                if self._centroids is None:
+                    centroids = {}
+                    for tool_name, phrases in self.exemplars.items():
+                        vectors = await asyncio.gather(*(self.embeddings.aembed_query(p) for p in phrases))
+                        matrix = np.asarray(vectors, dtype=np.float32)
+                        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+                        centroid = matrix.mean(axis=0)
+                        centroids[tool_name] = centroid / np.linalg.norm(centroid)
+                    self._centroids = centroids
+                    print(f"🎯 Router centroids ready for {list(centroids)}")
+        return self._centroids
+
+    async def match_centroid(self, text: str) -> Tuple[Optional[str], Dict[str, float]]:
+        centroids = await self._get_centroids()
+        query = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        scores = {tool_name: float(centroid @ query) for tool_name, centroid in centroids.items()}
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        if best_score >= self.min_similarity and best_score - runner_up >= self.margin:
+            return best, scores
+        return None, scores
+
+    # ---- Routing ----
+    async def route(self, text: str, condition: Optional[str] = None,
+                    has_history: bool = False) -> Optional[Tuple[str, str]]:
+        """(tool_name, path) decided on the fast path, or None when the oracle should decide."""
+        start = time.perf_counter()
+        if is_summary_request(text, condition):
+            self.record("rule", time.perf_counter() - start)
+            return "generate_summary", "rule"
+
+        if has_history and not is_standalone(text, condition):
+            print("↩️ Router: message looks like a follow-up, asking oracle with the chat history")
+            return None
+
+        tool_name = self.match_rules(text, condition)
+        if tool_name:
+            self.record("rule", time.perf_counter() - start)
+            return tool_name, "rule"
+
+        try:
+            tool_name, scores = await self.match_centroid(text)
+        except Exception as e:
+            print(f"⚠️ Router centroid match failed, deferring to oracle: {str(e)}")
+            return None
+        if tool_name:
+            self.record("centroid", time.perf_counter() - start)
+            return tool_name, "centroid"
+
+        print(f"🤔 Router undecided (scores={ {k: round(v, 3) for k, v in scores.items()} }), asking oracle")
+        return None
+
+    # ---- Stats ----
+    def record(self, path: str, seconds: float) -> None:
+        with self._stats_lock:
+            self._counts[path] += 1
+            self._latencies[path].append(seconds * 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            total = sum(self._counts.values())
+            fast = self._counts["rule"] + self._counts["centroid"]
+            all_latencies = [ms for samples in self._latencies.values() for ms in samples]
+            return {
+                "mode": ROUTER_MODE,
+                "decisions": dict(self._counts),
+                "fast_path_ratio": round(fast / total, 4) if total else 0.0,
+                "p50_ms": {
+                    path: round(statistics.median(samples), 2) if samples else None
+                    for path, samples in self._latencies.items()
+                },
+                "p50_ms_overall": round(statistics.median(all_latencies), 2) if all_latencies else None,
+            }
@@ -0,0 +1,150 @@
+# FILE: agents/knowledgbase_agent/bm25_index.py
+
+import os
+import re
+import json
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from agents.knowledgbase_agent.embedding_cache import KB_DATA_DIR
+
+# ==== Load Environment ====
+load_dotenv()
+
+# ==== BM25 Config ====
+BM25_INDEX_DIR = os.getenv("BM25_INDEX_DIR", os.path.join(KB_DATA_DIR, "bm25"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its of on or should "
+    "that the their there these this to was what when which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric terms, so "HbA1c", "eGFR" and "metformin" stay single exact terms."""
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+def bm25_path(condition: str, directory: str = BM25_INDEX_DIR) -> str:
+    return os.path.join(directory, f"{condition}.json")
+
+
+# ==== Index Build ====
+def build_bm25_index(condition: str, ids: List[str], metadatas: List[Dict[str, Any]],
+                     directory: str = BM25_INDEX_DIR, texts: Optional[Dict[str, str]] = None) -> int:
+    """
+    Build the inverted index for one condition and save it. Chunk texts come from
+    `texts` (chunk id → text) or `metadata["text"]`; only the postings are kept,
+    texts are hydrated from the chunk store at query time.
+    """
+    texts = texts or {}
+    postings: Dict[str, List[List[int]]] = defaultdict(list)
+    lengths = []
+    for doc_idx, (chunk_id, metadata) in enumerate(zip(ids, metadatas)):
+        terms = tokenize(texts.get(chunk_id) or metadata.get("text", ""))
+        lengths.append(len(terms))
+        for term, tf in Counter(terms).items():
+            postings[term].append([doc_idx, tf])
+
+    os.makedirs(directory, exist_ok=True)
+    path = bm25_path(condition, directory)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"condition": condition, "ids": ids,
+                   "metadata": [{k: v for k, v in metadata.items() if k != "text"} for metadata in metadatas],
+                   "lengths": lengths, "postings": postings}, f)
+    os.replace(path + ".tmp", path)
+    print(f"📇 Built BM25 index for {condition}: {len(ids)} chunks, {len(postings)} terms")
+    return len(ids)
+
+
+# ==== BM25 Search ====
+class _Bm25Snapshot:
+    def __init__(self, data: Dict[str, Any], mtime: float):
+        self.ids = data["ids"]
+        self.metadatas = data["metadata"]
+        self.lengths = data["lengths"]
+        self.postings = data["postings"]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        self.mtime = mtime
+
+
+class BM25Index:
+    """
+    Per-condition Okapi BM25 over chunk texts, loaded from disk on first use and
+    reloaded when the file changes. Results use Pinecone's match shape.
+    """
+
+    def __init__(self, directory: str = BM25_INDEX_DIR):
+        self.directory = directory
+        self._snapshots: Dict[str, _Bm25Snapshot] = {}
+        self._lock = threading.Lock()
+
+    def _snapshot(self, condition: str) -> Optional[_Bm25Snapshot]:
+        path = bm25_path(condition, self.directory)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        with self._lock:
+            snapshot = self._snapshots.get(condition)
+            if snapshot is None or snapshot.mtime != mtime:
+                with open(path, encoding="utf-8") as f:
+                    snapshot = _Bm25Snapshot(json.load(f), mtime)
+                self._snapshots[condition] = snapshot
+            return snapshot
+
+    def query(self, text: str, condition: str, top_k: int = 15) -> Optional[List[Dict[str, Any]]]:
+        """Top-k lexical matches for one condition, or None when it has no BM25 index."""
+        snapshot = self._snapshot(condition)
+        if snapshot is None:
+            return None
+
+        n_docs = len(snapshot.ids)
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(text)):
+            postings = snapshot.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_idx, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * snapshot.lengths[doc_idx] / (snapshot.avg_length or 1))
+                scores[doc_idx] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [
+            {"id": snapshot.ids[doc_idx], "score": score, "metadata": snapshot.metadatas[doc_idx]}
+            for doc_idx, score in ranked
+        ]
+
+
+# ==== Rank Fusion ====
+def as_match(match) -> Dict[str, Any]:
+    """
+    A match as a plain {"id", "score", "metadata"} dict. Pinecone returns
+    ScoredVector objects, which support `match["id"]` but cannot be unpacked
+    or copied like dicts.
+    """
+    return {"id": match["id"], "score": match.get("score"), "metadata": dict(match.get("metadata") or {})}
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], top_k: int, k: int = RRF_K) -> List[Dict[str, Any]]:
+    """Merge ranked match lists by summing 1 / (k + rank) per chunk id."""
+    fused: Dict[str, float] = defaultdict(float)
+    matches: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, match in enumerate(results, 1):
+            fused[match["id"]] += 1.0 / (k + rank)
+            if match["id"] not in matches:
+                matches[match["id"]] = as_match(match)
+
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return [{**matches[chunk_id], "score": score} for chunk_id, score in ranked]
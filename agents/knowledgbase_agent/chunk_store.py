@@ -0,0 +1,160 @@
+# FILE: agents/knowledgbase_agent/chunk_store.py
+
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from agents.knowledgbase_agent.embedding_cache import KB_DATA_DIR
+
+# ==== Load Environment ====
+load_dotenv()
+
+# ==== Chunk Store Config ====
+CHUNK_STORE_PATH = os.getenv("CHUNK_STORE_PATH", os.path.join(KB_DATA_DIR, "chunks.sqlite3"))
+SQLITE_MAX_VARIABLES = 900  # stay under SQLite's bound-parameter limit per IN (...) query
+
+
+# ==== Local Chunk Text Store ====
+class ChunkStore:
+    """
+    Chunk bodies keyed by chunk id, kept on local disk so Pinecone can carry
+    only ids and small filter fields. Vector search returns ids; `hydrate`
+    fills `metadata["text"]` back in for the handful of matches actually used.
+
+    The store is local to the host that ran ingestion (or the snapshot
+    export). Other hosts fall back to the text in Pinecone metadata and
+    cache what they fetch here.
+    """
+
+    def __init__(self, path: str = CHUNK_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._stats = {"store_hits": 0, "fallback_hits": 0, "missing": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "id TEXT PRIMARY KEY, condition TEXT NOT NULL, source_file TEXT, "
+                "token_count INTEGER, text TEXT NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+            print(f"🗄️ Chunk store opened at {self.path}")
+        return self._db
+
+    def put_many(self, records: Iterable[Tuple[str, str, Dict[str, Any]]]) -> int:
+        """Insert or replace (chunk_id, text, metadata) records. Raises on failure: this is the source of truth."""
+        rows = [
+            (chunk_id, metadata.get("condition", ""), metadata.get("source_file"), metadata.get("token_count"), text)
+            for chunk_id, text, metadata in records
+        ]
+        with self._lock:
+            db = self._connect()
+            db.executemany(
+                "INSERT OR REPLACE INTO chunks (id, condition, source_file, token_count, text) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            db.commit()
+        return len(rows)
+
+    def delete_many(self, chunk_ids: Iterable[str]) -> None:
+        chunk_ids = list(chunk_ids)
+        with self._lock:
+            db = self._connect()
+            for start in range(0, len(chunk_ids), SQLITE_MAX_VARIABLES):
+                batch = chunk_ids[start:start + SQLITE_MAX_VARIABLES]
+                db.execute(f"DELETE FROM chunks WHERE id IN ({','.join('?' * len(batch))})", batch)
+            db.commit()
+
+    def get_many(self, chunk_ids: List[str]) -> Dict[str, Tuple[str, Optional[int]]]:
+        """chunk_id → (text, token_count) for the ids present in the store."""
+        found = {}
+        with self._lock:
+            db = self._connect()
+            for start in range(0, len(chunk_ids), SQLITE_MAX_VARIABLES):
+                batch = chunk_ids[start:start + SQLITE_MAX_VARIABLES]
+                rows = db.execute(
+                    f"SELECT id, text, token_count FROM chunks WHERE id IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update({chunk_id: (text, token_count) for chunk_id, text, token_count in rows})
+        return found
+
+    def hydrate(self, matches: List[Dict[str, Any]],
+                 fallback: Optional[Callable[[List[str]], Dict[str, Tuple[str, Dict[str, Any]]]]] = None
+                 ) -> List[Dict[str, Any]]:
+        """
+        Fill `metadata["text"]` (and a missing `token_count`) from the store for
+        matches that came back without it. Matches whose text is still in the
+        index metadata are left untouched.
+
+        Ids missing from the store are looked up with `fallback` (chunk ids →
+        {id: (text, metadata)}, e.g. Pinecone metadata) and cached. Ids with no
+        text anywhere are logged, counted and dropped rather than answered
+        from an empty context.
+        """
+        missing = [match["id"] for match in matches if not (match.get("metadata") or {}).get("text")]
+        if not missing:
+            return matches
+
+        try:
+            found = self.get_many(missing)
+        except sqlite3.Error as e:
+            print(f"⚠️ Chunk store read failed: {e}")
+            found = {}
+        self._stats["store_hits"] += len(found)
+
+        unresolved = [chunk_id for chunk_id in missing if chunk_id not in found]
+        if unresolved and fallback is not None:
+            try:
+                fetched = fallback(unresolved)
+            except Exception as e:
+                print(f"⚠️ Chunk text fallback failed: {e}")
+                fetched = {}
+            fetched = {chunk_id: (text, metadata) for chunk_id, (text, metadata) in fetched.items() if text}
+            if fetched:
+                found.update({chunk_id: (text, metadata.get("token_count")) for chunk_id, (text, metadata) in fetched.items()})
+                self._stats["fallback_hits"] += len(fetched)
+                try:
+                    self.put_many((chunk_id, text, metadata) for chunk_id, (text, metadata) in fetched.items())
+                except sqlite3.Error as e:
+                    print(f"⚠️ Could not cache fallback chunk texts: {e}")
+            unresolved = [chunk_id for chunk_id in unresolved if chunk_id not in found]
+
+        if unresolved:
+            self._stats["missing"] += len(unresolved)
+            print(f"❌ No text for {len(unresolved)} retrieved chunks (not in {self.path} or the index metadata); "
+                  f"dropping them: {unresolved[:5]}")
+
+        hydrated = []
+        for match in matches:
+            metadata = dict(match.get("metadata") or {})
+            if metadata.get("text"):
+                hydrated.append(match)
+                continue
+            if match["id"] not in found:
+                continue
+            text, token_count = found[match["id"]]
+            metadata["text"] = text
+            if token_count is not None:
+                metadata.setdefault("token_count", token_count)
+            # Plain dicts: Pinecone's ScoredVector objects are not meant to be mutated or unpacked
+            hydrated.append({"id": match["id"], "score": match.get("score"), "metadata": metadata})
+        return hydrated
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    def count(self, condition: str = None) -> int:
+        with self._lock:
+            db = self._connect()
+            if condition:
+                return db.execute("SELECT COUNT(*) FROM chunks WHERE condition = ?", (condition,)).fetchone()[0]
+            return db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
@@ -1,10 +1,20 @@
 # FILE: agents/knowledgebase_agent/chunking.py
 
 import os
+import json
+import time
+import random
+import hashlib
 import openai
 import boto3
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pinecone import Pinecone
 from dotenv import load_dotenv
+from agents.knowledgbase_agent.corpus_version import bump_corpus_version
+from agents.knowledgbase_agent.text_splitter import stream_chunks, count_tokens, prompt_token_count
+from agents.knowledgbase_agent.md_normalizer import normalize_markdown
+from agents.knowledgbase_agent.local_index import rebuild_local_indexes, chunk_store
+from agents.llm_metrics import track_llm_call
 
 # ==== Load environment variables ====
 load_dotenv()
@@ -19,6 +29,23 @@ AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 
 openai.api_key = OPENAI_API_KEY
 
+# ==== Ingestion Throughput Config ====
+EMBED_MODEL = "text-embedding-3-small"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))      # chunks per embeddings request
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))      # embeddings requests in flight
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))    # vectors per Pinecone upsert
+UPSERT_CONCURRENCY = int(os.getenv("UPSERT_CONCURRENCY", "4"))    # upserts in flight
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "300"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+DELETE_BATCH_SIZE = 1000                                          # Pinecone limit per delete
+MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", "5"))
+# Also chunk the raw (un-normalized) markdown to report chunk/token savings; doubles chunking cost
+NORMALIZATION_REPORT = os.getenv("NORMALIZATION_REPORT", "false").lower() == "true"
+# Chunk bodies are always written to the local chunk store, which serves every query (Pinecone is
+# queried for ids only). A copy also goes into Pinecone metadata, fetched by id only for chunks a
+# host's store is missing; set to "false" only when every serving host has a copy of the chunk store
+CHUNK_TEXT_IN_PINECONE = os.getenv("CHUNK_TEXT_IN_PINECONE", "true").lower() == "true"
+
 # ==== AWS S3 Client ====
 s3 = boto3.client(
     "s3",
@@ -32,41 +59,6 @@ pc = Pinecone(api_key=PINECONE_API_KEY)
 index = pc.Index(INDEX_NAME)
 
 
-# ==== Count tokens (simple fallback, not tiktoken) ====
-def token_count(text: str) -> int:
-    return len(text.split())
-
-
-# ==== Recursive Text Splitter ====
-def recursive_split(text, max_tokens=300):
-    print(f"🪓 Splitting large text block...")
-
-    if token_count(text) <= max_tokens:
-        return [text]
-
-    for splitter in ["\n\n", "\n", ". "]:
-        parts = text.split(splitter)
-        if len(parts) == 1:
-            continue
-
-        chunks, current = [], ""
-        for part in parts:
-            candidate = (current + splitter + part).strip() if current else part.strip()
-            if token_count(candidate) <= max_tokens:
-                current = candidate
-            else:
-                if current:
-                    chunks.extend(recursive_split(current, max_tokens))
-                current = part.strip()
-
-        if current:
-            chunks.extend(recursive_split(current, max_tokens))
-
-        return chunks
-
-    return [text]
-
-
 # ==== Load Markdown from S3 ====
 def load_md_from_s3(condition: str, file_name: str) -> str:
     key = f"Markdown_Conversions/{condition}/{file_name}.md"
@@ -79,51 +71,226 @@ def load_md_from_s3(condition: str, file_name: str) -> str:
         return ""
 
 
-# ==== Get OpenAI Embedding ====
-def get_embedding(text: str) -> list:
-    try:
+# ==== Get OpenAI Embeddings (batched) ====
+def get_embeddings(texts: list) -> list:
+    """Embed a batch of texts in one request; vectors come back in input order."""
+    with track_llm_call("ingest.embeddings", EMBED_MODEL, kind="embedding") as usage:
         response = openai.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
+            model=EMBED_MODEL,
+            input=texts
         )
-        return response.data[0].embedding
-    except Exception as e:
-        print("❌ Error embedding text:", e)
-        return []
+        usage.from_openai(response)
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+# ==== Retry on Transient Failures ====
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError,
+                          openai.APITimeoutError, openai.InternalServerError)):
+        return True
+    # Pinecone API errors carry the HTTP status
+    return getattr(error, "status", None) in (429, 500, 502, 503, 504)
+
+
+def with_retry(fn, *args, what: str = "request", **kwargs):
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == MAX_RETRIES or not is_transient(e):
+                raise
+            delay = min(30, 2 ** attempt) * (0.5 + random.random() / 2)
+            print(f"🔁 {what} failed ({e}); retry {attempt}/{MAX_RETRIES - 1} in {delay:.1f}s")
+            time.sleep(delay)
 
 
 # ==== Upload to Pinecone ====
-def upload_chunks_to_pinecone(chunks, condition, file_name):
-    batch = []
-    source_path = f"{condition}/{file_name}.md"
+def embed_batch(batch: list) -> list:
+    """Embed one batch of (chunk_id, text, metadata) records → Pinecone vectors."""
+    embeddings = with_retry(get_embeddings, [text for _, text, _ in batch], what=f"Embedding batch of {len(batch)}")
+    return [(chunk_id, embedding, metadata) for (chunk_id, _, metadata), embedding in zip(batch, embeddings)]
+
+
+def upsert_batch(vectors: list) -> list:
+    with_retry(index.upsert, vectors=vectors, what=f"Upsert of {len(vectors)}")
+    return [chunk_id for chunk_id, _, _ in vectors]
+
+
+# ==== Content-Addressed Chunk Records ====
+def chunk_id_for(condition: str, file_name: str, text: str) -> str:
+    """Stable ID from the chunk's content (and source file), independent of its position."""
+    digest = hashlib.sha256(f"{file_name}\n{text}".encode("utf-8")).hexdigest()[:32]
+    return f"{condition}_{digest}"
 
-    print(f"🚀 Uploading chunks to Pinecone for {source_path}...")
 
+def build_chunk_records(chunks, condition, file_name) -> dict:
+    """Map chunk_id → (chunk_id, text, metadata); identical chunks within a file collapse to one record."""
+    source_path = f"{condition}/{file_name}.md"
+    records = {}
     for idx, chunk in enumerate(chunks):
-        chunk_id = f"{condition}_{file_name}_{idx}"
-        embedding = get_embedding(chunk)
-        if not embedding:
-            print(f"⚠️ Skipped chunk {idx} due to empty embedding.")
+        if not chunk.strip():
+            print(f"⚠️ Skipped chunk {idx}: empty text.")
+            continue
+        chunk_id = chunk_id_for(condition, file_name, chunk)
+        if chunk_id in records:
             continue
-
         metadata = {
             "condition": condition,
             "source_file": source_path,
             "chunk_index": idx,
-            "text": chunk
+            "token_count": prompt_token_count(chunk),
         }
+        if CHUNK_TEXT_IN_PINECONE:
+            metadata["text"] = chunk
+        records[chunk_id] = (chunk_id, chunk, metadata)
+    return records
+
+
+# ==== Per-File Chunk Manifest (S3) ====
+def manifest_key(condition: str, file_name: str) -> str:
+    return f"Chunk_Manifests/{condition}/{file_name}.json"
+
+
+def load_manifest(condition: str, file_name: str):
+    """
+    Chunk IDs indexed for this file on the previous run, or None if there is no
+    usable manifest (never indexed, unreadable or corrupt). None means a full
+    re-index of the file, which is always safe.
+    """
+    key = manifest_key(condition, file_name)
+    try:
+        response = s3.get_object(Bucket=AWS_BUCKET, Key=key)
+        return set(json.loads(response["Body"].read().decode("utf-8"))["chunk_ids"])
+    except s3.exceptions.NoSuchKey:
+        return None
+    except s3.exceptions.ClientError as e:
+        print(f"⚠️ Could not read manifest {key} ({e}); re-indexing {condition}/{file_name} in full")
+    except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError) as e:
+        print(f"⚠️ Manifest {key} is malformed ({e!r}); re-indexing {condition}/{file_name} in full")
+    return None
+
+
+def save_manifest(condition: str, file_name: str, chunk_ids: set):
+    body = json.dumps({"source_file": f"{condition}/{file_name}.md", "chunk_ids": sorted(chunk_ids)})
+    s3.put_object(Bucket=AWS_BUCKET, Key=manifest_key(condition, file_name), Body=body.encode("utf-8"),
+                  ContentType="application/json")
+    print(f"🧾 Saved manifest with {len(chunk_ids)} chunk IDs for {condition}/{file_name}")
+
 
-        print(f"📦 Prepared chunk: {chunk_id} with metadata: {metadata}")
-        batch.append((chunk_id, embedding, metadata))
+def delete_vectors(chunk_ids) -> int:
+    chunk_ids = sorted(chunk_ids)
+    for i in range(0, len(chunk_ids), DELETE_BATCH_SIZE):
+        with_retry(index.delete, ids=chunk_ids[i:i + DELETE_BATCH_SIZE], what="Delete")
+    return len(chunk_ids)
 
-        if len(batch) >= 20:
-            print(f"🔼 Upserting batch of {len(batch)}...")
-            index.upsert(vectors=batch)
-            batch.clear()
 
-    if batch:
-        print(f"🔼 Final upsert of {len(batch)} chunks...")
-        index.upsert(vectors=batch)
+def legacy_chunk_ids(condition: str, file_name: str, keep: set) -> set:
+    """Position-based IDs (`{condition}_{file_name}_{idx}`) left over from before content-addressed IDs."""
+    prefix = f"{condition}_{file_name}_"
+    return {vid for page in index.list(prefix=prefix) for vid in page
+            if vid not in keep and vid[len(prefix):].isdigit()}
+
+
+# ==== Upload to Pinecone ====
+def upload_chunks_to_pinecone(records, source_path) -> set:
+    """
+    Embed chunk records in large batches with up to EMBED_CONCURRENCY requests in flight,
+    and upsert each embedded batch, split into UPSERT_BATCH_SIZE parts, as soon as it is
+    ready. Before each new embedding request at most 2 x UPSERT_CONCURRENCY upsert parts
+    are queued or in flight, so embedded-but-not-upserted vectors stay under
+    2 x UPSERT_CONCURRENCY x UPSERT_BATCH_SIZE plus the EMBED_CONCURRENCY batches being embedded.
+    Returns the IDs that were upserted.
+    """
+    print(f"🚀 Uploading {len(records)} chunks to Pinecone for {source_path}...")
+
+    batches = [records[i:i + EMBED_BATCH_SIZE] for i in range(0, len(records), EMBED_BATCH_SIZE)]
+    start = time.perf_counter()
+    uploaded, failed = set(), 0
+
+    with ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY) as embed_pool, \
+         ThreadPoolExecutor(max_workers=UPSERT_CONCURRENCY) as upsert_pool:
+        embedding, upserting = {}, {}
+
+        def drain(futures: dict, block_until: int):
+            # Wait until at most `block_until` futures are still running; returns finished (future, batch) pairs
+            finished = []
+            while len(futures) > block_until:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                finished.extend((future, futures.pop(future)) for future in done)
+            return finished
+
+        def collect_embeddings(block_until: int):
+            nonlocal failed
+            for future, batch in drain(embedding, block_until):
+                try:
+                    vectors = future.result()
+                except Exception as e:
+                    failed += len(batch)
+                    print(f"❌ Embedding failed for {len(batch)} chunks: {e}")
+                    continue
+                for i in range(0, len(vectors), UPSERT_BATCH_SIZE):
+                    part = vectors[i:i + UPSERT_BATCH_SIZE]
+                    upserting[upsert_pool.submit(upsert_batch, part)] = part
+
+        def collect_upserts(block_until: int):
+            nonlocal uploaded, failed
+            for future, part in drain(upserting, block_until):
+                try:
+                    uploaded.update(future.result())
+                except Exception as e:
+                    failed += len(part)
+                    print(f"❌ Upsert failed for {len(part)} chunks: {e}")
+
+        for batch in batches:
+            # Backpressure: cap both stages before submitting more embedding work.
+            # `upserting` holds upsert parts, not embedding batches, so its cap is in parts.
+            collect_embeddings(block_until=EMBED_CONCURRENCY - 1)
+            collect_upserts(block_until=2 * UPSERT_CONCURRENCY)
+            embedding[embed_pool.submit(embed_batch, batch)] = batch
+
+        collect_embeddings(block_until=0)
+        collect_upserts(block_until=0)
+
+    elapsed = time.perf_counter() - start
+    rate = len(uploaded) / elapsed if elapsed else 0.0
+    print(f"⏱️ Upserted {len(uploaded)} chunks ({failed} failed) in {elapsed:.1f}s → {rate:.1f} chunks/sec")
+    return uploaded
+
+
+# ==== Normalization Report ====
+def report_normalization(file_name: str, report: dict, raw_markdown: str, chunk_stats: dict):
+    print(f"🧽 Normalized {file_name}: removed {report['repeated_lines']} repeated lines, "
+          f"{report['page_numbers']} page numbers, {report['image_links']} image links, "
+          f"{report['low_value_sections']} low-value sections ({report['low_value_lines']} lines)")
+    if report["page_source"] == "none":
+        print(f"⚠️ {file_name} has no page markers and no running header/footer to split pages on; header, "
+              f"footer and page-number removal skipped. Re-run mistral_ai.py on it to add page markers.")
+    elif report["page_source"] == "inferred":
+        print(f"📄 {file_name}: no page markers, {report['pages']} pages inferred from its running header/footer")
+    if not NORMALIZATION_REPORT:
+        return
+
+    # Raw chunks are streamed and only counted, never held
+    raw_count = raw_tokens = 0
+    for chunk in stream_chunks(raw_markdown, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+        raw_count += 1
+        raw_tokens += count_tokens(chunk)
+
+    def drop(before, after):
+        return f"{(before - after) / before:.0%}" if before else "0%"
+
+    count, tokens = chunk_stats["chunks"], chunk_stats["tokens"]
+    print(f"📉 Chunks {raw_count} → {count} (-{drop(raw_count, count)}), "
+          f"embedding tokens {raw_tokens} → {tokens} (-{drop(raw_tokens, tokens)})")
+
+
+def counted(chunks, chunk_stats: dict):
+    """Pass chunks through while counting them (and their embedding tokens when reporting)."""
+    for chunk in chunks:
+        chunk_stats["chunks"] += 1
+        if NORMALIZATION_REPORT:
+            chunk_stats["tokens"] += count_tokens(chunk)
+        yield chunk
 
 
 # ==== Full Pipeline ====
@@ -135,9 +302,46 @@ def process_file(condition: str, file_name: str):
         print(f"⚠️ Skipped {file_name} due to missing content.")
         return
 
-    chunks = recursive_split(markdown)
-    print(f"🧱 Total chunks created: {len(chunks)}")
-    upload_chunks_to_pinecone(chunks, condition, file_name)
+    normalized, report = normalize_markdown(markdown)
+    chunk_stats = {"chunks": 0, "tokens": 0}
+    # One pass over the chunk stream: records are built as chunks are produced
+    chunks = stream_chunks(normalized, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS)
+    records = build_chunk_records(counted(chunks, chunk_stats), condition, file_name)
+    report_normalization(file_name, report, markdown, chunk_stats)
+    print(f"🧱 Total chunks created: {chunk_stats['chunks']}")
+
+    # Only chunks whose content is new get embedded; chunks no longer present get deleted
+    previous = load_manifest(condition, file_name)
+    indexed = previous or set()
+    current = set(records)
+    new_ids = current - indexed
+    stale_ids = indexed - current
+    print(f"🧮 {len(current)} unique chunks: {len(new_ids)} new, {len(current & indexed)} unchanged, {len(stale_ids)} stale")
+
+    # Texts go to the local store first (every current chunk, so older ones are backfilled too)
+    chunk_store.put_many(records.values())
+
+    uploaded = set()
+    if new_ids:
+        uploaded = upload_chunks_to_pinecone([records[cid] for cid in sorted(new_ids)], f"{condition}/{file_name}.md")
+
+    if previous is None:
+        stale_ids |= legacy_chunk_ids(condition, file_name, keep=current)
+    if stale_ids:
+        print(f"🗑️ Deleted {delete_vectors(stale_ids)} stale vectors")
+        chunk_store.delete_many(stale_ids)
+
+    # Record only what is actually in the index, so failed chunks are retried next run
+    indexed_now = (current & indexed) | uploaded
+    if indexed_now != previous:
+        save_manifest(condition, file_name, indexed_now)
+
+    if uploaded or stale_ids:
+        # New material for this condition → precomputed summaries are regenerated by the backend
+        bump_corpus_version(condition)
+    else:
+        print(f"✅ {condition}/{file_name} unchanged; nothing to embed.")
+    return {"uploaded": len(uploaded), "deleted": len(stale_ids)}
 
 
 # ==== MAIN ====
@@ -152,6 +356,19 @@ if __name__ == "__main__":
         "Obesity": ["Obesity_1", "Obesity_Food_1"]
     }
 
+    start = time.perf_counter()
+    total = 0
     for condition, file_list in files_to_process.items():
+        changed = False
         for file in file_list:
-            process_file(condition, file)
\ No newline at end of file
+            result = process_file(condition, file)
+            if result:
+                total += result["uploaded"]
+                changed = changed or bool(result["uploaded"] or result["deleted"])
+
+        # Local vector snapshot + BM25 index are rebuilt from the same chunk texts now in Pinecone
+        if changed:
+            rebuild_local_indexes(index, condition)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n🏁 Indexed {total} chunks in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f} chunks/sec)")
\ No newline at end of file
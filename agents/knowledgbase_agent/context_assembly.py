@@ -0,0 +1,105 @@
+# FILE: agents/knowledgbase_agent/context_assembly.py
+
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+# ==== Load Environment ====
+load_dotenv()
+
+# ==== Context Assembly Config ====
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1.0 = pure relevance, 0.0 = pure diversity
+MIN_DEDUPE_LINE_CHARS = 30                           # shorter lines (headings, bullets) may legitimately repeat
+
+TERM_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def select_context(matches: List[Dict[str, Any]], count_tokens: Callable[[str], int],
+                   query_vector=None, vectors: Optional[Dict[str, Any]] = None,
+                   token_budget: int = CONTEXT_TOKEN_BUDGET, max_chunks: int = None,
+                   mmr_lambda: float = MMR_LAMBDA) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Pick chunks by maximal marginal relevance until the token budget is spent.
+
+    Relevance and redundancy use chunk embeddings when `vectors` has one for
+    every candidate (cosine to the query / to already-picked chunks); otherwise
+    relevance follows retrieval rank and redundancy is term-set Jaccard. Lines
+    already in the context (chunk overlap) are dropped before a chunk is added.
+    Token counts come from `metadata["token_count"]` (stored at ingestion) and
+    are scaled by kept characters after de-duplication, so budgeting does not
+    tokenize; `count_tokens` is only called for chunks without a stored count.
+    """
+    vectors = vectors or {}
+    use_vectors = query_vector is not None and matches and all(m["id"] in vectors for m in matches)
+    query = _unit(query_vector) if use_vectors else None
+
+    candidates = []
+    for rank, match in enumerate(matches):
+        text = match["metadata"].get("text", "")
+        if not text.strip():
+            continue
+        candidate = {
+            "text": text,
+            "tokens": match["metadata"].get("token_count") or count_tokens(text),
+            "relevance": 1.0 - rank / max(1, len(matches)),
+        }
+        if use_vectors:
+            candidate["vector"] = _unit(vectors[match["id"]])
+            candidate["relevance"] = float(candidate["vector"] @ query)
+        else:
+            candidate["terms"] = set(TERM_PATTERN.findall(text.lower()))
+        candidates.append(candidate)
+
+    def similarity(a, b) -> float:
+        if use_vectors:
+            return float(a["vector"] @ b["vector"])
+        return _jaccard(a["terms"], b["terms"])
+
+    selected, texts, seen_lines = [], [], set()
+    used_tokens, deduped_lines = 0, 0
+    max_chunks = max_chunks or len(candidates)
+
+    while candidates and len(selected) < max_chunks and used_tokens < token_budget:
+        best = max(
+            candidates,
+            key=lambda c: mmr_lambda * c["relevance"]
+            - (1 - mmr_lambda) * max((similarity(c, s) for s in selected), default=0.0)
+        )
+        candidates.remove(best)
+
+        lines = best["text"].splitlines()
+        fresh = [line for line in lines
+                 if len(line.strip()) < MIN_DEDUPE_LINE_CHARS or line.strip() not in seen_lines]
+        text, tokens = best["text"], best["tokens"]
+        if len(fresh) < len(lines):
+            deduped_lines += len(lines) - len(fresh)
+            text = "\n".join(fresh).strip()
+            if not text:
+                continue
+            tokens = -(-tokens * len(text) // len(best["text"]))  # ceil of the kept share
+
+        if used_tokens + tokens > token_budget:
+            continue  # a smaller, still-relevant chunk may fit
+
+        selected.append(best)
+        texts.append(text)
+        used_tokens += tokens
+        seen_lines.update(line.strip() for line in lines if len(line.strip()) >= MIN_DEDUPE_LINE_CHARS)
+
+    stats = {"candidates": len(matches), "selected": len(texts), "tokens": used_tokens,
+             "deduped_lines": deduped_lines, "embedding_mmr": bool(use_vectors)}
+    return texts, stats
@@ -0,0 +1,34 @@
+# FILE: agents/knowledgbase_agent/corpus_version.py
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from postgres_db.database import SessionLocal, AsyncSessionLocal
+from postgres_db.models import KnowledgeCorpusVersion
+
+
+# ==== Corpus Version (bumped by chunking.py, read by the summary and answer caches) ====
+def bump_corpus_version(condition: str) -> int:
+    """Atomically increment the corpus version for a condition after new material is ingested."""
+    stmt = insert(KnowledgeCorpusVersion).values(condition=condition, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[KnowledgeCorpusVersion.condition],
+        set_={"version": KnowledgeCorpusVersion.version + 1}
+    ).returning(KnowledgeCorpusVersion.version)
+
+    db = SessionLocal()
+    try:
+        version = db.execute(stmt).scalar_one()
+        db.commit()
+        print(f"🏷️ Corpus version for {condition} is now {version}")
+        return version
+    finally:
+        db.close()
+
+
+async def aget_corpus_version(condition: str) -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(KnowledgeCorpusVersion.version).where(KnowledgeCorpusVersion.condition == condition)
+        )
+        return result.scalar_one_or_none() or 0
@@ -0,0 +1,189 @@
+# FILE: agents/knowledgbase_agent/embedding_cache.py
+
+import os
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+# ==== Load Environment ====
+load_dotenv()
+
+# ==== Cache Config ====
+KB_DATA_DIR = os.getenv("KB_DATA_DIR", os.path.join(os.path.dirname(__file__), "kb_data"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(KB_DATA_DIR, "embedding_cache.sqlite3"))
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize, lowercase and collapse whitespace so trivially different inputs share a key."""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def embedding_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+# ==== Two-Tier Embedding Cache ====
+class EmbeddingCache:
+    """
+    In-process LRU in front of an on-disk SQLite store, keyed by
+    sha256(model name + normalized text).
+
+    Wraps any LangChain `Embeddings` object; only misses in both tiers reach
+    the embeddings API. Concurrent misses for the same key share one call.
+    """
+
+    def __init__(self, embeddings, path: str = EMBEDDING_CACHE_PATH, max_size: int = EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", embeddings.__class__.__name__)
+        self.path = path
+        self.max_size = max_size
+
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "inflight_waits": 0, "misses": 0, "disk_errors": 0}
+        self._db: Optional[sqlite3.Connection] = None
+
+    # ---- SQLite tier ----
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._db is None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+                )
+                db.commit()
+                self._db = db
+                print(f"🗄️ Embedding cache opened at {self.path}")
+            except sqlite3.Error as e:
+                self._stats["disk_errors"] += 1
+                print(f"⚠️ Embedding cache disk tier unavailable: {e}")
+        return self._db
+
+    def _disk_get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return None
+            try:
+                row = db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                self._stats["disk_errors"] += 1
+                print(f"⚠️ Embedding cache read failed: {e}")
+                return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist() if row else None
+
+    def _disk_put(self, key: str, vector: List[float]) -> None:
+        blob = np.asarray(vector, dtype=np.float32).tobytes()
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)",
+                    (key, self.model, len(vector), blob)
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                self._stats["disk_errors"] += 1
+                print(f"⚠️ Embedding cache write failed: {e}")
+
+    # ---- LRU tier ----
+    def _memory_get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+            return vector
+
+    def _memory_put(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def lookup(self, text: str) -> Optional[List[float]]:
+        """Return a cached vector from either tier, or None. Disk hits are promoted to memory."""
+        key = embedding_key(self.model, text)
+        vector = self._memory_get(key)
+        if vector is not None:
+            self._stats["memory_hits"] += 1
+            return vector
+
+        vector = self._disk_get(key)
+        if vector is not None:
+            self._stats["disk_hits"] += 1
+            self._memory_put(key, vector)
+        return vector
+
+    def store(self, text: str, vector: List[float]) -> None:
+        key = embedding_key(self.model, text)
+        self._memory_put(key, vector)
+        self._disk_put(key, vector)
+
+    # ---- Embeddings API ----
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.lookup(text)
+        if vector is not None:
+            return vector
+
+        self._stats["misses"] += 1
+        vector = self.embeddings.embed_query(text)
+        self.store(text, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = self.lookup(text)
+        if vector is not None:
+            return vector
+
+        key = embedding_key(self.model, text)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            # Not a cache hit: the caller still waits for the API call another request started
+            self._stats["inflight_waits"] += 1
+            return await asyncio.shield(pending)
+
+        self._stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            vector = await self.embeddings.aembed_query(text)
+            self.store(text, vector)
+            future.set_result(vector)
+            return vector
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved so an unawaited failure is not logged
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    # ---- Metrics ----
+    def stats(self) -> Dict[str, float]:
+        hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+        lookups = hits + self._stats["inflight_waits"] + self._stats["misses"]
+        return {
+            "model": self.model,
+            **self._stats,
+            "lookups": lookups,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_capacity": self.max_size,
+        }
@@ -2,19 +2,39 @@
 
 import sys
 import os
-from typing import List
+import asyncio
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
 from dotenv import load_dotenv
 import tiktoken
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from agents.knowledgbase_agent.pinecone_utils import query_chunks_from_pinecone
+from agents.knowledgbase_agent.pinecone_utils import query_chunks, hybrid_query_chunks, chunk_vectors
+from agents.knowledgbase_agent.embedding_cache import EmbeddingCache
+from agents.sync_runner import run_sync
+from agents.knowledgbase_agent.semantic_cache import SemanticAnswerCache
+from agents.knowledgbase_agent.corpus_version import aget_corpus_version
+from agents.knowledgbase_agent.context_assembly import select_context, CONTEXT_TOKEN_BUDGET
+from agents.llm_metrics import LLMMetricsCallback, InstrumentedEmbeddings
 
 # ==== Path and Environment Setup ====
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-embeddings_model = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
-llm = ChatOpenAI(model="gpt-4o-mini", api_key=OPENAI_API_KEY)
+# Query/condition embeddings go through the two-tier (LRU + SQLite) cache
+embeddings_model = EmbeddingCache(InstrumentedEmbeddings(OpenAIEmbeddings(api_key=OPENAI_API_KEY), site="knowledge.embeddings"))
+llm = ChatOpenAI(model="gpt-4o-mini", api_key=OPENAI_API_KEY, stream_usage=True,
+                 callbacks=[LLMMetricsCallback("knowledge.answers")])
+
+# Near-duplicate questions per condition are answered from here
+answer_cache = SemanticAnswerCache()
+
+# Chunks sent to the LLM per question; hybrid ranking puts the best ones first, so fewer are needed
+VECTOR_SEARCH_TOP_K = int(os.getenv("VECTOR_SEARCH_TOP_K", "8"))
+
+# "mmr": pick from a wider candidate pool by maximal marginal relevance under CONTEXT_TOKEN_BUDGET
+# "all": send the top VECTOR_SEARCH_TOP_K chunks as retrieved
+CONTEXT_ASSEMBLY = os.getenv("CONTEXT_ASSEMBLY", "mmr")
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "15"))
 
 # ==== GPT Token Management ====
 encoding = tiktoken.encoding_for_model("gpt-4o-mini")
@@ -22,15 +42,19 @@ encoding = tiktoken.encoding_for_model("gpt-4o-mini")
 def count_tokens(text: str) -> int:
     return len(encoding.encode(text))
 
-def truncate_chunks(chunks: List[str], max_tokens: int = 8000) -> str:
+def chunk_token_count(match: Dict[str, Any]) -> int:
+    """Token count stored with the chunk at ingestion; only older chunks without one are encoded here."""
+    return match["metadata"].get("token_count") or count_tokens(match["metadata"].get("text", ""))
+
+def truncate_chunks(matches: List[Dict[str, Any]], max_tokens: int = 8000) -> str:
     total = 0
     final = []
-    for chunk in chunks:
-        tokens = count_tokens(chunk)
+    for match in matches:
+        tokens = chunk_token_count(match)
         if total + tokens > max_tokens:
             print(f"⚠️ Stopping truncation at token count {total} (limit: {max_tokens})")
             break
-        final.append(chunk)
+        final.append(match["metadata"]["text"])
         total += tokens
     print(f"🧮 Truncated to {len(final)} chunks with total tokens = {total}")
     return "\n\n".join(final)
@@ -46,27 +70,169 @@ SUMMARY_QUESTIONS = [
     "What is the general doctor's advice?"
 ]
 
+# ==== Summary Execution Mode ====
+# "concurrent": one LLM call per question, fanned out under SUMMARY_CONCURRENCY
+# "single":     one structured-output call that answers every question
+# "sequential": one LLM call per question, one after another
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "concurrent")
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "7"))
+
+# Structured-output schema for "single" mode: one field per summary question
+SUMMARY_FUNCTION_DEF = {
+    "name": "condition_summary",
+    "description": "Answer every summary question about the condition using only the given context.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            f"answer_{idx}": {"type": "string", "description": question}
+            for idx, question in enumerate(SUMMARY_QUESTIONS, 1)
+        },
+        "required": [f"answer_{idx}" for idx in range(1, len(SUMMARY_QUESTIONS) + 1)]
+    }
+}
+
+# ==== Prompt Builders ====
+def build_vector_prompt(context: str, query: str) -> str:
+    return f"""Use the following context to answer the question:\n\n{context}\n\nQuestion: {query}"""
+
+def build_summary_prompt(question: str, context: str) -> str:
+    return f"""Using the following medical context, answer this question:\n\n{question}\n\nContext:\n{context}"""
+
+def format_summary_section(question: str, answer: str) -> str:
+    return f"### {question}\n{answer}"
+
+# ==== Retrieval Helpers ====
+async def current_corpus_version(condition: str) -> Optional[int]:
+    """Corpus version used to invalidate cached answers; None disables the answer cache for this call."""
+    try:
+        return await aget_corpus_version(condition)
+    except Exception as e:
+        print(f"⚠️ Corpus version unavailable, bypassing answer cache: {str(e)}")
+        return None
+
+def assemble_vector_context(matches: List[Dict[str, Any]], condition: str, query_vector: List[float],
+                            mode: str = None, token_budget: int = None) -> str:
+    """Join retrieved chunks into the prompt context, budgeted and de-duplicated in "mmr" mode."""
+    mode = mode or CONTEXT_ASSEMBLY
+    if mode != "mmr":
+        matches = matches[:VECTOR_SEARCH_TOP_K]
+        print(f"📚 Total chunks retrieved: {len(matches)}, Token estimate: {sum(chunk_token_count(m) for m in matches)}")
+        return "\n\n".join([match["metadata"]["text"] for match in matches])
+
+    vectors = chunk_vectors(condition, [match["id"] for match in matches])
+    texts, stats = select_context(
+        matches, count_tokens, query_vector=query_vector, vectors=vectors,
+        token_budget=token_budget or CONTEXT_TOKEN_BUDGET, max_chunks=VECTOR_SEARCH_TOP_K
+    )
+    print(f"📚 MMR context: {stats['selected']}/{stats['candidates']} chunks, {stats['tokens']} tokens "
+          f"(budget {token_budget or CONTEXT_TOKEN_BUDGET}), {stats['deduped_lines']} overlapping lines dropped")
+    return "\n\n".join(texts)
+
+async def retrieve_vector_context(query: str, condition: str, query_vector: List[float] = None,
+                                  mode: str = None) -> Optional[str]:
+    if query_vector is None:
+        query_vector = await embeddings_model.aembed_query(query)
+        print("✅ Generated query embedding.")
+
+    # MMR needs a wider pool than it will keep so it can skip near-duplicates
+    top_k = max(VECTOR_SEARCH_TOP_K, CONTEXT_CANDIDATES) if (mode or CONTEXT_ASSEMBLY) == "mmr" else VECTOR_SEARCH_TOP_K
+
+    # Retrieval (local matmul/BM25 or Pinecone HTTP) is blocking; keep it off the event loop
+    results = await asyncio.to_thread(hybrid_query_chunks, query, query_vector, condition=condition, top_k=top_k)
+    if not results:
+        print("⚠️ No results found in the vector index for this condition.")
+        return None
+
+    return await asyncio.to_thread(assemble_vector_context, results, condition, query_vector, mode)
+
+async def retrieve_summary_context(condition: str) -> Optional[str]:
+    query_vector = await embeddings_model.aembed_query(condition)
+    print("✅ Created embedding for condition summary.")
+
+    results = await asyncio.to_thread(query_chunks, query_vector, condition=condition, top_k=50)
+    if not results:
+        print("⚠️ No data found in the vector index for summary.")
+        return None
+
+    print(f"📚 Retrieved {len(results)} chunks before truncation.")
+    return truncate_chunks(results, max_tokens=8000)
+
+async def answer_summary_question(idx: int, question: str, context: str) -> str:
+    print(f"\n❓ [{idx}/{len(SUMMARY_QUESTIONS)}] Question: {question}")
+    response = await llm.ainvoke(build_summary_prompt(question, context))
+    answer = response.content.strip() if response else "No answer generated."
+    print(f"✅ Answer complete. Tokens used: {count_tokens(answer)}")
+    return answer
+
+async def answer_summary_single_call(context: str) -> List[str]:
+    print(f"\n❓ Answering all {len(SUMMARY_QUESTIONS)} summary questions in one structured call")
+    questions = "\n".join(f"{idx}. {question}" for idx, question in enumerate(SUMMARY_QUESTIONS, 1))
+    prompt = f"""Using the following medical context, answer each of these questions. Put the answer to question N in `answer_N`.\n\n{questions}\n\nContext:\n{context}"""
+
+    result = await llm.with_structured_output(SUMMARY_FUNCTION_DEF).ainvoke(prompt)
+    result = result or {}
+    answers = [
+        (result.get(f"answer_{idx}") or "No answer generated.").strip()
+        for idx in range(1, len(SUMMARY_QUESTIONS) + 1)
+    ]
+    print(f"✅ Structured answers complete. Tokens used: {sum(count_tokens(a) for a in answers)}")
+    return answers
+
+async def iter_summary_answers(context: str, mode: str = None, concurrency: int = None) -> AsyncIterator[Tuple[int, str, str]]:
+    """
+    Yield `(index, question, answer)` for every summary question as soon as each answer exists.
+    In "concurrent" mode answers arrive in completion order; callers re-order by index.
+    """
+    mode = mode or SUMMARY_MODE
+    concurrency = max(1, concurrency or SUMMARY_CONCURRENCY)
+
+    if mode == "single":
+        answers = await answer_summary_single_call(context)
+        for idx, (question, answer) in enumerate(zip(SUMMARY_QUESTIONS, answers)):
+            yield idx, question, answer
+        return
+
+    if mode == "sequential":
+        for idx, question in enumerate(SUMMARY_QUESTIONS):
+            yield idx, question, await answer_summary_question(idx + 1, question, context)
+        return
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(idx: int, question: str):
+        async with semaphore:
+            return idx, question, await answer_summary_question(idx + 1, question, context)
+
+    tasks = [asyncio.create_task(bounded(idx, question)) for idx, question in enumerate(SUMMARY_QUESTIONS)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
 # ==== Core Vector Search Logic ====
-def run_vector_search(query: str, condition: str) -> str:
+async def arun_vector_search(query: str, condition: str) -> str:
     print(f"\n🔍 Running vector_search → Query: '{query}', Condition: '{condition}'")
 
     try:
-        query_vector = embeddings_model.embed_query(query)
-        print("✅ Generated query embedding.")
+        query_vector = await embeddings_model.aembed_query(query)
+        version = await current_corpus_version(condition)
+        if version is not None:
+            cached = answer_cache.lookup(condition, query, query_vector, version)
+            if cached is not None:
+                return cached
 
-        results = query_chunks_from_pinecone(query_vector, condition=condition)
-        if not results:
-            print("⚠️ No results found in Pinecone for this condition.")
+        context = await retrieve_vector_context(query, condition, query_vector)
+        if context is None:
             return "No relevant information found for this condition."
 
-        context = "\n\n".join([match["metadata"]["text"] for match in results])
-        print(f"📚 Total chunks retrieved: {len(results)}, Token estimate: {count_tokens(context)}")
-
-        prompt = f"""Use the following context to answer the question:\n\n{context}\n\nQuestion: {query}"""
-        answer = llm.invoke(prompt)
+        answer = await llm.ainvoke(build_vector_prompt(context, query))
         response_text = answer.content.strip() if answer else "No answer generated."
 
         print("💬 LLM response complete.")
+        if answer and version is not None:
+            answer_cache.store(condition, query, query_vector, response_text, version)
         return response_text
 
     except Exception as e:
@@ -74,38 +240,86 @@ def run_vector_search(query: str, condition: str) -> str:
         return f"❌ Error in run_vector_search: {str(e)}"
 
 
-# ==== Summary Generator Logic ====
-def run_generate_summary(condition: str) -> str:
-    print(f"\n📄 Generating summary for condition: '{condition}'")
+async def astream_vector_search(query: str, condition: str) -> AsyncIterator[Dict[str, Any]]:
+    """Streaming variant of `arun_vector_search`: yields answer tokens as the LLM emits them."""
+    print(f"\n🔍 Streaming vector_search → Query: '{query}', Condition: '{condition}'")
 
     try:
-        query_vector = embeddings_model.embed_query(condition)
-        print("✅ Created embedding for condition summary.")
+        query_vector = await embeddings_model.aembed_query(query)
+        version = await current_corpus_version(condition)
+        if version is not None:
+            cached = answer_cache.lookup(condition, query, query_vector, version)
+            if cached is not None:
+                yield {"event": "token", "data": cached}
+                return
 
-        results = query_chunks_from_pinecone(query_vector, condition=condition, top_k=50)
-        if not results:
-            print("⚠️ No data found in Pinecone for summary.")
-            return "No data found for summary."
+        context = await retrieve_vector_context(query, condition, query_vector)
+        if context is None:
+            yield {"event": "token", "data": "No relevant information found for this condition."}
+            return
+
+        tokens = []
+        async for chunk in llm.astream(build_vector_prompt(context, query)):
+            if chunk.content:
+                tokens.append(chunk.content)
+                yield {"event": "token", "data": chunk.content}
 
-        all_chunks = [match["metadata"]["text"] for match in results]
-        print(f"📚 Retrieved {len(all_chunks)} chunks before truncation.")
+        print("💬 LLM stream complete.")
+        if tokens and version is not None:
+            answer_cache.store(condition, query, query_vector, "".join(tokens).strip(), version)
+
+    except Exception as e:
+        print(f"❌ Error in astream_vector_search: {str(e)}")
+        yield {"event": "error", "data": f"❌ Error in run_vector_search: {str(e)}"}
+
+
+def run_vector_search(query: str, condition: str) -> str:
+    """Blocking wrapper around `arun_vector_search` for scripts and notebooks."""
+    return run_sync(arun_vector_search(query, condition))
 
-        context = truncate_chunks(all_chunks, max_tokens=8000)
 
-        full_summary = ""
-        for idx, question in enumerate(SUMMARY_QUESTIONS, 1):
-            print(f"\n❓ [{idx}/{len(SUMMARY_QUESTIONS)}] Question: {question}")
-            prompt = f"""Using the following medical context, answer this question:\n\n{question}\n\nContext:\n{context}"""
+# ==== Summary Generator Logic ====
+async def arun_generate_summary(condition: str) -> str:
+    print(f"\n📄 Generating summary for condition: '{condition}'")
 
-            response = llm.invoke(prompt)
-            answer = response.content.strip() if response else "No answer generated."
+    try:
+        context = await retrieve_summary_context(condition)
+        if context is None:
+            return "No data found for summary."
 
-            full_summary += f"### {question}\n{answer}\n\n"
-            print(f"✅ Answer complete. Tokens used: {count_tokens(answer)}")
+        answers = {}
+        async for idx, question, answer in iter_summary_answers(context):
+            answers[idx] = format_summary_section(question, answer)
+        sections = [answers[idx] for idx in sorted(answers)]
 
         print("\n🧾 Summary generation complete.")
-        return full_summary.strip()
+        return "\n\n".join(sections)
 
     except Exception as e:
         print(f"❌ Error in run_generate_summary: {str(e)}")
         return f"❌ Error in run_generate_summary: {str(e)}"
+
+
+async def astream_generate_summary(condition: str) -> AsyncIterator[Dict[str, Any]]:
+    """Streaming variant of `arun_generate_summary`: yields each summary section once it is answered."""
+    print(f"\n📄 Streaming summary for condition: '{condition}'")
+
+    try:
+        context = await retrieve_summary_context(condition)
+        if context is None:
+            yield {"event": "token", "data": "No data found for summary."}
+            return
+
+        async for idx, question, answer in iter_summary_answers(context):
+            yield {"event": "section", "data": {"index": idx, "question": question, "answer": answer}}
+
+        print("\n🧾 Summary stream complete.")
+
+    except Exception as e:
+        print(f"❌ Error in astream_generate_summary: {str(e)}")
+        yield {"event": "error", "data": f"❌ Error in run_generate_summary: {str(e)}"}
+
+
+def run_generate_summary(condition: str) -> str:
+    """Blocking wrapper around `arun_generate_summary` for scripts and notebooks."""
+    return run_sync(arun_generate_summary(condition))
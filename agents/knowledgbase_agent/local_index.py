@@ -0,0 +1,313 @@
+# FILE: agents/knowledgbase_agent/local_index.py
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from agents.knowledgbase_agent.embedding_cache import KB_DATA_DIR
+from agents.knowledgbase_agent.bm25_index import build_bm25_index
+from agents.knowledgbase_agent.text_splitter import prompt_token_count
+from agents.knowledgbase_agent.chunk_store import ChunkStore
+
+# ==== Load Environment ====
+load_dotenv()
+
+# ==== Local Index Config ====
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.join(KB_DATA_DIR, "local_index"))
+LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float32")  # "float32" or "float16"
+EXPORT_FETCH_BATCH = 100
+
+# Chunk bodies by id; snapshots and Pinecone metadata carry only ids and small fields
+chunk_store = ChunkStore()
+
+
+def pointer_path(condition: str, directory: str = LOCAL_INDEX_DIR) -> str:
+    """File naming the current snapshot version of a condition; the only file ever replaced in place."""
+    return os.path.join(directory, f"{condition}.current")
+
+
+def snapshot_paths(condition: str, version: str, directory: str = LOCAL_INDEX_DIR):
+    return (os.path.join(directory, f"{condition}.{version}.npy"),
+            os.path.join(directory, f"{condition}.{version}.json"))
+
+
+def current_version(condition: str, directory: str = LOCAL_INDEX_DIR) -> Optional[str]:
+    try:
+        with open(pointer_path(condition, directory), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+# ==== Snapshot Writer ====
+def write_snapshot(condition: str, ids: List[str], vectors, metadatas: List[Dict[str, Any]],
+                   directory: str = LOCAL_INDEX_DIR, dtype: str = LOCAL_INDEX_DTYPE) -> None:
+    """
+    Write one condition's chunks as a contiguous, L2-normalized matrix (`.npy`) plus
+    ids/metadata (`.json`) under a new version, then swap the `.current` pointer to it.
+    The pointer is the only file replaced in place, so a reader sees either the old
+    matrix and ids or the new ones, never a mix.
+    """
+    os.makedirs(directory, exist_ok=True)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2 or len(matrix) != len(ids):
+        raise ValueError(f"Expected {len(ids)} vectors, got array of shape {matrix.shape}")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = (matrix / np.where(norms == 0, 1, norms)).astype(dtype)
+
+    previous = current_version(condition, directory)
+    version = f"{time.time_ns():x}"
+    npy_path, meta_path = snapshot_paths(condition, version, directory)
+    with open(npy_path, "wb") as f:
+        np.save(f, matrix)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"condition": condition, "ids": ids, "metadata": metadatas}, f)
+
+    pointer = pointer_path(condition, directory)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+    remove_old_versions(condition, keep={version, previous}, directory=directory)
+    print(f"💾 Wrote local snapshot for {condition}: {matrix.shape[0]} x {matrix.shape[1]} ({dtype}), version {version}")
+
+
+def remove_old_versions(condition: str, keep, directory: str = LOCAL_INDEX_DIR) -> None:
+    """
+    Delete snapshot files older than the previous version. The previous one is kept
+    for readers that read the pointer just before the swap; mapped files stay
+    readable after deletion anyway.
+    """
+    prefix = f"{condition}."
+    for name in os.listdir(directory):
+        if not name.startswith(prefix) or not name.endswith((".npy", ".json")):
+            continue
+        version = name[len(prefix):].rsplit(".", 1)[0]
+        if version not in keep and "." not in version:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def load_snapshot_metadata(condition: str, directory: str = LOCAL_INDEX_DIR):
+    """(ids, metadatas) of a condition's snapshot, or ([], []) if there is none."""
+    version = current_version(condition, directory)
+    if version is None:
+        return [], []
+    _, meta_path = snapshot_paths(condition, version, directory)
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    return meta["ids"], meta["metadata"]
+
+
+def backfill_token_counts(index, condition: str, ids: List[str], vectors, metadatas: List[Dict[str, Any]],
+                          uncounted: Dict[str, Dict[str, Any]], legacy_texts) -> int:
+    """
+    Add `token_count` to the snapshot metadata and to Pinecone for chunks that lack it.
+    Pinecone gets batched re-upserts of the same values with the merged metadata
+    (one request per UPSERT_BATCH_SIZE chunks, not one update per chunk).
+    """
+    from agents.knowledgbase_agent.chunking import UPSERT_BATCH_SIZE, with_retry
+
+    texts = {vid: text for vid, text, _ in legacy_texts}
+    texts.update({vid: text for vid, (text, _) in chunk_store.get_many(
+        [vid for vid in uncounted if vid not in texts]).items()})
+
+    updates = []
+    for vid, values, metadata in zip(ids, vectors, metadatas):
+        if vid in uncounted and vid in texts:
+            metadata["token_count"] = prompt_token_count(texts[vid])
+            updates.append((vid, values, {**uncounted[vid], "token_count": metadata["token_count"]}))
+
+    for start in range(0, len(updates), UPSERT_BATCH_SIZE):
+        batch = updates[start:start + UPSERT_BATCH_SIZE]
+        with_retry(index.upsert, vectors=batch, what=f"token_count backfill of {len(batch)}")
+    print(f"🔢 Backfilled token_count on {len(updates)} chunks for {condition} "
+          f"in {-(-len(updates) // UPSERT_BATCH_SIZE)} upserts")
+    return len(updates)
+
+
+def export_snapshot_from_pinecone(index, condition: str, directory: str = LOCAL_INDEX_DIR) -> int:
+    """Copy every vector whose id starts with `{condition}_` out of Pinecone into a local snapshot."""
+    print(f"📤 Exporting {condition} from Pinecone...")
+    ids = [vid for page in index.list(prefix=f"{condition}_") for vid in page]
+
+    kept_ids, vectors, metadatas = [], [], []
+    legacy_texts = []
+    uncounted = {}  # id → full Pinecone metadata of chunks stored before token counts existed
+    for start in range(0, len(ids), EXPORT_FETCH_BATCH):
+        response = index.fetch(ids=ids[start:start + EXPORT_FETCH_BATCH])
+        for vid, vector in response.vectors.items():
+            metadata = dict(vector.metadata or {})
+            if metadata.get("condition") != condition:
+                continue
+            if "token_count" not in metadata:
+                uncounted[vid] = dict(metadata)
+            # Chunks ingested with their text in Pinecone seed the local chunk store
+            text = metadata.pop("text", None)
+            if text:
+                legacy_texts.append((vid, text, metadata))
+            kept_ids.append(vid)
+            vectors.append(vector.values)
+            metadatas.append(metadata)
+
+    if not kept_ids:
+        print(f"⚠️ No vectors found in Pinecone for {condition}")
+        return 0
+
+    # Chunks ingested before token counts were stored get them now, here and in Pinecone
+    if uncounted:
+        backfill_token_counts(index, condition, kept_ids, vectors, metadatas, uncounted, legacy_texts)
+
+    if legacy_texts:
+        chunk_store.put_many(legacy_texts)
+        print(f"🗄️ Copied {len(legacy_texts)} chunk texts from Pinecone metadata into the chunk store")
+
+    write_snapshot(condition, kept_ids, vectors, metadatas, directory)
+    return len(kept_ids)
+
+
+# ==== Local Vector Index ====
+class _Snapshot:
+    def __init__(self, matrix: np.ndarray, ids: List[str], metadatas: List[Dict[str, Any]], version: str):
+        if len(ids) != matrix.shape[0] or len(metadatas) != len(ids):
+            raise ValueError(f"Snapshot {version} has {matrix.shape[0]} rows but {len(ids)} ids / {len(metadatas)} metadata")
+        self.matrix = matrix
+        self.ids = ids
+        self.metadatas = metadatas
+        self.version = version
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+
+
+class LocalVectorIndex:
+    """
+    Exact top-k search over per-condition snapshots memory-mapped from disk.
+
+    Each condition is its own matrix, so the `condition` filter is just choosing
+    which snapshot to search; scoring is one matrix-vector product. Snapshots are
+    reloaded when the condition's `.current` pointer names a new version. Results use Pinecone's match shape
+    (`id`, `score`, `metadata`) so callers do not care which backend answered.
+    """
+
+    def __init__(self, directory: str = LOCAL_INDEX_DIR):
+        self.directory = directory
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._lock = threading.Lock()
+
+    def _snapshot(self, condition: str) -> Optional[_Snapshot]:
+        version = current_version(condition, self.directory)
+        if version is None:
+            return None
+
+        with self._lock:
+            snapshot = self._snapshots.get(condition)
+            if snapshot is None or snapshot.version != version:
+                start = time.perf_counter()
+                npy_path, meta_path = snapshot_paths(condition, version, self.directory)
+                matrix = np.load(npy_path, mmap_mode="r")
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+                snapshot = _Snapshot(matrix, meta["ids"], meta["metadata"], version)
+                self._snapshots[condition] = snapshot
+                print(f"🗺️ Mapped local index for {condition}: {matrix.shape[0]} chunks in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return snapshot
+
+    def has_condition(self, condition: str) -> bool:
+        return self._snapshot(condition) is not None
+
+    def query(self, query_embedding, condition: str, top_k: int = 15) -> Optional[List[Dict[str, Any]]]:
+        """Top-k matches for one condition, or None when there is no local snapshot for it."""
+        snapshot = self._snapshot(condition)
+        if snapshot is None:
+            return None
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.shape[0] != snapshot.matrix.shape[1]:
+            raise ValueError(
+                f"Query dimension {query.shape[0]} does not match local index dimension {snapshot.matrix.shape[1]} for {condition}"
+            )
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        scores = snapshot.matrix @ query.astype(snapshot.matrix.dtype)
+        k = min(top_k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            {"id": snapshot.ids[i], "score": float(scores[i]), "metadata": snapshot.metadatas[i]}
+            for i in top
+        ]
+
+    def vectors(self, condition: str, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Normalized stored vectors for the given chunk ids; ids missing from the snapshot are left out."""
+        snapshot = self._snapshot(condition)
+        if snapshot is None:
+            return {}
+        return {
+            chunk_id: np.asarray(snapshot.matrix[snapshot.rows[chunk_id]], dtype=np.float32)
+            for chunk_id in ids if chunk_id in snapshot.rows
+        }
+
+
+def rebuild_local_indexes(index, condition: str) -> int:
+    """Refresh a condition's local vector snapshot and BM25 index from what is now in Pinecone."""
+    count = export_snapshot_from_pinecone(index, condition)
+    if count:
+        ids, metadatas = load_snapshot_metadata(condition)
+        texts = chunk_store.get_many(ids)
+        build_bm25_index(condition, ids, metadatas, texts={chunk_id: text for chunk_id, (text, _) in texts.items()})
+    return count
+
+
+def strip_text_from_pinecone(index, condition: str) -> int:
+    """
+    Re-upsert a condition's vectors without `text` in their metadata, once the
+    chunk store holds the texts. Pinecone cannot drop a metadata field in place.
+    """
+    ids = [vid for page in index.list(prefix=f"{condition}_") for vid in page]
+    stored = set(chunk_store.get_many(ids))
+    stripped = 0
+    for start in range(0, len(ids), EXPORT_FETCH_BATCH):
+        response = index.fetch(ids=ids[start:start + EXPORT_FETCH_BATCH])
+        vectors = [
+            (vid, vector.values, {k: v for k, v in (vector.metadata or {}).items() if k != "text"})
+            for vid, vector in response.vectors.items()
+            if vector.metadata and "text" in vector.metadata and vid in stored
+        ]
+        if vectors:
+            index.upsert(vectors=vectors)
+            stripped += len(vectors)
+    print(f"✂️ Removed text from {stripped} Pinecone vectors for {condition}")
+    return stripped
+
+
+# ==== MAIN: export Pinecone → local snapshots + BM25 ====
+if __name__ == "__main__":
+    from agents.knowledgbase_agent.pinecone_utils import index
+
+    parser = argparse.ArgumentParser(description="Export per-condition snapshots from Pinecone for the local index")
+    parser.add_argument("--conditions", nargs="+",
+                        default=["Cholesterol", "CKD", "Gluten", "Hypertension", "Polycystic", "Type2", "Obesity"])
+    parser.add_argument("--strip-text", action="store_true",
+                        help="After exporting, remove chunk text from Pinecone metadata (texts stay in this host's chunk "
+                             "store; only for deployments where every serving host has a copy of it)")
+    args = parser.parse_args()
+
+    for condition in args.conditions:
+        count = rebuild_local_indexes(index, condition)
+        print(f"✅ {condition}: {count} chunks exported")
+        if args.strip_text and count:
+            strip_text_from_pinecone(index, condition)
@@ -0,0 +1,186 @@
+# FILE: agents/knowledgbase_agent/md_normalizer.py
+
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+# ==== Load Environment ====
+load_dotenv()
+
+# ==== Normalization Config ====
+# A line on at least this share of pages (and on MIN_REPEAT_PAGES or more) is a running header/footer
+REPEAT_PAGE_RATIO = float(os.getenv("MD_REPEAT_PAGE_RATIO", "0.5"))
+MIN_REPEAT_PAGES = int(os.getenv("MD_MIN_REPEAT_PAGES", "3"))
+MAX_BOILERPLATE_LINE_CHARS = 120
+MAX_MASKED_LINE_CHARS = 60
+# Unmarked documents (converted before page markers existed): a short line that repeats at least
+# MIN_REPEAT_PAGES times, never closer than this many non-blank lines apart, is taken as a running
+# header/footer and each occurrence starts a new page
+INFERRED_PAGE_MIN_LINES = int(os.getenv("MD_INFERRED_PAGE_MIN_LINES", "5"))
+
+# Written between pages by mistral_ai.py
+PAGE_MARKER = re.compile(r"^<!-- page \d+ -->$", re.MULTILINE)
+PAGE_NUMBER = re.compile(r"^(?:page\s*)?\d{1,4}(?:\s*(?:of|/)\s*\d{1,4})?$", re.IGNORECASE)
+IMAGE_LINK = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+LOW_VALUE_SECTIONS = re.compile(
+    r"^(?:\d+(?:\.\d+)*\.?\s*)?(references|bibliography|works cited|citations|acknowledg(?:e)?ments?|"
+    r"conflicts? of interest|competing interests|disclosures?|funding|author contributions)\b",
+    re.IGNORECASE,
+)
+
+
+def _line_key(line: str) -> str:
+    """
+    Case/whitespace-insensitive key. Digits are masked in short non-heading lines
+    so footers like "Page 3" and "Page 4" match, but "# Stage 3" and "# Stage 4" do not.
+    """
+    key = " ".join(line.lower().split())
+    if key.startswith("#") or len(key) > MAX_MASKED_LINE_CHARS:
+        return key
+    return re.sub(r"\d+", "#", key)
+
+
+def _boilerplate_candidate(line: str) -> bool:
+    stripped = line.strip()
+    return (bool(stripped) and len(stripped) <= MAX_MASKED_LINE_CHARS and not PAGE_NUMBER.match(stripped)
+            and not stripped.startswith(("|", "#")) and not IMAGE_LINK.search(stripped))
+
+
+def infer_page_breaks(lines: List[str]) -> List[int]:
+    """
+    Line indices that start a page in a document without page markers, found
+    from its running header/footer: the most frequent short line that recurs at
+    least MIN_REPEAT_PAGES times and never within INFERRED_PAGE_MIN_LINES
+    non-blank lines of itself. Empty when no line qualifies.
+    """
+    positions: Dict[str, List[Tuple[int, int]]] = {}
+    filled = 0
+    for idx, line in enumerate(lines):
+        if not line.strip():
+            continue
+        if _boilerplate_candidate(line):
+            positions.setdefault(_line_key(line), []).append((idx, filled))
+        filled += 1
+
+    best: List[Tuple[int, int]] = []
+    for occurrences in positions.values():
+        if len(occurrences) < max(MIN_REPEAT_PAGES, len(best) + 1):
+            continue
+        gaps = [b[1] - a[1] for a, b in zip(occurrences, occurrences[1:])]
+        if min(gaps) >= INFERRED_PAGE_MIN_LINES:
+            best = occurrences
+    return [idx for idx, _ in best]
+
+
+def split_pages(markdown: str) -> Tuple[List[str], str]:
+    """
+    (pages, source): split on the `<!-- page N -->` markers mistral_ai.py writes
+    ("markers"), else on an inferred running header/footer ("inferred"), else
+    the whole document as one page ("none").
+    """
+    pages = [page for page in PAGE_MARKER.split(markdown) if page.strip()]
+    if len(pages) > 1:
+        return pages, "markers"
+
+    lines = markdown.splitlines()
+    breaks = infer_page_breaks(lines)
+    if breaks:
+        bounds = [0] + [idx for idx in breaks if idx > 0] + [len(lines)]
+        pages = ["\n".join(lines[start:end]) for start, end in zip(bounds, bounds[1:])]
+        return [page for page in pages if page.strip()], "inferred"
+    return [markdown], "none"
+
+
+def find_repeated_lines(pages: List[str]) -> set:
+    """Keys of short lines that recur on many pages (running headers, footers, watermarks)."""
+    if len(pages) < MIN_REPEAT_PAGES:
+        return set()
+
+    page_counts = Counter()
+    for page in pages:
+        # Table rows are skipped: separator rows like "| --- |" legitimately repeat on every page.
+        # So are bare numbers: they are page numbers only at a page edge, elsewhere doses or values
+        keys = {_line_key(line) for line in page.splitlines()
+                if line.strip() and not line.lstrip().startswith("|")
+                and len(line.strip()) <= MAX_BOILERPLATE_LINE_CHARS and not PAGE_NUMBER.match(line.strip())}
+        page_counts.update(keys)
+
+    threshold = max(MIN_REPEAT_PAGES, REPEAT_PAGE_RATIO * len(pages))
+    return {key for key, count in page_counts.items() if count >= threshold}
+
+
+def page_edge_lines(lines: List[str], repeated: set) -> set:
+    """
+    Indices of the first and last non-blank lines of a page, where printed page
+    numbers sit. Running headers/footers are looked past, so a number just
+    under a header or just above a footer still counts as the page's edge.
+    """
+    filled = [idx for idx, line in enumerate(lines)
+              if line.strip() and _line_key(line.strip()) not in repeated]
+    return {filled[0], filled[-1]} if filled else set()
+
+
+def normalize_markdown(markdown: str) -> Tuple[str, Dict[str, int]]:
+    """
+    Strip boilerplate from OCR'd markdown before chunking: running headers and
+    footers repeated across pages, bare page numbers, image links and
+    low-value sections (references, acknowledgements, disclosures, ...).
+    Returns the cleaned markdown and counts of what was removed.
+
+    A low-value section is dropped only up to the next heading of any level or
+    the next page marker, so a mid-document "# References" followed by "##"
+    chapters does not take the rest of the document with it. A bare number is
+    treated as a page number only at the top or bottom of a page; elsewhere it
+    may be a dose or table value.
+
+    Pages come from the page markers, or for older unmarked conversions from an
+    inferred running header/footer. With neither (`report["page_source"] ==
+    "none"`) only image links and low-value sections are removed; re-OCR the
+    file with mistral_ai.py to get page markers.
+    """
+    pages, page_source = split_pages(markdown)
+    repeated = find_repeated_lines(pages) if page_source != "none" else set()
+    report = {"pages": len(pages), "page_source": page_source, "repeated_lines": 0, "page_numbers": 0, "image_links": 0,
+              "low_value_sections": 0, "low_value_lines": 0, "chars_before": len(markdown)}
+
+    kept: List[str] = []
+    for page in pages:
+        lines = page.splitlines()
+        edges = page_edge_lines(lines, repeated) if page_source != "none" else set()
+        skipping = False  # inside a low-value section; ends at the next heading or page
+
+        for idx, line in enumerate(lines):
+            stripped = line.strip()
+
+            heading = HEADING.match(stripped)
+            if heading:
+                skipping = bool(LOW_VALUE_SECTIONS.match(heading.group(2).strip()))
+                if skipping:
+                    report["low_value_sections"] += 1
+                    continue
+            elif skipping:
+                if stripped:
+                    report["low_value_lines"] += 1
+                continue
+
+            if stripped and _line_key(stripped) in repeated:
+                report["repeated_lines"] += 1
+                continue
+            if idx in edges and PAGE_NUMBER.match(stripped):
+                report["page_numbers"] += 1
+                continue
+            if IMAGE_LINK.search(line):
+                line, removed = IMAGE_LINK.subn("", line)
+                report["image_links"] += removed
+                if not line.strip():
+                    continue
+            kept.append(line.rstrip())
+        kept.append("")
+
+    cleaned = re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip() + "\n"
+    report["chars_after"] = len(cleaned)
+    return cleaned, report
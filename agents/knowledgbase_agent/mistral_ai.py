@@ -1,11 +1,22 @@
 import os
 import io
+import re
+import json
+import time
+import random
 import base64
+import hashlib
 import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 from dotenv import load_dotenv
 from PIL import Image
+from pypdf import PdfReader
 import boto3
 from mistralai import Mistral, DocumentURLChunk
+from agents.knowledgbase_agent.pdf_text_layer import extract_text_layer, has_text_layer, text_to_markdown
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +27,17 @@ AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 
+# Pipeline settings
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "4"))
+OCR_MAX_ATTEMPTS = int(os.getenv("OCR_MAX_ATTEMPTS", "4"))
+MISTRAL_REQUESTS_PER_SECOND = float(os.getenv("MISTRAL_REQUESTS_PER_SECOND", "2"))
+S3_REQUESTS_PER_SECOND = float(os.getenv("S3_REQUESTS_PER_SECOND", "50"))
+OCR_PROGRESS_PATH = os.getenv("OCR_PROGRESS_PATH", "ocr_progress.json")
+OCR_PAGES_PER_REQUEST = int(os.getenv("OCR_PAGES_PER_REQUEST", "20"))   # tune with benchmarks/ocr_page_ranges.py
+OCR_RANGE_CONCURRENCY = int(os.getenv("OCR_RANGE_CONCURRENCY", "4"))    # page ranges in flight per document
+USE_TEXT_LAYER = os.getenv("USE_TEXT_LAYER", "true").lower() == "true"  # convert text-layer pages locally
+IMAGE_UPLOAD_WORKERS = int(os.getenv("IMAGE_UPLOAD_WORKERS", "16"))
+
 # Init S3 client
 s3 = boto3.client(
     "s3",
@@ -24,90 +46,390 @@ s3 = boto3.client(
     aws_secret_access_key=AWS_SECRET_ACCESS_KEY
 )
 
+# Init Mistral client (shared by all workers)
+mistral_client = Mistral(api_key=MISTRAL_API_KEY)
+
 logging.basicConfig(filename="mistral_conversion.log", level=logging.INFO, format="%(message)s")
 
-def upload_to_s3(bucket, key, data_bytes):
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls to one provider at least 1/rate seconds apart"""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+RATE_LIMITERS = {
+    "mistral": RateLimiter(MISTRAL_REQUESTS_PER_SECOND),
+    "s3": RateLimiter(S3_REQUESTS_PER_SECOND),
+}
+
+
+def with_backoff(fn, *args, what: str = "request", max_attempts: int = OCR_MAX_ATTEMPTS, **kwargs):
+    """Call fn, retrying failures with exponential backoff + jitter; returns (result, attempts)"""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return fn(*args, **kwargs), attempt
+        except Exception as e:
+            if attempt == max_attempts:
+                raise
+            delay = min(60, 2 ** attempt) * (0.5 + random.random() / 2)
+            print(f"🔁 {what} failed (attempt {attempt}/{max_attempts}): {e}; retrying in {delay:.1f}s")
+            logging.info(f"🔁 Retry {attempt} for {what}: {e}")
+            time.sleep(delay)
+
+def upload_to_s3(bucket, key, data_bytes, content_type: str = None):
     """Upload binary data to S3"""
-    s3.upload_fileobj(io.BytesIO(data_bytes), bucket, key)
+    RATE_LIMITERS["s3"].acquire()
+    extra_args = {"ContentType": content_type} if content_type else None
+    s3.upload_fileobj(io.BytesIO(data_bytes), bucket, key, ExtraArgs=extra_args)
     logging.info(f"✅ Uploaded to s3://{bucket}/{key}")
 
 def get_condition_from_filename(filename: str) -> str:
     """Extract condition name from filename like Cholestrol_1.pdf → Cholestrol"""
     return filename.split("_")[0]
 
-def replace_image_references(md: str, images: dict, condition: str, file_prefix: str) -> str:
-    """Replace image placeholders with S3 URLs after uploading"""
-    for img_id, img_base64 in images.items():
-        img_data = base64.b64decode(img_base64.split(",")[-1])
-        image_filename = f"{file_prefix}_{img_id}.png"
-        s3_key = f"Markdown_Conversions/{condition}/Images/{image_filename}"
+# ==== Content-Addressed Images ====
+IMAGE_PREFIX = "Markdown_Conversions/Images"
+IMAGE_LINK_PATTERN = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)\)")
+WEB_IMAGE_FORMATS = {"png": "image/png", "jpeg": "image/jpeg", "gif": "image/gif", "webp": "image/webp"}
+
+# One upload per distinct image per run, shared by every page and document
+image_pool = ThreadPoolExecutor(max_workers=IMAGE_UPLOAD_WORKERS)
+_image_uploads = {}
+_image_lock = threading.Lock()
+
 
-        image = Image.open(io.BytesIO(img_data)).convert("RGB")
+def sniff_image_format(data: bytes):
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def prepare_image(img_base64: str):
+    """Decode a base64/data-URL image; only formats browsers cannot show are re-encoded (to PNG)"""
+    data = base64.b64decode(img_base64.split(",")[-1])
+    fmt = sniff_image_format(data)
+    if fmt is None:
+        image = Image.open(io.BytesIO(data)).convert("RGB")
         buffer = io.BytesIO()
         image.save(buffer, format="PNG")
-        buffer.seek(0)
-        upload_to_s3(AWS_BUCKET, s3_key, buffer.read())
+        data, fmt = buffer.getvalue(), "png"
+    return data, fmt
 
-        image_url = f"https://{AWS_BUCKET}.s3.amazonaws.com/{s3_key}"
-        md = md.replace(f"![{img_id}]({img_id})", f"![{image_filename}]({image_url})")
 
-    return md
+def s3_object_exists(key: str) -> bool:
+    """True if the key exists, False on 404; any other error (403, throttling, 5xx) is raised"""
+    RATE_LIMITERS["s3"].acquire()
+    try:
+        s3.head_object(Bucket=AWS_BUCKET, Key=key)
+        return True
+    except s3.exceptions.ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
 
-def mistral_pdf_to_md(pdf_bytes: bytes, file_name: str, condition: str):
-    """Use Mistral OCR to convert PDF to Markdown and upload result"""
-    client = Mistral(api_key=MISTRAL_API_KEY)
-    pdf_bytes_io = io.BytesIO(pdf_bytes)
 
+def store_image(img_base64: str):
+    """
+    Upload one image under a key derived from its content hash and return
+    (filename, url, uploaded). Identical images, in this run or a previous one,
+    are uploaded once.
+    """
+    data, fmt = prepare_image(img_base64)
+    filename = f"{hashlib.sha256(data).hexdigest()[:32]}.{'jpg' if fmt == 'jpeg' else fmt}"
+    s3_key = f"{IMAGE_PREFIX}/{filename}"
+    url = f"https://{AWS_BUCKET}.s3.amazonaws.com/{s3_key}"
+
+    with _image_lock:
+        pending = _image_uploads.get(s3_key)
+        owner = pending is None
+        if owner:
+            pending = _image_uploads[s3_key] = Future()
+    if not owner:
+        return pending.result()[0], url, False
+
+    try:
+        # Each S3 call is retried on its own, so a transient error does not fail the page range
+        exists, _ = with_backoff(s3_object_exists, s3_key, what=f"check image {filename}")
+        uploaded = not exists
+        if uploaded:
+            with_backoff(upload_to_s3, AWS_BUCKET, s3_key, data, content_type=WEB_IMAGE_FORMATS[fmt],
+                         what=f"upload image {filename}")
+        pending.set_result((filename, url))
+        return filename, url, uploaded
+    except Exception as e:
+        with _image_lock:
+            _image_uploads.pop(s3_key, None)
+        pending.set_exception(e)
+        raise
+
+
+def upload_page_images(pages) -> tuple:
+    """
+    Upload the images of every OCR page concurrently.
+    Returns ({(page_index, img_id): (filename, url)}, number of new uploads).
+    """
+    futures = {
+        (page.index, img.id): image_pool.submit(store_image, img.image_base64)
+        for page in pages for img in page.images
+    }
+    links, uploaded = {}, 0
+    for ref, future in futures.items():
+        filename, url, is_new = future.result()
+        links[ref] = (filename, url)
+        uploaded += is_new
+    return links, uploaded
+
+
+def replace_image_references(md: str, links: dict) -> str:
+    """Swap every `![id](id)` placeholder for its S3 image link in a single pass over the page"""
+    def substitute(match):
+        link = links.get(match.group(2))
+        return f"![{link[0]}]({link[1]})" if link else match.group(0)
+
+    return IMAGE_LINK_PATTERN.sub(substitute, md)
+
+
+def count_pdf_pages(pdf_bytes: bytes):
+    """Page count from the PDF itself, or None if pypdf cannot read it"""
     try:
-        print(f"🔁 Uploading {file_name}.pdf to Mistral...")
-        uploaded = client.files.upload(file={"file_name": "temp.pdf", "content": pdf_bytes_io.read()}, purpose="ocr")
-        signed_url = client.files.get_signed_url(file_id=uploaded.id, expiry=2)
-        result = client.ocr.process(
-            document=DocumentURLChunk(document_url=signed_url.url),
-            model="mistral-ocr-latest",
-            include_image_base64=True
-        )
+        return len(PdfReader(io.BytesIO(pdf_bytes)).pages)
     except Exception as e:
-        print(f"❌ Mistral OCR failed for {file_name}: {e}")
-        return
+        print(f"⚠️ Could not read page count ({e}); sending the whole document in one request")
+        return None
+
+
+def page_ranges(page_indices, pages_per_request: int = OCR_PAGES_PER_REQUEST, page_count=None):
+    """
+    Split page indices into OCR requests of up to `pages_per_request` pages.
+    A single None range means the whole document (every page, small enough for one request).
+    """
+    page_indices = list(page_indices)
+    whole_document = page_count is None or len(page_indices) == page_count
+    if whole_document and (pages_per_request <= 0 or len(page_indices) <= pages_per_request):
+        return [None]
+    if pages_per_request <= 0:
+        return [page_indices]
+    return [page_indices[start:start + pages_per_request]
+            for start in range(0, len(page_indices), pages_per_request)]
+
+
+def ocr_page_range(document_url: str, pages, file_name: str):
+    """OCR one page range of an already-uploaded document"""
+    label = f"{file_name} pages {pages[0] + 1}-{pages[-1] + 1}" if pages else file_name
+    print(f"🔍 OCR {label}...")
+    RATE_LIMITERS["mistral"].acquire()
+    options = {"pages": pages} if pages else {}
+    result = mistral_client.ocr.process(
+        document=DocumentURLChunk(document_url=document_url),
+        model="mistral-ocr-latest",
+        include_image_base64=True,
+        **options
+    )
+    return result.pages
+
+
+def upload_for_ocr(pdf_bytes: bytes, file_name: str) -> str:
+    """Upload the PDF to Mistral and return a signed URL the OCR requests can read"""
+    print(f"🔁 Uploading {file_name}.pdf to Mistral...")
+    RATE_LIMITERS["mistral"].acquire()
+    uploaded = mistral_client.files.upload(file={"file_name": f"{file_name}.pdf", "content": pdf_bytes}, purpose="ocr")
+    RATE_LIMITERS["mistral"].acquire()
+    return mistral_client.files.get_signed_url(file_id=uploaded.id, expiry=2).url
+
+
+def ocr_pages(pdf_bytes: bytes, file_name: str, ranges, max_attempts: int = OCR_MAX_ATTEMPTS):
+    """
+    Upload the PDF once and OCR every range concurrently. The upload and each
+    range are retried on their own, so a flaky range never re-runs the others.
+    Returns (pages, retries).
+    """
+    document_url, upload_attempts = with_backoff(upload_for_ocr, pdf_bytes, file_name,
+                                                 what=f"upload {file_name}", max_attempts=max_attempts)
+
+    with ThreadPoolExecutor(max_workers=min(OCR_RANGE_CONCURRENCY, len(ranges))) as pool:
+        futures = [
+            pool.submit(with_backoff, ocr_page_range, document_url, pages, file_name,
+                        what=f"OCR {file_name} range {idx + 1}/{len(ranges)}", max_attempts=max_attempts)
+            for idx, pages in enumerate(ranges)
+        ]
+        results = [future.result() for future in futures]
+
+    retries = (upload_attempts - 1) + sum(attempts - 1 for _, attempts in results)
+    return [page for range_pages, _ in results for page in range_pages], retries
+
+
+def mistral_pdf_to_md(pdf_bytes: bytes, file_name: str, condition: str,
+                      pages_per_request: int = OCR_PAGES_PER_REQUEST, use_text_layer: bool = USE_TEXT_LAYER,
+                      max_attempts: int = OCR_MAX_ATTEMPTS):
+    """
+    Convert a PDF to Markdown and upload the result. Raises on OCR failure.
+
+    Pages with an embedded text layer and no images are converted locally; scanned
+    pages and pages with images (which OCR extracts and uploads) go to Mistral OCR. The PDF is uploaded once and the scanned pages are OCR'd
+    as concurrent page ranges, then everything is stitched back in page order.
+    `max_attempts` applies to each Mistral call on its own, not to the document.
+    """
+    text_layer = extract_text_layer(pdf_bytes)
+    page_count = len(text_layer) if text_layer is not None else None
+
+    local_pages = {}
+    if use_text_layer and text_layer:
+        local_pages = {idx: text_to_markdown(text) for idx, (text, has_images) in enumerate(text_layer)
+                       if not has_images and has_text_layer(text)}
+    scanned = [idx for idx in range(page_count or 0) if idx not in local_pages]
+
+    ranges = []
+    if page_count is None:
+        ranges = [None]
+    elif scanned:
+        ranges = page_ranges(scanned, pages_per_request, page_count)
+    image_pages = sum(1 for _, has_images in text_layer or [] if has_images)
+    print(f"📑 {file_name}: {len(local_pages)} page(s) from text layer, "
+          f"{len(scanned) if page_count is not None else 'all'} page(s) to OCR in {len(ranges)} request(s) "
+          f"({image_pages} with images)")
+
+    ocr_results, ocr_retries = [], 0
+    if ranges:
+        try:
+            ocr_results, ocr_retries = ocr_pages(pdf_bytes, file_name, ranges, max_attempts)
+        except Exception as e:
+            print(f"❌ Mistral OCR failed for {file_name}: {e}")
+            raise
+
+    # Image ids restart in every OCR request, so links are looked up per page index
+    image_links, images_uploaded = upload_page_images(ocr_results)
 
     full_markdown = ""
-    image_counter = 0
 
-    for page in result.pages:
-        images = {img.id: img.image_base64 for img in page.images}
-        md_with_links = replace_image_references(page.markdown, images, condition, file_name)
-        full_markdown += md_with_links + "\n\n"
-        image_counter += len(images)
+    pages = [(idx, markdown, None) for idx, markdown in local_pages.items()]
+    pages += [(page.index, page.markdown, page) for page in ocr_results]
+    for idx, markdown, page in sorted(pages, key=lambda item: item[0]):
+        if page is not None:
+            page_links = {img.id: image_links[(idx, img.id)] for img in page.images}
+            markdown = replace_image_references(markdown, page_links)
+        # Page markers let the chunking stage spot running headers/footers per page
+        full_markdown += f"<!-- page {idx + 1} -->\n\n{markdown}\n\n"
 
     md_key = f"Markdown_Conversions/{condition}/{file_name}.md"
-    upload_to_s3(AWS_BUCKET, md_key, full_markdown.encode("utf-8"))
+    # Retried on its own: by now the OCR for this document has already been paid for
+    with_backoff(upload_to_s3, AWS_BUCKET, md_key, full_markdown.encode("utf-8"),
+                 what=f"upload {md_key}", max_attempts=max_attempts)
 
     return {
         "markdown_s3_path": md_key,
-        "images_uploaded": image_counter,
+        "pages": len(pages),
+        "text_layer_pages": len(local_pages),
+        "ocr_pages": len(ocr_results),
+        "ocr_requests": len(ranges),
+        "ocr_retries": ocr_retries,
+        "images_referenced": len(image_links),
+        "images_uploaded": images_uploaded,
         "preview_url": f"https://{AWS_BUCKET}.s3.amazonaws.com/{md_key}"
     }
 
-def process_pdf_from_s3(file_name: str):
-    """Downloads PDF from S3 and processes it"""
+def download_pdf(s3_key: str) -> bytes:
+    RATE_LIMITERS["s3"].acquire()
+    response = s3.get_object(Bucket=AWS_BUCKET, Key=s3_key)
+    return response["Body"].read()
+
+
+def process_pdf_from_s3(file_name: str, max_attempts: int = OCR_MAX_ATTEMPTS):
+    """
+    Downloads PDF from S3 and processes it. Each network call is retried on its
+    own; raises once one of them has used up `max_attempts`.
+    """
     s3_key = f"RAW_PDFs/{file_name}"
     file_name_no_ext = os.path.splitext(file_name)[0]
     condition = get_condition_from_filename(file_name)
 
     print(f"📥 Downloading {file_name} from s3://{AWS_BUCKET}/{s3_key}...")
     try:
-        response = s3.get_object(Bucket=AWS_BUCKET, Key=s3_key)
-        pdf_bytes = response["Body"].read()
+        pdf_bytes, _ = with_backoff(download_pdf, s3_key, what=f"download {file_name}", max_attempts=max_attempts)
     except Exception as e:
         print(f"❌ Failed to download {file_name} from S3:", str(e))
-        return
+        raise
+
+    result = mistral_pdf_to_md(pdf_bytes, file_name_no_ext, condition, max_attempts=max_attempts)
+    print(f"✅ Markdown and images uploaded for {file_name}:")
+    print(f"📝 {result['preview_url']}")
+    print(f"🖼️ Images uploaded: {result['images_uploaded']}")
+    return result
+
+
+# ==== Resumable Parallel Pipeline ====
+def load_progress(path: str = OCR_PROGRESS_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_progress(progress: dict, path: str = OCR_PROGRESS_PATH):
+    """Write the manifest atomically so an interrupted run never leaves it half-written"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(progress, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_pipeline(pdf_files, workers: int = OCR_WORKERS, max_attempts: int = OCR_MAX_ATTEMPTS,
+                 progress_path: str = OCR_PROGRESS_PATH, force: bool = False) -> dict:
+    """
+    OCR many PDFs concurrently. Every finished or failed document is recorded in
+    the progress manifest; documents already marked done are skipped on the next
+    run unless `force` is set. Retries happen per download, upload and OCR page
+    range (`max_attempts` each); a failed document is left for the next run.
+    """
+    progress = load_progress(progress_path)
+    pending = [f for f in pdf_files if force or progress.get(f, {}).get("status") != "done"]
+    skipped = len(pdf_files) - len(pending)
+    print(f"🗂️ {len(pending)} PDFs to process, {skipped} already done (manifest: {progress_path})")
+
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def run_one(file_name: str):
+        doc_start = time.perf_counter()
+        try:
+            entry = {"status": "done", **process_pdf_from_s3(file_name, max_attempts)}
+        except Exception as e:
+            entry = {"status": "failed", "error": str(e)}
+        entry["seconds"] = round(time.perf_counter() - doc_start, 1)
+        entry["finished_at"] = datetime.now(timezone.utc).isoformat()
+        with lock:
+            progress[file_name] = entry
+            save_progress(progress, progress_path)
+        return file_name, entry
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_one, f) for f in pending]
+        for future in as_completed(futures):
+            file_name, entry = future.result()
+            icon = "✅" if entry["status"] == "done" else "❌"
+            print(f"{icon} {file_name}: {entry['status']} ({entry.get('ocr_retries', 0)} OCR retries), {entry['seconds']}s")
+
+    done = sum(1 for f in pdf_files if progress.get(f, {}).get("status") == "done")
+    print(f"\n🏁 {done}/{len(pdf_files)} PDFs done in {time.perf_counter() - start:.1f}s")
+    return progress
 
-    result = mistral_pdf_to_md(pdf_bytes, file_name_no_ext, condition)
-    if result:
-        print("✅ Markdown and images uploaded:")
-        print(f"📝 {result['preview_url']}")
-        print(f"🖼️ Images uploaded: {result['images_uploaded']}")
 
 if __name__ == "__main__":
     # Chronic condition PDFs (your list)
@@ -129,6 +451,14 @@ if __name__ == "__main__":
         "Obesity_Food_1.pdf"
     ]
 
-    for pdf in pdf_files:
-        print(f"\n📄 Processing: {pdf}")
-        process_pdf_from_s3(pdf)
+    parser = argparse.ArgumentParser(description="OCR PDFs from S3 to markdown with Mistral")
+    parser.add_argument("files", nargs="*", help="PDF names under RAW_PDFs/ (default: the chronic condition list)")
+    parser.add_argument("--workers", type=int, default=OCR_WORKERS)
+    parser.add_argument("--max-attempts", type=int, default=OCR_MAX_ATTEMPTS,
+                        help="Attempts per download, upload and OCR page range")
+    parser.add_argument("--progress", default=OCR_PROGRESS_PATH, help="Progress manifest used to resume runs")
+    parser.add_argument("--force", action="store_true", help="Re-process PDFs already marked done")
+    args = parser.parse_args()
+
+    run_pipeline(args.files or pdf_files, workers=args.workers, max_attempts=args.max_attempts,
+                 progress_path=args.progress, force=args.force)
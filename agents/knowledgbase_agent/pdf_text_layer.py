@@ -0,0 +1,137 @@
+# FILE: agents/knowledgbase_agent/pdf_text_layer.py
+
+import io
+import os
+import re
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pypdf import PdfReader
+
+# ==== Load Environment ====
+load_dotenv()
+
+# ==== Text Layer Config ====
+TEXT_LAYER_MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", "200"))              # below this a page is treated as a scan
+TEXT_LAYER_MIN_IMAGE_SIDE = int(os.getenv("TEXT_LAYER_MIN_IMAGE_SIDE", "64"))      # smaller images are bullets/rules
+HEADING_MAX_WORDS = 8
+HEADING_MAX_CHARS = 60
+
+BULLET_PATTERN = re.compile(r"^\s*(?:[•●▪◦‣∙·\-\*]|\d{1,3}[.)])\s+")
+SECTION_NUMBER = re.compile(r"^\d{1,2}(?:\.\d{1,2})+\.?\s+\S")
+MINOR_WORDS = {"a", "an", "and", "as", "at", "by", "for", "from", "in", "of", "on", "or", "per", "the", "to", "vs", "with"}
+
+
+def _has_image_xobject(resources, depth: int = 0) -> bool:
+    """True if a resource dictionary draws a real image, directly or through a form XObject"""
+    if resources is None or depth > 3:
+        return False
+    xobjects = resources.get_object().get("/XObject")
+    if xobjects is None:
+        return False
+    for ref in xobjects.get_object().values():
+        xobject = ref.get_object()
+        subtype = xobject.get("/Subtype")
+        if subtype == "/Image":
+            if min(int(xobject.get("/Width", 0)), int(xobject.get("/Height", 0))) >= TEXT_LAYER_MIN_IMAGE_SIDE:
+                return True
+        elif subtype == "/Form" and _has_image_xobject(xobject.get("/Resources"), depth + 1):
+            return True
+    return False
+
+
+def page_has_images(page) -> bool:
+    """True when the page shows an image OCR would extract; read from the page resources, nothing is decoded"""
+    try:
+        return _has_image_xobject(page.get("/Resources"))
+    except Exception:
+        return True  # unreadable resources: let OCR handle the page
+
+
+def extract_text_layer(pdf_bytes: bytes) -> Optional[List[Tuple[str, bool]]]:
+    """
+    (embedded text, has images) of every page ('' where there is no text), or
+    None if pypdf cannot read the PDF.
+    """
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+    except Exception as e:
+        print(f"⚠️ Could not read PDF locally ({e}); sending the whole document to OCR")
+        return None
+
+    pages = []
+    for page in reader.pages:
+        try:
+            text = page.extract_text() or ""
+        except Exception:
+            text = ""
+        pages.append((text, page_has_images(page)))
+    return pages
+
+
+def has_text_layer(text: str) -> bool:
+    """True when a page carries enough real text to skip OCR (scans and figure-only pages do not)"""
+    alnum = sum(ch.isalnum() for ch in text)
+    if alnum < TEXT_LAYER_MIN_CHARS:
+        return False
+    # Fonts without a unicode map extract as "(cid:123)" glyph codes; treat those pages as scans
+    return text.count("(cid:") * 8 < alnum
+
+
+def is_heading(block: str, single_line: bool) -> bool:
+    """
+    Conservative title test for a text-layer block. Every heading is carried
+    into the following chunks by the splitter, so only a standalone short line
+    that is ALL CAPS, Title Case or numbered like "2.1 Diet" is promoted;
+    labels, table cells and short sentences stay plain text.
+    """
+    words = block.split()
+    if (not single_line or block.startswith("- ") or not words or len(words) > HEADING_MAX_WORDS
+            or len(block) > HEADING_MAX_CHARS or block[-1] in ".,;:!?"):
+        return False
+    letters = sum(ch.isalpha() for ch in block)
+    if letters < 4:
+        return False
+    if block.isupper():
+        return True
+    if SECTION_NUMBER.match(block):
+        return words[1][:1].isupper()
+    significant = [word for word in words if word.lower() not in MINOR_WORDS]
+    return len(words) >= 2 and all(word[:1].isupper() for word in significant)
+
+
+def text_to_markdown(text: str) -> str:
+    """
+    Light markdown from a pypdf text layer: rejoin wrapped lines into paragraphs,
+    undo end-of-line hyphenation, keep bullet items as list lines and promote
+    standalone title lines to headings.
+    """
+    blocks, paragraph = [], []
+
+    def flush():
+        if paragraph:
+            blocks.append((" ".join(paragraph), len(paragraph) == 1))
+            paragraph.clear()
+
+    for raw in text.splitlines():
+        line = " ".join(raw.split())
+        if not line:
+            flush()
+            continue
+        if BULLET_PATTERN.match(line):
+            flush()
+            blocks.append(("- " + BULLET_PATTERN.sub("", line, count=1), True))
+            continue
+        if paragraph and paragraph[-1].endswith("-") and line[:1].islower():
+            paragraph[-1] = paragraph[-1][:-1] + line
+        else:
+            paragraph.append(line)
+    flush()
+
+    markdown = []
+    for block, single_line in blocks:
+        if block.startswith("- ") and markdown and markdown[-1].startswith("- "):
+            markdown[-1] += "\n" + block  # keep list items in one list
+            continue
+        markdown.append(f"## {block}" if is_heading(block, single_line) else block)
+    return "\n\n".join(markdown)
@@ -3,6 +3,8 @@
 import os
 from dotenv import load_dotenv
 from pinecone import Pinecone
+from agents.knowledgbase_agent.local_index import LocalVectorIndex, chunk_store
+from agents.knowledgbase_agent.bm25_index import BM25Index, as_match, reciprocal_rank_fusion
 
 # ==== Load Environment ====
 load_dotenv()
@@ -11,22 +13,115 @@ load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX = os.getenv("INDEX_NAME")  # e.g., "chronic-health-index"
 
+# "local": search the memory-mapped local snapshot, falling back to Pinecone when a condition has none
+# "pinecone": always query Pinecone
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "local")
+
+# "hybrid": dense + BM25 fused by reciprocal rank; "dense": vector search only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "15"))  # per retriever, before fusion
+FETCH_BATCH_SIZE = 100  # ids per Pinecone fetch when chunk texts are missing locally
+# Queries return ids and scores only; chunk texts come from the local chunk store. The text copy
+# in Pinecone metadata is read (by id, via fetch) only for chunks this host's store does not have.
+
 # ==== Init Pinecone Client ====
 pc = Pinecone(api_key=PINECONE_API_KEY)
 index = pc.Index(PINECONE_INDEX)
 
+# ==== Init Local Indexes ====
+local_index = LocalVectorIndex()
+bm25_index = BM25Index()
+
+
+def query_chunks(query_embedding, condition: str, top_k: int = 15, hydrate: bool = True):
+    """
+    Query the configured vector backend for one condition.
+
+    The local index answers when VECTOR_BACKEND is "local" and a snapshot exists
+    for the condition; otherwise (or on any local error) Pinecone is queried.
+    Chunk texts are filled in from the local chunk store unless `hydrate` is False.
+    """
+    matches = None
+    if VECTOR_BACKEND == "local":
+        try:
+            matches = local_index.query(query_embedding, condition, top_k=top_k)
+            if matches is not None:
+                print(f"⚡ Local index returned {len(matches)} chunks for '{condition}', top_k={top_k}")
+            else:
+                print(f"ℹ️ No local snapshot for '{condition}', falling back to Pinecone.")
+        except Exception as e:
+            print(f"⚠️ Local index query failed, falling back to Pinecone: {e}")
+
+    if matches is None:
+        matches = query_chunks_from_pinecone(query_embedding, condition, top_k=top_k)
+    return chunk_store.hydrate(matches, fetch_chunk_texts) if hydrate else matches
+
+
+def hybrid_query_chunks(query_text: str, query_embedding, condition: str, top_k: int = 15):
+    """
+    Dense results fused with BM25 lexical results by reciprocal-rank fusion.
+
+    Exact terms like drug names, lab values and acronyms that embed poorly are
+    still ranked high by BM25. Falls back to dense-only when RETRIEVAL_MODE is
+    "dense" or the condition has no BM25 index.
+    """
+    if RETRIEVAL_MODE != "hybrid":
+        return query_chunks(query_embedding, condition, top_k=top_k)
+
+    # Only the fused top_k need their texts, so candidates are hydrated after fusion
+    dense = query_chunks(query_embedding, condition, top_k=max(top_k, HYBRID_CANDIDATES), hydrate=False)
+    try:
+        lexical = bm25_index.query(query_text, condition, top_k=max(top_k, HYBRID_CANDIDATES))
+    except Exception as e:
+        print(f"⚠️ BM25 query failed, using dense results only: {e}")
+        lexical = None
+
+    if lexical is None:
+        print(f"ℹ️ No BM25 index for '{condition}', using dense results only.")
+        return chunk_store.hydrate(dense[:top_k], fetch_chunk_texts)
+
+    fused = reciprocal_rank_fusion([dense, lexical], top_k=top_k)
+    print(f"🔀 Hybrid retrieval for '{condition}': {len(dense)} dense + {len(lexical)} BM25 → {len(fused)} fused")
+    return chunk_store.hydrate(fused, fetch_chunk_texts)
+
+
+def fetch_chunk_texts(ids: list[str]) -> dict:
+    """
+    Chunk texts from Pinecone metadata for ids the local chunk store does not
+    have (e.g. on a host that did not run ingestion): id → (text, metadata).
+    """
+    texts = {}
+    for start in range(0, len(ids), FETCH_BATCH_SIZE):
+        response = index.fetch(ids=ids[start:start + FETCH_BATCH_SIZE])
+        for vid, vector in response.vectors.items():
+            metadata = dict(vector.metadata or {})
+            if metadata.get("text"):
+                texts[vid] = (metadata.pop("text"), metadata)
+    print(f"📥 Fetched {len(texts)}/{len(ids)} chunk texts from Pinecone metadata")
+    return texts
+
+
+def chunk_vectors(condition: str, ids: list[str]) -> dict:
+    """Stored vectors for retrieved chunk ids, read from the local snapshot (empty if there is none)."""
+    try:
+        return local_index.vectors(condition, ids)
+    except Exception as e:
+        print(f"⚠️ Local vector lookup failed: {e}")
+        return {}
+
 
 def query_chunks_from_pinecone(query_embedding, condition: str, top_k: int = 15):
     """
-    Query Pinecone using a vector and filter by condition.
-    
+    Query Pinecone using a vector and filter by condition. Only ids and scores
+    come back; `query_chunks` hydrates the texts from the local chunk store.
+
     Args:
         query_embedding (list[float]): Embedding vector
         condition (str): e.g. "Cholesterol"
         top_k (int): Number of results to retrieve
 
     Returns:
-        List[dict]: Matching Pinecone chunks with metadata
+        List[dict]: Matching Pinecone chunk ids and scores (empty metadata)
     """
     try:
         print(f"\n🔍 Pinecone Query for condition: '{condition}', top_k={top_k}")
@@ -36,16 +131,14 @@ def query_chunks_from_pinecone(query_embedding, condition: str, top_k: int = 15)
             vector=query_embedding,
             top_k=top_k,
             filter={"condition": condition},
-            include_metadata=True
+            include_metadata=False
         )
 
-        matches = response.get("matches", [])
+        matches = [as_match(match) for match in response.get("matches", [])]
         print(f"✅ Pinecone returned {len(matches)} chunks.")
-        
+
         if not matches:
             print("⚠️ Warning: No results found. Check if metadata is uploaded correctly.")
-        else:
-            print("🧾 Sample matched metadata:", matches[0]["metadata"] if matches[0].get("metadata") else "No metadata in match")
 
         return matches
 
@@ -75,10 +168,11 @@ def query_multiple_conditions(query_embedding, conditions: list[str], top_k: int
             vector=query_embedding,
             top_k=top_k,
             filter=filter_query,
-            include_metadata=True
+            include_metadata=False
         )
 
-        matches = response.get("matches", [])
+        matches = chunk_store.hydrate([as_match(match) for match in response.get("matches", [])],
+                                      fetch_chunk_texts)
         print(f"✅ Pinecone returned {len(matches)} results for multiple conditions.")
         if matches:
             print("🧾 Sample metadata:", matches[0]["metadata"] if matches[0].get("metadata") else "No metadata")
@@ -0,0 +1,266 @@
+# FILE: agents/knowledgbase_agent/semantic_cache.py
+
+import os
+import re
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from agents.knowledgbase_agent.embedding_cache import KB_DATA_DIR
+
+# ==== Load Environment ====
+load_dotenv()
+
+# ==== Cache Config ====
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", os.path.join(KB_DATA_DIR, "semantic_cache.sqlite3"))
+# Embedding similarity alone is too loose for medical questions ("can"/"can't", 5 mg/50 mg and
+# one drug for another often score above 0.95), so every hit must also pass `same_question_frame`
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+SEMANTIC_CACHE_MAX_PER_CONDITION = int(os.getenv("SEMANTIC_CACHE_MAX_PER_CONDITION", "1000"))
+
+
+# ==== Question Guard ====
+NEGATIONS = {"not", "no", "never", "without", "avoid", "nor", "none", "stop"}
+STOPWORDS = {"a", "an", "the", "i", "my", "me", "is", "are", "am", "be", "do", "does", "can", "could", "should",
+             "would", "will", "it", "to", "of", "in", "on", "for", "with", "and", "or", "if", "what", "which",
+             "how", "when", "much", "many", "any", "some", "this", "that", "there", "have", "has", "get"}
+QUESTION_TOKEN = re.compile(r"\d+(?:\.\d+)?|[a-z]+")
+
+
+def question_terms(question: str) -> List[str]:
+    """Lowercased word and number tokens with negated contractions expanded ("can't" → "can not")."""
+    text = question.lower().replace("’", "'").replace("cannot", "can not").replace("won't", "will not")
+    return QUESTION_TOKEN.findall(re.sub(r"n't\b", " not", text))
+
+
+def _stem(token: str) -> str:
+    return token[:-1] if len(token) > 3 and token.endswith("s") else token
+
+
+def same_question_frame(cached: str, question: str) -> bool:
+    """
+    Guard on top of embedding similarity: two questions may share an answer only
+    if they agree on negation, on every number with its unit, and are not the
+    same sentence with one or two content words swapped (a different drug,
+    food or test). A rejected near-duplicate is just a cache miss.
+    """
+    a, b = question_terms(cached), question_terms(question)
+    if {t for t in a if t in NEGATIONS} != {t for t in b if t in NEGATIONS}:
+        return False
+
+    def quantities(tokens):
+        return {(t, tokens[i + 1] if i + 1 < len(tokens) else "") for i, t in enumerate(tokens) if t[0].isdigit()}
+
+    if quantities(a) != quantities(b):
+        return False
+    if len(a) == len(b):
+        swapped = [(x, y) for x, y in zip(a, b) if _stem(x) != _stem(y)]
+        if 0 < len(swapped) <= 2 and all(x not in STOPWORDS and y not in STOPWORDS for x, y in swapped):
+            return False
+    return True
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# ==== Per-Condition Entries ====
+class _ConditionEntries:
+    """Answers cached for one condition, with question vectors stacked for a single matmul lookup."""
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self.versions: List[int] = []
+        self.created_at: List[float] = []
+        self.vectors: Optional[np.ndarray] = None
+
+    def add(self, row_id: int, question: str, answer: str, version: int, created_at: float, vector: np.ndarray):
+        self.ids.append(row_id)
+        self.questions.append(question)
+        self.answers.append(answer)
+        self.versions.append(version)
+        self.created_at.append(created_at)
+        row = vector[None, :]
+        self.vectors = row if self.vectors is None else np.vstack([self.vectors, row])
+
+    def keep(self, mask: np.ndarray) -> List[int]:
+        """Drop entries where mask is False; returns the removed row ids."""
+        removed = [row_id for row_id, kept in zip(self.ids, mask) if not kept]
+        if removed:
+            idx = np.flatnonzero(mask)
+            self.ids = [self.ids[i] for i in idx]
+            self.questions = [self.questions[i] for i in idx]
+            self.answers = [self.answers[i] for i in idx]
+            self.versions = [self.versions[i] for i in idx]
+            self.created_at = [self.created_at[i] for i in idx]
+            self.vectors = self.vectors[idx] if len(idx) else None
+        return removed
+
+    def __len__(self):
+        return len(self.ids)
+
+
+# ==== Semantic Answer Cache ====
+class SemanticAnswerCache:
+    """
+    Per-condition cache of knowledge-base answers keyed by question embedding.
+
+    A new question is answered from the cache when its cosine similarity to a
+    cached question for the same condition is at least `threshold` and the two
+    pass `same_question_frame` (same negation, doses and subject). Entries
+    expire after `ttl_seconds` and are dropped as soon as the condition's
+    corpus version moves past the one they were answered under. Entries are
+    persisted to SQLite so they survive restarts.
+    """
+
+    def __init__(self, path: str = SEMANTIC_CACHE_PATH, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds: int = SEMANTIC_CACHE_TTL_SECONDS, max_per_condition: int = SEMANTIC_CACHE_MAX_PER_CONDITION):
+        self.path = path
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_per_condition = max_per_condition
+
+        self._entries: Dict[str, _ConditionEntries] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "guard_rejections": 0}
+        self._db: Optional[sqlite3.Connection] = None
+
+    # ---- SQLite persistence ----
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._db is None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS semantic_answers ("
+                    "id INTEGER PRIMARY KEY AUTOINCREMENT, condition TEXT NOT NULL, question TEXT NOT NULL, "
+                    "answer TEXT NOT NULL, corpus_version INTEGER NOT NULL, created_at REAL NOT NULL, vector BLOB NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS ix_semantic_answers_condition ON semantic_answers (condition)")
+                db.commit()
+                self._db = db
+            except sqlite3.Error as e:
+                print(f"⚠️ Semantic cache persistence unavailable: {e}")
+        return self._db
+
+    def _load(self, condition: str) -> _ConditionEntries:
+        entries = self._entries.get(condition)
+        if entries is not None:
+            return entries
+
+        entries = _ConditionEntries()
+        db = self._connect()
+        if db is not None:
+            try:
+                rows = db.execute(
+                    "SELECT id, question, answer, corpus_version, created_at, vector FROM semantic_answers "
+                    "WHERE condition = ? AND created_at >= ? ORDER BY created_at",
+                    (condition, time.time() - self.ttl_seconds)
+                ).fetchall()
+                for row_id, question, answer, version, created_at, blob in rows[-self.max_per_condition:]:
+                    entries.add(row_id, question, answer, version, created_at, np.frombuffer(blob, dtype=np.float32))
+                print(f"🗂️ Loaded {len(entries)} cached answers for {condition}")
+            except sqlite3.Error as e:
+                print(f"⚠️ Semantic cache load failed: {e}")
+        self._entries[condition] = entries
+        return entries
+
+    def _delete(self, row_ids: List[Optional[int]]) -> None:
+        row_ids = [row_id for row_id in row_ids if row_id is not None]
+        db = self._connect()
+        if db is None or not row_ids:
+            return
+        try:
+            db.executemany("DELETE FROM semantic_answers WHERE id = ?", [(row_id,) for row_id in row_ids])
+            db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Semantic cache delete failed: {e}")
+
+    def _expire(self, entries: _ConditionEntries, corpus_version: int) -> None:
+        if not len(entries):
+            return
+        now = time.time()
+        mask = np.array([
+            version == corpus_version and now - created < self.ttl_seconds
+            for version, created in zip(entries.versions, entries.created_at)
+        ], dtype=bool)
+        removed = entries.keep(mask)
+        if removed:
+            self._stats["evictions"] += len(removed)
+            self._delete(removed)
+
+    # ---- Lookup / Store ----
+    def lookup(self, condition: str, question: str, query_vector, corpus_version: int) -> Optional[str]:
+        """Return the cached answer for the nearest cached question that is close enough and asks the same thing."""
+        with self._lock:
+            entries = self._load(condition)
+            self._expire(entries, corpus_version)
+            if not len(entries):
+                self._stats["misses"] += 1
+                return None
+
+            sims = entries.vectors @ _unit(query_vector)
+            candidates = np.flatnonzero(sims >= self.threshold)
+            for best in candidates[np.argsort(-sims[candidates])]:
+                if not same_question_frame(entries.questions[best], question):
+                    self._stats["guard_rejections"] += 1
+                    print(f"🚧 Semantic cache skipped a near-duplicate for {condition} (cos={sims[best]:.3f}): "
+                          f"'{entries.questions[best]}' vs '{question}'")
+                    continue
+                self._stats["hits"] += 1
+                print(f"🎯 Semantic cache hit for {condition} (cos={sims[best]:.3f}): '{entries.questions[best]}'")
+                return entries.answers[best]
+
+            self._stats["misses"] += 1
+            return None
+
+    def store(self, condition: str, question: str, query_vector, answer: str, corpus_version: int) -> None:
+        vector = _unit(query_vector)
+        created_at = time.time()
+        with self._lock:
+            entries = self._load(condition)
+            row_id = None
+            db = self._connect()
+            if db is not None:
+                try:
+                    cursor = db.execute(
+                        "INSERT INTO semantic_answers (condition, question, answer, corpus_version, created_at, vector) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (condition, question, answer, corpus_version, created_at, vector.tobytes())
+                    )
+                    db.commit()
+                    row_id = cursor.lastrowid
+                except sqlite3.Error as e:
+                    print(f"⚠️ Semantic cache write failed: {e}")
+
+            entries.add(row_id, question, answer, corpus_version, created_at, vector)
+            self._stats["stores"] += 1
+
+            overflow = len(entries) - self.max_per_condition
+            if overflow > 0:
+                mask = np.ones(len(entries), dtype=bool)
+                mask[:overflow] = False
+                removed = entries.keep(mask)
+                self._stats["evictions"] += len(removed)
+                self._delete(removed)
+
+    # ---- Metrics ----
+    def stats(self) -> Dict[str, float]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "lookups": lookups,
+            "hit_ratio": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "threshold": self.threshold,
+            "entries": {condition: len(entries) for condition, entries in self._entries.items()},
+        }
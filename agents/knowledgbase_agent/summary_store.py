@@ -0,0 +1,178 @@
+# FILE: agents/knowledgbase_agent/summary_store.py
+
+import os
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from postgres_db.database import AsyncSessionLocal
+from postgres_db.models import ConditionSummary
+from agents.knowledgbase_agent.corpus_version import aget_corpus_version
+from agents.knowledgbase_agent.knowledgebase_tool import (
+    arun_generate_summary,
+    retrieve_summary_context,
+    iter_summary_answers,
+    format_summary_section,
+)
+
+load_dotenv()
+
+# ==== Config ====
+KB_CONDITIONS = ["Cholesterol", "CKD", "Gluten", "Hypertension", "Polycystic", "Type2", "Obesity"]
+SUMMARY_REFRESH_INTERVAL_SECONDS = int(os.getenv("SUMMARY_REFRESH_INTERVAL_SECONDS", "900"))
+
+# Conditions whose summaries are currently being regenerated in the background
+_refreshing: set = set()
+_background_tasks: set = set()
+
+
+# ==== Summary Rows ====
+async def aload_latest_summary(condition: str) -> Optional[ConditionSummary]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ConditionSummary)
+            .where(ConditionSummary.condition == condition)
+            .order_by(ConditionSummary.corpus_version.desc())
+            .limit(1)
+        )
+        return result.scalars().first()
+
+
+async def asave_summary(condition: str, corpus_version: int, sections: List[Dict[str, str]]) -> None:
+    summary = render_summary(sections)
+    stmt = insert(ConditionSummary).values(
+        condition=condition, corpus_version=corpus_version, summary=summary, sections=sections
+    ).on_conflict_do_update(
+        constraint="uq_condition_summary_version",
+        set_={"summary": summary, "sections": sections}
+    )
+    async with AsyncSessionLocal() as db:
+        await db.execute(stmt)
+        await db.commit()
+    print(f"💾 Stored summary for {condition} @ corpus v{corpus_version}")
+
+
+def render_summary(sections: List[Dict[str, str]]) -> str:
+    return "\n\n".join(format_summary_section(s["question"], s["answer"]) for s in sections)
+
+
+# ==== Generation ====
+async def agenerate_sections(condition: str) -> Optional[List[Dict[str, str]]]:
+    context = await retrieve_summary_context(condition)
+    if context is None:
+        return None
+
+    answers = {}
+    async for idx, question, answer in iter_summary_answers(context):
+        answers[idx] = {"question": question, "answer": answer}
+    return [answers[idx] for idx in sorted(answers)]
+
+
+async def arefresh_summary(condition: str) -> bool:
+    """Regenerate and store the summary for the current corpus version. Returns True when stored."""
+    if condition in _refreshing:
+        return False
+
+    _refreshing.add(condition)
+    try:
+        version = await aget_corpus_version(condition)
+        print(f"🔄 Regenerating summary for {condition} @ corpus v{version}")
+        sections = await agenerate_sections(condition)
+        if not sections:
+            print(f"⚠️ No data to summarize for {condition}")
+            return False
+        await asave_summary(condition, version, sections)
+        return True
+    except Exception as e:
+        print(f"❌ Error refreshing summary for {condition}: {str(e)}")
+        return False
+    finally:
+        _refreshing.discard(condition)
+
+
+def schedule_refresh(condition: str) -> None:
+    """Regenerate a stale summary in the background without blocking the request."""
+    if condition not in _refreshing:
+        task = asyncio.get_running_loop().create_task(arefresh_summary(condition))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+async def arefresh_stale_summaries(conditions: List[str] = None) -> None:
+    """Precompute missing summaries and regenerate any stored under an older corpus version."""
+    for condition in conditions or KB_CONDITIONS:
+        try:
+            stored = await aload_latest_summary(condition)
+            current = await aget_corpus_version(condition)
+            if stored is None or stored.corpus_version < current:
+                await arefresh_summary(condition)
+        except Exception as e:
+            print(f"❌ Error checking summary for {condition}: {str(e)}")
+
+
+async def summary_refresh_loop() -> None:
+    """Long-running task started with the backend: keeps every condition summary current."""
+    while True:
+        await arefresh_stale_summaries()
+        await asyncio.sleep(SUMMARY_REFRESH_INTERVAL_SECONDS)
+
+
+# ==== Serving ====
+async def aget_summary(condition: str) -> str:
+    """
+    Serve the precomputed summary. A stale one (older corpus version) is served
+    immediately while a fresh one is generated in the background; a missing one
+    is generated inline and stored.
+    """
+    try:
+        stored = await aload_latest_summary(condition)
+        current = await aget_corpus_version(condition)
+    except Exception as e:
+        print(f"⚠️ Summary store unavailable, generating inline: {str(e)}")
+        return await arun_generate_summary(condition)
+
+    if stored is not None:
+        if stored.corpus_version < current:
+            print(f"♻️ Summary for {condition} is stale (v{stored.corpus_version} < v{current}), refreshing in background")
+            schedule_refresh(condition)
+        else:
+            print(f"⚡ Serving precomputed summary for {condition} @ corpus v{stored.corpus_version}")
+        return stored.summary
+
+    sections = await agenerate_sections(condition)
+    if not sections:
+        return "No data found for summary."
+    await asave_summary(condition, current, sections)
+    return render_summary(sections)
+
+
+async def astream_summary(condition: str) -> AsyncIterator[Dict[str, Any]]:
+    """Streaming variant of `aget_summary`: stored sections are emitted at once, new ones as they finish."""
+    try:
+        stored = await aload_latest_summary(condition)
+        if stored is not None and stored.sections:
+            current = await aget_corpus_version(condition)
+            if stored.corpus_version < current:
+                schedule_refresh(condition)
+            for idx, section in enumerate(stored.sections):
+                yield {"event": "section", "data": {"index": idx, **section}}
+            return
+
+        version = await aget_corpus_version(condition)
+        context = await retrieve_summary_context(condition)
+        if context is None:
+            yield {"event": "token", "data": "No data found for summary."}
+            return
+
+        answers = {}
+        async for idx, question, answer in iter_summary_answers(context):
+            answers[idx] = {"question": question, "answer": answer}
+            yield {"event": "section", "data": {"index": idx, "question": question, "answer": answer}}
+        await asave_summary(condition, version, [answers[idx] for idx in sorted(answers)])
+
+    except Exception as e:
+        print(f"❌ Error in astream_summary: {str(e)}")
+        yield {"event": "error", "data": f"❌ Error in run_generate_summary: {str(e)}"}
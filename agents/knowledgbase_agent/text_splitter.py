@@ -0,0 +1,146 @@
+# FILE: agents/knowledgbase_agent/text_splitter.py
+
+import io
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Tuple, Union
+
+import tiktoken
+
+# ==== Tokenizer ====
+EMBED_ENCODING = "cl100k_base"  # tokenizer of text-embedding-3-small
+PROMPT_ENCODING = "o200k_base"  # tokenizer of gpt-4o / gpt-4o-mini; stored `token_count` uses this
+HEADING_PATTERN = re.compile(r"^#{1,6}\s+\S")
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = EMBED_ENCODING):
+    return tiktoken.get_encoding(name)
+
+
+def count_tokens(text: str, encoding_name: str = EMBED_ENCODING) -> int:
+    return len(get_encoding(encoding_name).encode(text))
+
+
+def prompt_token_count(text: str) -> int:
+    """Tokens `text` costs in an LLM prompt; computed once per chunk at ingestion and stored as metadata."""
+    return count_tokens(text, PROMPT_ENCODING)
+
+
+def token_windows(encoding, ids: List[int], window: int) -> Iterator[Tuple[str, int]]:
+    """
+    Cut a token sequence into (text, tokens) pieces of at most `window` tokens.
+    Cuts only fall where the bytes so far decode as UTF-8, so a multibyte
+    character split across tokens is never halved into U+FFFD.
+    """
+    start = 0
+    while start < len(ids):
+        end = min(start + max(1, window), len(ids))
+        # Back off to a character boundary; a character longer than the window is kept whole
+        for cut in [*range(end, start, -1), *range(end + 1, len(ids) + 1)]:
+            try:
+                text = encoding.decode_bytes(ids[start:cut]).decode("utf-8")
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            cut, text = len(ids), encoding.decode(ids[start:])
+        yield text, cut - start
+        start = cut
+
+
+# ==== Streaming Token Chunker ====
+def stream_chunks(source: Union[str, Iterable[str]], max_tokens: int = 300, overlap_tokens: int = 50,
+                  encoding_name: str = EMBED_ENCODING) -> Iterator[str]:
+    """
+    Single-pass chunker over markdown lines, counting real tokens with tiktoken.
+
+    - Every line is encoded exactly once; chunk sizes are the sum of per-line counts.
+    - A markdown heading always starts a new chunk, and chunks that continue a
+      section are prefixed with that section's heading.
+    - Consecutive chunks in the same section share up to `overlap_tokens` of
+      trailing lines.
+    - A single line longer than the budget is cut into token windows on
+      character boundaries.
+    - Every line, headings included, is counted with its joining newline, so no
+      chunk exceeds `max_tokens`.
+
+    `source` may be a string or any iterable of lines (e.g. an open file or an
+    S3 body's `iter_lines()`); chunks are yielded as soon as they are complete.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+
+    encoding = get_encoding(encoding_name)
+    lines = io.StringIO(source) if isinstance(source, str) else source
+
+    heading: Tuple[str, int] = None          # (line, tokens) of the current section heading
+    current: deque = deque()                 # (line, tokens) segments of the chunk being built
+    current_tokens = 0
+    has_body = False                         # current holds more than heading/overlap carry-over
+
+    def emit() -> str:
+        return "\n".join(line for line, _ in current).strip()
+
+    def start_next(carry_overlap: bool):
+        nonlocal current_tokens, has_body
+        carry: List[Tuple[str, int]] = []
+        # Headings too long to leave room for body text are not repeated
+        prefix = heading if heading and heading[1] <= max_tokens // 2 else None
+        if carry_overlap and overlap_tokens:
+            budget = overlap_tokens
+            for line, tokens in reversed(current):
+                if tokens > budget or (heading and line == heading[0]):
+                    break
+                carry.append((line, tokens))
+                budget -= tokens
+            carry.reverse()
+
+        current.clear()
+        current_tokens = 0
+        if prefix:
+            current.append(prefix)
+            current_tokens = prefix[1]
+        for segment in carry:
+            current.append(segment)
+            current_tokens += segment[1]
+        has_body = False
+
+    for raw in lines:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        line = raw.rstrip("\r\n")
+        ids = encoding.encode(line) if line else []
+        tokens = len(ids) + 1  # +1 for the joining newline
+
+        if HEADING_PATTERN.match(line):
+            if has_body:
+                yield emit()
+            heading = (line, tokens)
+            start_next(carry_overlap=False)
+            if current:
+                continue
+            # Oversized heading: kept as body text of the new section instead of a prefix
+
+        if current_tokens + tokens > max_tokens and has_body:
+            yield emit()
+            start_next(carry_overlap=True)
+
+        if current_tokens + tokens > max_tokens:
+            # Line does not fit next to the heading/overlap: drop the overlap and cut it into token windows
+            start_next(carry_overlap=False)
+            window = max_tokens - current_tokens - 1
+            for piece, piece_tokens in token_windows(encoding, ids, window):
+                current.append((piece, piece_tokens + 1))
+                has_body = True
+                yield emit()
+                start_next(carry_overlap=False)
+            continue
+
+        current.append((line, tokens))
+        current_tokens += tokens
+        has_body = has_body or bool(line.strip())
+
+    if has_body:
+        yield emit()
@@ -0,0 +1,208 @@
+# FILE: agents/llm_metrics.py
+
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import Counter, Histogram
+
+# ==== Prometheus Metrics ====
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds", "Latency of LLM and embedding API calls",
+    ["model", "site", "kind"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120),
+)
+LLM_REQUESTS = Counter("llm_requests_total", "LLM and embedding API calls", ["model", "site", "kind", "status"])
+LLM_ERRORS = Counter("llm_errors_total", "Failed LLM and embedding API calls", ["model", "site", "error"])
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens used, by type (prompt, completion, cached)", ["model", "site", "type"])
+LLM_COST = Counter("llm_cost_usd_total", "Estimated spend in USD from list prices", ["model", "site"])
+
+# USD per 1M tokens: (prompt, completion, cached prompt)
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00, 1.25),
+    "gpt-4o-mini": (0.15, 0.60, 0.075),
+    "text-embedding-3-small": (0.02, 0.0, 0.0),
+    "text-embedding-3-large": (0.13, 0.0, 0.0),
+    "text-embedding-ada-002": (0.10, 0.0, 0.0),
+}
+
+
+def price_for(model: str):
+    """List price of `model`, matching dated snapshots like "gpt-4o-mini-2024-07-18" to their family."""
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_PRICES[name]
+    return None
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    prices = price_for(model)
+    if prices is None:
+        return 0.0
+    prompt_price, completion_price, cached_price = prices
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return (uncached * prompt_price + cached_tokens * cached_price + completion_tokens * completion_price) / 1_000_000
+
+
+def record_llm_call(site: str, model: str, kind: str, seconds: float, prompt_tokens: int = 0,
+                    completion_tokens: int = 0, cached_tokens: int = 0, error: Optional[BaseException] = None) -> None:
+    """Record one API call. Every instrumented call site ends up here."""
+    model = model or "unknown"
+    LLM_LATENCY.labels(model, site, kind).observe(seconds)
+    LLM_REQUESTS.labels(model, site, kind, "error" if error else "ok").inc()
+    if error:
+        LLM_ERRORS.labels(model, site, type(error).__name__).inc()
+        return
+    for token_type, count in (("prompt", prompt_tokens), ("completion", completion_tokens), ("cached", cached_tokens)):
+        if count:
+            LLM_TOKENS.labels(model, site, token_type).inc(count)
+    LLM_COST.labels(model, site).inc(estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens))
+
+
+# ==== Raw OpenAI SDK Calls ====
+class CallUsage:
+    """Token usage filled in inside a `track_llm_call` block."""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+
+    def from_openai(self, response) -> None:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        self.prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        self.completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+
+
+@contextmanager
+def track_llm_call(site: str, model: str, kind: str = "chat") -> Iterator[CallUsage]:
+    """
+    Time an OpenAI SDK call and record it; call `usage.from_openai(response)`
+    inside the block so tokens and cost are counted. Errors are recorded and re-raised.
+    """
+    usage = CallUsage()
+    start = time.perf_counter()
+    try:
+        yield usage
+    except Exception as e:
+        record_llm_call(site, model, kind, time.perf_counter() - start, error=e)
+        raise
+    record_llm_call(site, model, kind, time.perf_counter() - start,
+                    usage.prompt_tokens, usage.completion_tokens, usage.cached_tokens)
+
+
+# ==== LangChain Chat Models ====
+class LLMMetricsCallback(BaseCallbackHandler):
+    """
+    Callback for ChatOpenAI that records every invoke/stream/tool/structured-output
+    call made through the model. Pass it as `callbacks=[LLMMetricsCallback("site")]`.
+    Streaming calls report tokens only when the model has `stream_usage=True`.
+    """
+
+    run_inline = True  # bookkeeping only; no need for an executor hop on async calls
+
+    def __init__(self, site: str):
+        self.site = site
+        self._runs: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, kwargs: Dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or "unknown"
+        with self._lock:
+            self._runs[run_id] = (time.perf_counter(), model)
+
+    def _finish(self, run_id: UUID):
+        with self._lock:
+            start, model = self._runs.pop(run_id, (None, "unknown"))
+        return (time.perf_counter() - start if start else 0.0), model
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, kwargs)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        seconds, model = self._finish(run_id)
+        prompt_tokens = completion_tokens = cached_tokens = 0
+
+        # The configured model name keeps label cardinality stable; the response's dated name is a fallback
+        llm_output = response.llm_output or {}
+        if model == "unknown":
+            model = llm_output.get("model_name") or model
+        message = getattr(response.generations[0][0], "message", None) if response.generations and response.generations[0] else None
+        usage_metadata = getattr(message, "usage_metadata", None)
+        if usage_metadata:
+            prompt_tokens = usage_metadata.get("input_tokens", 0)
+            completion_tokens = usage_metadata.get("output_tokens", 0)
+            cached_tokens = (usage_metadata.get("input_token_details") or {}).get("cache_read", 0) or 0
+            if model == "unknown":
+                model = (getattr(message, "response_metadata", None) or {}).get("model_name") or model
+        elif llm_output.get("token_usage"):
+            token_usage = llm_output["token_usage"]
+            prompt_tokens = token_usage.get("prompt_tokens", 0)
+            completion_tokens = token_usage.get("completion_tokens", 0)
+            cached_tokens = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+
+        record_llm_call(self.site, model, "chat", seconds, prompt_tokens, completion_tokens, cached_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        seconds, model = self._finish(run_id)
+        record_llm_call(self.site, model, "chat", seconds, error=error)
+
+
+# ==== LangChain Embeddings ====
+class InstrumentedEmbeddings:
+    """
+    Wraps a LangChain `Embeddings` object and records each API call. The
+    embeddings API does not return usage through LangChain, so prompt tokens
+    are counted locally with the embedding model's tokenizer.
+    """
+
+    def __init__(self, embeddings, site: str):
+        self.embeddings = embeddings
+        self.site = site
+        self.model = getattr(embeddings, "model", embeddings.__class__.__name__)
+
+    def _tokens(self, texts: List[str]) -> int:
+        from agents.knowledgbase_agent.text_splitter import count_tokens
+        return sum(count_tokens(text) for text in texts)
+
+    def _record(self, texts: List[str], start: float, error: Optional[BaseException] = None) -> None:
+        tokens = 0 if error else self._tokens(texts)
+        record_llm_call(self.site, self.model, "embedding", time.perf_counter() - start, prompt_tokens=tokens, error=error)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+        except Exception as e:
+            self._record(texts, start, e)
+            raise
+        self._record(texts, start)
+        return vectors
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        try:
+            vectors = await self.embeddings.aembed_documents(texts)
+        except Exception as e:
+            self._record(texts, start, e)
+            raise
+        self._record(texts, start)
+        return vectors
@@ -2,13 +2,16 @@
 
 import os
 import logging
-from typing import Literal, Dict, Any
+from functools import partial
+from typing import Literal, Dict, Any, Optional
 from langgraph.graph import END, StateGraph
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.output_parsers.openai_functions import JsonOutputFunctionsParser
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 from agents.news_agent.news_tool import get_latest_news
+from agents.llm_metrics import LLMMetricsCallback
+from agents.sync_runner import run_sync
 
 # === Load environment variables ===
 load_dotenv()
@@ -23,48 +26,51 @@ class NewsAgentState(Dict[str, Any]):
     news_results: Dict[str, Any]
     next_step: str
 
-# === Oracle Node ===
-def run_oracle(state: NewsAgentState) -> NewsAgentState:
-    try:
-        condition = state.get("chronic_condition", "").strip()
-        logger.info(f"[🔀 Oracle] Received condition: {condition}")
-
-        # Proper prompt template with variable substitution
-        prompt = ChatPromptTemplate.from_template(
-            """You are an intelligent router for a health news agent.
+# === Oracle Chain ===
+def init_news_oracle():
+    # Proper prompt template with variable substitution
+    prompt = ChatPromptTemplate.from_template(
+        """You are an intelligent router for a health news agent.
 The user is asking for updates about the following chronic condition: {chronic_condition}.
 If the condition is valid and specific, respond with: {{ "decision": "get_news" }}
 If the condition is vague or unsupported, respond with: {{ "decision": "end" }}
 Return only the JSON with the key "decision"."""
-        )
-
-        # Tool schema for structured JSON output
-        function_def = {
-            "name": "route_decision",
-            "description": "Decides if news should be fetched for the condition.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "decision": {
-                        "type": "string",
-                        "enum": ["get_news", "end"]
-                    }
-                },
-                "required": ["decision"]
-            }
+    )
+
+    # Tool schema for structured JSON output
+    function_def = {
+        "name": "route_decision",
+        "description": "Decides if news should be fetched for the condition.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "decision": {
+                    "type": "string",
+                    "enum": ["get_news", "end"]
+                }
+            },
+            "required": ["decision"]
         }
+    }
 
-        # LLM setup (no function call, just structured output)
-        llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+    # LLM setup (no function call, just structured output)
+    llm = ChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0,
+        api_key=os.getenv("OPENAI_API_KEY"),
+        callbacks=[LLMMetricsCallback("news.oracle")]
+    )
 
-        # Use structured output mode instead of bind_tools
-        chain = prompt | llm.with_structured_output(function_def)
+    # Use structured output mode instead of bind_tools
+    return prompt | llm.with_structured_output(function_def)
 
-        result = chain.invoke({"chronic_condition": condition})
+# === Oracle Node ===
+async def run_oracle(state: NewsAgentState, oracle) -> NewsAgentState:
+    try:
+        condition = state.get("chronic_condition", "").strip()
+        logger.info(f"[🔀 Oracle] Received condition: {condition}")
+
+        result = await oracle.ainvoke({"chronic_condition": condition})
         decision = result.get("decision", "end")
 
         logger.info(f"[🔀 Oracle Decision] → {decision}")
@@ -78,12 +84,12 @@ Return only the JSON with the key "decision"."""
         return {**state, "next_step": "end"}
 
 # === News Fetch Node ===
-def run_get_news(state: NewsAgentState) -> NewsAgentState:
+async def run_get_news(state: NewsAgentState) -> NewsAgentState:
     condition = state.get("chronic_condition", "").strip()
     logger.info(f"[📡 Fetching News] For condition: {condition}")
 
     try:
-        news = get_latest_news(condition)
+        news = await get_latest_news.ainvoke({"health_condition": condition})
 
         if "error" in news:
             logger.warning(f"[⚠️ News Fetch Returned Error] {news['error']}")
@@ -110,8 +116,9 @@ def decide_next(state: NewsAgentState) -> Literal["get_news", "end"]:
 
 # === Build LangGraph ===
 def create_news_agent_graph() -> StateGraph:
+    oracle = init_news_oracle()
     graph = StateGraph(NewsAgentState)
-    graph.add_node("oracle", run_oracle)
+    graph.add_node("oracle", partial(run_oracle, oracle=oracle))
     graph.add_node("get_news", run_get_news)
 
     graph.set_entry_point("oracle")
@@ -129,9 +136,11 @@ def create_news_agent_graph() -> StateGraph:
     return graph
 
 # === Runner Function ===
-def run_news_agent(chronic_condition: str) -> Dict[str, Any]:
-    graph = create_news_agent_graph()
-    app = graph.compile()
+async def arun_news_agent(chronic_condition: str, app: Optional[Any] = None) -> Dict[str, Any]:
+    # Reuse the compiled graph held by the process-wide registry
+    if app is None:
+        from agents.registry import registry
+        app = registry.get("news")
 
     initial_state = {
         "chronic_condition": chronic_condition,
@@ -140,10 +149,14 @@ def run_news_agent(chronic_condition: str) -> Dict[str, Any]:
     }
 
     logger.info(f"[🚀 News Agent Invoked] for '{chronic_condition}'")
-    final_state = app.invoke(initial_state)
+    final_state = await app.ainvoke(initial_state)
 
     if "news_results" not in final_state:
         logger.warning("[⚠️ No news_results found in final_state]")
         return {"error": "No results returned"}
 
     return final_state["news_results"]
+
+def run_news_agent(chronic_condition: str, app: Optional[Any] = None) -> Dict[str, Any]:
+    """Blocking wrapper around `arun_news_agent` for scripts and notebooks."""
+    return run_sync(arun_news_agent(chronic_condition, app=app))
@@ -1,12 +1,14 @@
 # agents/web_agent/news_tool.py
 
 import os
+import asyncio
 import logging
 from dotenv import load_dotenv
 from typing import Dict
-from tavily import TavilyClient
-from openai import OpenAI
+from tavily import AsyncTavilyClient
+from openai import AsyncOpenAI
 from langchain.tools import tool
+from agents.llm_metrics import track_llm_call
 
 # === Load environment variables ===
 load_dotenv()
@@ -17,11 +19,50 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# === OpenAI client ===
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# === API clients (created once, shared across requests) ===
+openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+tavily_client = AsyncTavilyClient(api_key=TAVILY_API_KEY)
+
+async def summarize_article(article: Dict, health_condition: str) -> Dict:
+    """Summarize a single Tavily article with GPT and format it for the response."""
+    title = article.get("title", "Untitled")
+    full_content = article.get("content", "")[:1000]  # Cap at 1000 chars
+    preview = full_content[:200] + "..." if len(full_content) > 200 else full_content
+
+    gpt_prompt = (
+        f"You are a medical analyst. Summarize the article related to {health_condition} "
+        f"in 2–3 concise sentences for a health-aware audience. Focus on treatments, risks, or research:\n\n"
+        f"Title: {title}\n"
+        f"Content: {full_content.strip()}"
+    )
+
+    try:
+        logger.info(f"[🧠 GPT Summarizing] {title}")
+        with track_llm_call("news.summarize", "gpt-4o-mini") as usage:
+            gpt_response = await openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": gpt_prompt}],
+                temperature=0.5
+            )
+            usage.from_openai(gpt_response)
+        summary = gpt_response.choices[0].message.content.strip()
+        logger.info("[✅ Summary Ready]")
+    except Exception as gpt_error:
+        logger.warning(f"[⚠️ GPT Error] Failed to summarize: {str(gpt_error)}")
+        summary = "GPT Summary not available."
+
+    # === Formatted article ===
+    return {
+        "title": title,
+        "source": article.get("source", "Unknown"),
+        "published": article.get("published_time", "N/A"),
+        "url": article.get("url"),
+        "preview": preview,
+        "summary": summary
+    }
 
 @tool
-def get_latest_news(health_condition: str, max_results: int = 5) -> Dict:
+async def get_latest_news(health_condition: str, max_results: int = 5) -> Dict:
     """
     Fetch the latest health-related news about a given chronic condition
     using Tavily API, and summarize each article using GPT.
@@ -35,11 +76,10 @@ def get_latest_news(health_condition: str, max_results: int = 5) -> Dict:
     """
     try:
         # === Query Tavily ===
-        tavily_client = TavilyClient(api_key=TAVILY_API_KEY)
         query = f"latest medical news and discoveries about {health_condition}"
         logger.info(f"[🌐 Tavily Query] {query}")
 
-        tavily_response = tavily_client.search(
+        tavily_response = await tavily_client.search(
             query=query,
             topic="news",
             search_depth="advanced",
@@ -47,48 +87,16 @@ def get_latest_news(health_condition: str, max_results: int = 5) -> Dict:
             time_range="week"
         )
 
-        articles = []
-
-        # === Summarize Each Article ===
-        for article in tavily_response.get("results", []):
-            title = article.get("title", "Untitled")
-            full_content = article.get("content", "")[:1000]  # Cap at 1000 chars
-            preview = full_content[:200] + "..." if len(full_content) > 200 else full_content
-
-            gpt_prompt = (
-                f"You are a medical analyst. Summarize the article related to {health_condition} "
-                f"in 2–3 concise sentences for a health-aware audience. Focus on treatments, risks, or research:\n\n"
-                f"Title: {title}\n"
-                f"Content: {full_content.strip()}"
-            )
-
-            try:
-                logger.info(f"[🧠 GPT Summarizing] {title}")
-                gpt_response = openai_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": gpt_prompt}],
-                    temperature=0.5
-                )
-                summary = gpt_response.choices[0].message.content.strip()
-                logger.info("[✅ Summary Ready]")
-            except Exception as gpt_error:
-                logger.warning(f"[⚠️ GPT Error] Failed to summarize: {str(gpt_error)}")
-                summary = "GPT Summary not available."
-
-            # === Append formatted article ===
-            articles.append({
-                "title": title,
-                "source": article.get("source", "Unknown"),
-                "published": article.get("published_time", "N/A"),
-                "url": article.get("url"),
-                "preview": preview,
-                "summary": summary
-            })
+        # === Summarize All Articles Concurrently (order preserved) ===
+        articles = await asyncio.gather(*[
+            summarize_article(article, health_condition)
+            for article in tavily_response.get("results", [])
+        ])
 
         return {
             "condition": health_condition,
             "total_results": len(articles),
-            "articles": articles
+            "articles": list(articles)
         }
 
     except Exception as e:
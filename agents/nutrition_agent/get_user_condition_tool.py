@@ -1,26 +1,26 @@
 # FILE: agents/nutrition_agent/get_user_condition_tool.py
 
 import logging
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from langchain.tools import tool
-from postgres_db.database import get_db
+from postgres_db.database import AsyncSessionLocal
 from postgres_db import models
 
 # Optional: Configure logging here if not globally set
 logger = logging.getLogger(__name__)
 
 @tool
-def get_user_condition(username: str) -> str:
+async def get_user_condition(username: str) -> str:
     """
     🔍 Fetch the chronic condition of a given user from PostgreSQL.
     """
     logger.debug(f"🧑 Getting chronic condition for user: {username}")
 
     try:
-        db: Session = next(get_db())
-        logger.debug("✅ Database session acquired")
-
-        user = db.query(models.User).filter(models.User.username == username).first()
+        async with AsyncSessionLocal() as db:
+            logger.debug("✅ Database session acquired")
+            result = await db.execute(select(models.User).where(models.User.username == username))
+            user = result.scalars().first()
 
         if user:
             logger.debug(f"🎯 Found user: {user.username} → Chronic Condition: {user.chronic_condition}")
@@ -2,7 +2,8 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
  
-from typing import TypedDict, Annotated, Optional, List
+from typing import Annotated, Optional, List
+from typing_extensions import TypedDict
 import operator
 from functools import partial
 from dotenv import load_dotenv
@@ -14,9 +15,16 @@ from langchain_openai import ChatOpenAI
  
 from agents.nutrition_agent.get_user_condition_tool import get_user_condition
 from agents.nutrition_agent.recommend_recipes_tool import recommend_recipes_tool
+from agents.sync_runner import run_sync
+from agents.llm_metrics import LLMMetricsCallback
  
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# "pipeline": run get_user_condition → recommend_recipes directly, no LLM calls
+# "agentic":  let the gpt-4o-mini oracle drive the same two tools
+NUTRITION_MODES = ("pipeline", "agentic")
+NUTRITION_MODE = os.getenv("NUTRITION_MODE", "pipeline")
  
 # ========= LangGraph State =========
 class NutritionState(TypedDict):
@@ -56,7 +64,8 @@ Always consider previous context (scratchpad).
         ("assistant", "scratchpad: {scratchpad}"),
     ])
  
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=OPENAI_API_KEY)
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=OPENAI_API_KEY,
+                     callbacks=[LLMMetricsCallback("nutrition.oracle")])
  
     def create_scratchpad(intermediate_steps: List[AgentAction]):
         recent_steps = intermediate_steps[-4:]
@@ -76,7 +85,7 @@ Always consider previous context (scratchpad).
     )
  
 # ========= Oracle Executor =========
-def run_nutrition_oracle(state: NutritionState, oracle) -> NutritionState:
+async def run_nutrition_oracle(state: NutritionState, oracle) -> NutritionState:
     print("\n🧠 [Oracle] Deciding next nutrition tool...")
  
     # ✅ Stop after recommend_recipes if it succeeded
@@ -104,7 +113,7 @@ def run_nutrition_oracle(state: NutritionState, oracle) -> NutritionState:
         return {**state, "intermediate_steps": state["intermediate_steps"] + [next_action]}
  
     try:
-        response = oracle.invoke(state)
+        response = await oracle.ainvoke(state)
         print(f"🔮 Oracle tool call: {response.tool_calls}")
  
         if not response.tool_calls:
@@ -166,7 +175,7 @@ def route(state: NutritionState):
  
  
 # ========= Tool Executor =========
-def run_tool(state: NutritionState) -> NutritionState:
+async def run_tool(state: NutritionState) -> NutritionState:
     last_action = state["intermediate_steps"][-1]
     tool_name = last_action.tool
     tool_args = last_action.tool_input
@@ -179,12 +188,12 @@ def run_tool(state: NutritionState) -> NutritionState:
     print(f"📦 Current condition: {state.get('chronic_condition')}")
  
     try:
-        output = TOOL_MAP[tool_name].invoke(tool_args)
+        output = await TOOL_MAP[tool_name].ainvoke(tool_args)
         print(f"✅ Output: {str(output)[:250]}...")
         updated_state = {**state}
  
-        if tool_name == "get_user_condition" and "User not found" not in str(output):
-            updated_state["chronic_condition"] = str(output)
+        if tool_name == "get_user_condition" and condition_found(output):
+            updated_state["chronic_condition"] = output
  
         updated_steps = state["intermediate_steps"][:-1] + [
             AgentAction(tool=tool_name, tool_input=tool_args, log=str(output))
@@ -215,11 +224,67 @@ def create_nutrition_graph():
  
     return graph.compile()
  
+# ========= Deterministic Pipeline =========
+def condition_found(output) -> bool:
+    """The tool returns the condition, None for a user without one, or an error/not-found message."""
+    return (isinstance(output, str) and bool(output.strip()) and output != "User not found."
+            and not output.startswith("Error fetching user condition"))
+
+async def pipeline_get_user_condition(state: NutritionState) -> dict:
+    tool_args = {"username": state["username"]}
+    print(f"\n🔧 [Pipeline] get_user_condition | Args: {tool_args}")
+    # Checked before str(): a user with no condition gives None, and str(None) would pass as "None"
+    output = await get_user_condition.ainvoke(tool_args)
+    log = str(output) if output is not None else "No chronic condition on file for this user."
+    update = {"intermediate_steps": [AgentAction(tool="get_user_condition", tool_input=tool_args, log=log)]}
+    if condition_found(output):
+        update["chronic_condition"] = output
+    return update
+
+async def pipeline_recommend_recipes(state: NutritionState) -> dict:
+    tool_args = {
+        "username": state["username"],
+        "chronic_condition": state["chronic_condition"],
+        "cuisine_types": state["cuisine_types"],
+        "meal_types": state["meal_types"],
+    }
+    print(f"\n🔧 [Pipeline] recommend_recipes | Args: {tool_args}")
+    try:
+        output = str(await recommend_recipes_tool.ainvoke(tool_args))
+    except Exception as e:
+        print(f"❌ Tool error: {e}")
+        output = f"Error: {str(e)}"
+    return {"intermediate_steps": [AgentAction(tool="recommend_recipes", tool_input=tool_args, log=output)]}
+
+def route_after_condition(state: NutritionState):
+    if state.get("chronic_condition"):
+        return "recommend_recipes"
+    print("🛑 No chronic condition for user. Stopping.")
+    return END
+
+def create_nutrition_pipeline_graph():
+    """The fixed get_user_condition → recommend_recipes sequence as a compiled graph with no oracle."""
+    graph = StateGraph(NutritionState)
+    graph.add_node("get_user_condition", pipeline_get_user_condition)
+    graph.add_node("recommend_recipes", pipeline_recommend_recipes)
+
+    graph.set_entry_point("get_user_condition")
+    graph.add_conditional_edges("get_user_condition", route_after_condition)
+    graph.add_edge("recommend_recipes", END)
+
+    return graph.compile()
+
 # ========= Entry Point =========
-nutrition_graph = create_nutrition_graph()
+async def arun_nutrition_agents(input_text: str, username: str, cuisine_types: List[str], meal_types: List[str], chat_history: list[BaseMessage], app=None, mode: Optional[str] = None) -> str:
+    mode = mode or NUTRITION_MODE
+    if mode not in NUTRITION_MODES:
+        raise ValueError(f"Unknown nutrition mode '{mode}'; expected one of {NUTRITION_MODES}")
+    print(f"\n🚀 [run_nutrition_agents] Triggered ({mode} mode)")
+    # Compiled graph is built once at startup and shared via the agent registry
+    if app is None:
+        from agents.registry import registry
+        app = registry.get("nutrition_pipeline" if mode == "pipeline" else "nutrition")
  
-def run_nutrition_agents(input_text: str, username: str, cuisine_types: List[str], meal_types: List[str], chat_history: list[BaseMessage]) -> str:
-    print("\n🚀 [run_nutrition_agents] Triggered")
     initial_state: NutritionState = {
         "input": input_text,
         "username": username,
@@ -231,7 +296,11 @@ def run_nutrition_agents(input_text: str, username: str, cuisine_types: List[str
     }
  
     print(f"🧾 Initial State: {initial_state}")
-    result = nutrition_graph.invoke(initial_state)
+    result = await app.ainvoke(initial_state)
     final_output = result["intermediate_steps"][-1].log
     print(f"🎯 Final Output: {final_output[:300]}...\n")
-    return final_output
\ No newline at end of file
+    return final_output
+ 
+def run_nutrition_agents(input_text: str, username: str, cuisine_types: List[str], meal_types: List[str], chat_history: list[BaseMessage], app=None, mode: Optional[str] = None) -> str:
+    """Blocking wrapper around `arun_nutrition_agents` for scripts and notebooks."""
+    return run_sync(arun_nutrition_agents(input_text, username, cuisine_types, meal_types, chat_history, app=app, mode=mode))
@@ -1,9 +1,10 @@
 # FILE: agents/nutrition_agent/recommend_recipes_tool.py
  
 from langchain.tools import tool
-from agents.nutrition_agent.snowflake_connector import run_query
+from agents.nutrition_agent.snowflake_connector import arun_query
 from agents.nutrition_agent.nutrition_constraints import NUTRITION_THRESHOLDS
 from typing import List
+import asyncio
 import random
 import os
 from dotenv import load_dotenv
@@ -16,7 +17,7 @@ TABLE_NAME = "STG_RECIPES"
 FULL_TABLE_NAME = f'{SNOWFLAKE_DATABASE}.{SNOWFLAKE_SCHEMA}.{TABLE_NAME}'
  
 @tool
-def recommend_recipes_tool(username: str, chronic_condition: str, cuisine_types: List[str], meal_types: List[str]) -> str:
+async def recommend_recipes_tool(username: str, chronic_condition: str, cuisine_types: List[str], meal_types: List[str]) -> str:
     """
     🍲 Recommend personalized recipes for a user based on:
         - Chronic condition (e.g. CKD, Type2, Obesity, etc)
@@ -53,75 +54,78 @@ def recommend_recipes_tool(username: str, chronic_condition: str, cuisine_types:
         "snack": (50, 300)
     }
  
-    all_results = []
- 
-    for cuisine in cuisine_types:
-        for meal in meal_types:
-            print(f"\n🍴 Processing {meal} ({cuisine})")
-            where_clauses = [f"CUISINE_TYPE ILIKE '%{cuisine}%'", f"MEAL_TYPE ILIKE '%{meal}%'"]
- 
-            for col, val in thresholds.items():
-                if isinstance(val, bool):
-                    if col == "Gluten_free":
-                        where_clauses.append("LOWER(\"Cautionary_Tags\") NOT ILIKE '%gluten%'")
-                        print(f"🚫 Filtering out gluten-containing recipes")
-                else:
-                    where_clauses.append(f"{col.upper()} <= {val}")
-                    print(f"✅ Applying constraint: {col} <= {val}")
- 
-            # ✅ Dynamic calorie filtering
-            meal_lower = meal.lower()
-            if meal_lower in meal_calorie_ranges:
-                min_kcal, max_kcal = meal_calorie_ranges[meal_lower]
-                where_clauses.append(f"CALORIES_PER_SERVING_KCAL BETWEEN {min_kcal} AND {max_kcal}")
-                print(f"📊 Applied calorie range: {min_kcal}–{max_kcal} kcal for {meal}")
-            else:
-                print(f"⚠️ No calorie range defined for meal type: {meal}")
- 
-            where_sql = " AND ".join(where_clauses)
- 
-            # Include condition-specific nutrient fields in SELECT
-            nutrient_cols = set(["CALORIES_PER_SERVING_KCAL"])
-            nutrient_cols.update([col.upper() for col in thresholds if isinstance(thresholds[col], (int, float))])
-            nutrient_col_str = ", ".join(nutrient_cols)
- 
-            query = f"""
-                SELECT RECIPE_NAME, IMAGE_URL, INGREDIENTS, LINK, HEALTH_LABELS, DIET_LABELS, CAUTION_LABELS, {nutrient_col_str}
-                FROM {FULL_TABLE_NAME}
-                WHERE {where_sql}
-                LIMIT 15;
-            """
-            print(f"📥 Running SQL Query:\n{query}")
- 
-            rows = run_query(query)
-            print(f"📦 Fetched {len(rows)} recipes")
-            # Step 1: Remove previously seen recipes in this session
+    # Each meal+cuisine combination is an independent Snowflake query; run them concurrently
+    async def recommend_for(cuisine: str, meal: str) -> str:
+        print(f"\n🍴 Processing {meal} ({cuisine})")
+        where_clauses = [f"CUISINE_TYPE ILIKE '%{cuisine}%'", f"MEAL_TYPE ILIKE '%{meal}%'"]
  
-            if not rows:
-                all_results.append(f"❌ No suitable recipes found for {meal} ({cuisine}).")
-                continue
- 
-            selected = random.sample(rows, min(5, len(rows)))
-            print(f"✅ Selected {len(selected)} recipes to return")
- 
-            for r in selected:
-                print(f"🔗 Final image URL for {r['recipe_name']}: {r['image_url']}")
- 
-            formatted = "\n".join([
-                f"""🍽️ **{r['recipe_name']}**  
+        for col, val in thresholds.items():
+            if isinstance(val, bool):
+                if col == "Gluten_free":
+                    where_clauses.append("LOWER(\"Cautionary_Tags\") NOT ILIKE '%gluten%'")
+                    print(f"🚫 Filtering out gluten-containing recipes")
+            else:
+                where_clauses.append(f"{col.upper()} <= {val}")
+                print(f"✅ Applying constraint: {col} <= {val}")
+ 
+        # ✅ Dynamic calorie filtering
+        meal_lower = meal.lower()
+        if meal_lower in meal_calorie_ranges:
+            min_kcal, max_kcal = meal_calorie_ranges[meal_lower]
+            where_clauses.append(f"CALORIES_PER_SERVING_KCAL BETWEEN {min_kcal} AND {max_kcal}")
+            print(f"📊 Applied calorie range: {min_kcal}–{max_kcal} kcal for {meal}")
+        else:
+            print(f"⚠️ No calorie range defined for meal type: {meal}")
+ 
+        where_sql = " AND ".join(where_clauses)
+ 
+        # Include condition-specific nutrient fields in SELECT
+        nutrient_cols = set(["CALORIES_PER_SERVING_KCAL"])
+        nutrient_cols.update([col.upper() for col in thresholds if isinstance(thresholds[col], (int, float))])
+        nutrient_col_str = ", ".join(nutrient_cols)
+ 
+        query = f"""
+            SELECT RECIPE_NAME, IMAGE_URL, INGREDIENTS, LINK, HEALTH_LABELS, DIET_LABELS, CAUTION_LABELS, {nutrient_col_str}
+            FROM {FULL_TABLE_NAME}
+            WHERE {where_sql}
+            LIMIT 15;
+        """
+        print(f"📥 Running SQL Query:\n{query}")
+ 
+        rows = await arun_query(query)
+        print(f"📦 Fetched {len(rows)} recipes")
+        # Step 1: Remove previously seen recipes in this session
+ 
+        if not rows:
+            return f"❌ No suitable recipes found for {meal} ({cuisine})."
+ 
+        selected = random.sample(rows, min(5, len(rows)))
+        print(f"✅ Selected {len(selected)} recipes to return")
+ 
+        for r in selected:
+            print(f"🔗 Final image URL for {r['recipe_name']}: {r['image_url']}")
+ 
+        formatted = "\n".join([
+            f"""🍽️ **{r['recipe_name']}**  
 🔗 [View Recipe]({r['link']})  
 📸 ImageURL: {r['image_url'].split("?")[0]}  
 📝 Ingredients: {r['ingredients']}  
 💡 Health Labels: {r['health_labels']}  
 ⚠️ Caution Tags: {r['caution_labels']}  
 🔥 Calories/Serving: {r['calories_per_serving_kcal']} kcal""" +
-                "".join([
-                    f"\n🧬 {col.replace('_', ' ').title()}: {r.get(col.lower(), 'N/A')}"
-                    for col in nutrient_cols if col != "CALORIES_PER_SERVING_KCAL"
-                ]) + "\n"
-                for r in selected
-            ])
- 
-            all_results.append(f"### 🥗 {meal} ({cuisine})\n\n{formatted}")
+            "".join([
+                f"\n🧬 {col.replace('_', ' ').title()}: {r.get(col.lower(), 'N/A')}"
+                for col in nutrient_cols if col != "CALORIES_PER_SERVING_KCAL"
+            ]) + "\n"
+            for r in selected
+        ])
+ 
+        return f"### 🥗 {meal} ({cuisine})\n\n{formatted}"
+ 
+    all_results = await asyncio.gather(*[
+        recommend_for(cuisine, meal)
+        for cuisine in cuisine_types
+        for meal in meal_types
+    ])
  
     return "\n\n".join(all_results)
\ No newline at end of file
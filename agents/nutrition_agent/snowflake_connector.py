@@ -1,6 +1,7 @@
 # FILE: agents/nutrition_agent/snowflake_connector.py
 
 import os
+import asyncio
 import logging
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
@@ -46,3 +47,11 @@ def run_query(query: str):
     except Exception as e:
         logging.error(f"❌ Snowflake query failed: {str(e)}")
         return []
+
+# ========== Async Query Runner ==========
+async def arun_query(query: str):
+    """
+    Async variant of `run_query`. The Snowflake connector has no asyncio driver,
+    so the blocking call runs on a worker thread to keep the event loop free.
+    """
+    return await asyncio.to_thread(run_query, query)
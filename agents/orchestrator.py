@@ -2,9 +2,11 @@
 
 import os
 import sys
+import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from typing import TypedDict, Annotated, Optional, List
+from typing import Annotated, Optional, List, Dict, Any, AsyncIterator
+from typing_extensions import TypedDict
 import operator
 from functools import partial
 from dotenv import load_dotenv
@@ -15,7 +17,12 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 
-from agents.knowledgbase_agent.knowledgebase_tool import run_vector_search, run_generate_summary
+from agents.knowledgbase_agent.knowledgebase_tool import arun_vector_search, astream_vector_search, embeddings_model
+from agents.knowledgbase_agent.summary_store import aget_summary, astream_summary
+from agents.intent_router import IntentRouter, ROUTER_MODE
+from agents.chat_history import HistoryWindow
+from agents.llm_metrics import LLMMetricsCallback
+from agents.sync_runner import run_sync
 
 # ==== Load Environment Variables ====
 load_dotenv()
@@ -30,7 +37,7 @@ class AgentState(TypedDict):
 
 # ==== Tool Wrappers ====
 @tool("vector_search")
-def vector_search_tool(query: str, condition: str) -> str:
+async def vector_search_tool(query: str, condition: str) -> str:
     """
     Answer a specific medical question using semantic search on Pinecone chunks 
     filtered by the chronic condition. Extracts context and responds to the question.
@@ -43,11 +50,11 @@ def vector_search_tool(query: str, condition: str) -> str:
         str: An answer based on the most relevant document snippets retrieved.
     """
     print(f"🛠 Running vector_search_tool with query='{query}' and condition='{condition}'")
-    return run_vector_search(query, condition)
+    return await arun_vector_search(query, condition)
 
 
 @tool("generate_summary")
-def generate_summary_tool(condition: str) -> str:
+async def generate_summary_tool(condition: str) -> str:
     """
     Generate a complete medical summary for a chronic condition, answering:
     
@@ -66,7 +73,8 @@ def generate_summary_tool(condition: str) -> str:
         str: A structured summary for the condition.
     """
     print(f"🛠 Running generate_summary_tool with condition='{condition}'")
-    return run_generate_summary(condition)
+    # Served from the precomputed, corpus-versioned summary store
+    return await aget_summary(condition)
 
 # ==== Tool Mapping ====
 TOOL_MAP = {
@@ -74,6 +82,26 @@ TOOL_MAP = {
     "generate_summary": generate_summary_tool
 }
 
+# ==== Streaming Tool Mapping ====
+STREAM_MAP = {
+    "vector_search": lambda args: astream_vector_search(args["query"], args["condition"]),
+    "generate_summary": lambda args: astream_summary(args["condition"])
+}
+
+# ==== Fast-Path Router ====
+# Shares the query embedding cache, so vector_search reuses the embedding computed here
+intent_router = IntentRouter(embeddings_model)
+
+def fast_path_action(tool_name: str, state: AgentState) -> AgentAction:
+    tool_args = {"condition": state.get("condition")}
+    if tool_name == "vector_search":
+        tool_args["query"] = state["input"]
+    return AgentAction(tool=tool_name, tool_input=tool_args, log="TBD")
+
+# ==== History Window ====
+# The oracle sees a rolling summary plus the newest turns, not the whole chat
+history_window = HistoryWindow()
+
 # ==== Oracle Agent ====
 def init_oracle_agent():
     system_prompt = """You are a helpful health assistant.
@@ -93,7 +121,8 @@ Rules:
         ("assistant", "scratchpad: {scratchpad}"),
     ])
 
-    llm = ChatOpenAI(model="gpt-4o", temperature=0, api_key=OPENAI_API_KEY)
+    llm = ChatOpenAI(model="gpt-4o", temperature=0, api_key=OPENAI_API_KEY,
+                     callbacks=[LLMMetricsCallback("knowledge.oracle")])
 
     def create_scratchpad(intermediate_steps: List[AgentAction]):
         return "\n---\n".join(
@@ -114,11 +143,26 @@ Rules:
     return oracle
 
 # ==== Oracle Selector ====
-def run_oracle(state: AgentState, oracle) -> AgentState:
+async def run_oracle(state: AgentState, oracle) -> AgentState:
+    if ROUTER_MODE == "fast":
+        decision = await intent_router.route(state["input"], state.get("condition"),
+                                             has_history=bool(state.get("chat_history")))
+        if decision:
+            tool_name, path = decision
+            action = fast_path_action(tool_name, state)
+            print(f"⚡ Router ({path}) chose tool: {tool_name} | Args: {action.tool_input}")
+            return {
+                **state,
+                "intermediate_steps": [action]
+            }
+
     print("\n🧠 [Oracle] Deciding tool based on user input + history...")
 
+    start = time.perf_counter()
     try:
-        response = oracle.invoke(state)
+        chat_history = await history_window.abuild(state.get("chat_history") or [])
+        response = await oracle.ainvoke({**state, "chat_history": chat_history})
+        intent_router.record("oracle", time.perf_counter() - start)
         print(f"🔍 Oracle response tool call: {response.tool_calls}")
 
         if not response.tool_calls or len(response.tool_calls) == 0:
@@ -161,7 +205,7 @@ def route(state: AgentState):
     return last_step.tool
 
 # ==== Tool Execution ====
-def run_tool(state: AgentState) -> AgentState:
+async def run_tool(state: AgentState) -> AgentState:
     last_action = state["intermediate_steps"][-1]
     tool_name = last_action.tool
     tool_args = last_action.tool_input
@@ -171,7 +215,7 @@ def run_tool(state: AgentState) -> AgentState:
 
     print(f"\n🛠 Executing tool: {tool_name} with args: {tool_args}")
     try:
-        output = TOOL_MAP[tool_name].invoke(tool_args)
+        output = await TOOL_MAP[tool_name].ainvoke(tool_args)
         print(f"✅ Tool output (truncated): {str(output)[:250]}...\n")
 
         action_out = AgentAction(tool=tool_name, tool_input=tool_args, log=str(output))
@@ -190,8 +234,8 @@ def run_tool(state: AgentState) -> AgentState:
         }
 
 # ==== Build LangGraph DAG ====
-def create_graph():
-    oracle_agent = init_oracle_agent()
+def create_graph(oracle_agent=None):
+    oracle_agent = oracle_agent or init_oracle_agent()
     graph = StateGraph(AgentState)
 
     graph.add_node("oracle", partial(run_oracle, oracle=oracle_agent))
@@ -207,10 +251,13 @@ def create_graph():
     return graph.compile()
 
 # ==== Entry Point for FastAPI ====
-graph_app = create_graph()
-
-def run_agents(input_text: str, chat_history: list[BaseMessage], condition: str) -> str:
+async def arun_agents(input_text: str, chat_history: list[BaseMessage], condition: str, app=None) -> str:
     print("\n🚀 Triggering run_agents()")
+    # Compiled graph is built once at startup and shared via the agent registry
+    if app is None:
+        from agents.registry import registry
+        app = registry.get("knowledge")
+
     initial_state: AgentState = {
         "input": input_text,
         "chat_history": chat_history,
@@ -218,7 +265,41 @@ def run_agents(input_text: str, chat_history: list[BaseMessage], condition: str)
         "condition": condition
     }
 
-    result = graph_app.invoke(initial_state)
+    result = await app.ainvoke(initial_state)
     final_log = result["intermediate_steps"][-1].log
     print(f"🎯 Final Result: {final_log[:200]}...\n")
     return final_log
+
+
+def run_agents(input_text: str, chat_history: list[BaseMessage], condition: str, app=None) -> str:
+    """Blocking wrapper around `arun_agents` for scripts and notebooks."""
+    return run_sync(arun_agents(input_text, chat_history, condition, app=app))
+
+
+# ==== Streaming Entry Point ====
+async def astream_agents(input_text: str, chat_history: list[BaseMessage], condition: str, oracle=None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Route with the oracle, then stream the chosen tool's output as events:
+    `tool` (the chosen tool), `token` (answer text), `section` (a finished summary section), `error`.
+    """
+    print("\n🚀 Triggering astream_agents()")
+    if oracle is None:
+        from agents.registry import registry
+        oracle = registry.get("knowledge_oracle")
+
+    state: AgentState = {
+        "input": input_text,
+        "chat_history": chat_history,
+        "intermediate_steps": [],
+        "condition": condition
+    }
+
+    decided = await run_oracle(state, oracle)
+    action = decided["intermediate_steps"][-1]
+    tool_args = dict(action.tool_input)
+    tool_args.setdefault("condition", condition)
+    tool_args.setdefault("query", input_text)
+
+    yield {"event": "tool", "data": action.tool}
+    async for event in STREAM_MAP[action.tool](tool_args):
+        yield event
@@ -0,0 +1,152 @@
+# FILE: agents/registry.py
+
+import os
+import sys
+import time
+import asyncio
+import inspect
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.orchestrator import create_graph, init_oracle_agent
+from agents.nutrition_agent.nutrition_orchestrator import create_nutrition_graph, create_nutrition_pipeline_graph
+from agents.news_agent.news_controller import create_news_agent_graph
+from agents.search_location_agent.graph import create_location_agent_graph
+from agents.search_location_agent.location_agent import LocationAgent
+from agents.search_location_agent.google_oracle import GoogleOracle
+
+logger = logging.getLogger(__name__)
+
+
+# ==== Agent Registry ====
+class AgentRegistry:
+    """
+    Process-wide registry of compiled LangGraph apps.
+
+    Each agent is built once (graph compile + LLM/HTTP clients) and then shared
+    by every request, instead of being re-created inside each endpoint call.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._apps: Dict[str, Any] = {}
+        self._warmers: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Register a zero-argument factory that builds a ready-to-invoke app."""
+        self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        """Return the built app for `name`, building it on first use."""
+        app = self._apps.get(name)
+        if app is not None:
+            return app
+
+        with self._lock:
+            if name not in self._apps:
+                if name not in self._factories:
+                    raise KeyError(f"No agent registered under '{name}'")
+                start = time.perf_counter()
+                self._apps[name] = self._factories[name]()
+                logger.info(f"[🧩 Registry] Built '{name}' in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return self._apps[name]
+
+    def add_warmer(self, name: str, warmer: Callable[[], Any]) -> None:
+        """Register a zero-argument (sync or async) callable that opens a client or loads data ahead of the first request."""
+        self._warmers[name] = warmer
+
+    def build(self) -> None:
+        """Build every registered app. Called once when FastAPI starts."""
+        for name in self._factories:
+            self.get(name)
+
+    async def awarm(self) -> None:
+        """
+        Warm everything the first request would otherwise pay for: graph layout and
+        input/output schema generation on each compiled graph, then the registered
+        warmers (DB pool, embeddings client, local indexes). Failures are logged
+        and never block startup.
+        """
+        for name, app in self._apps.items():
+            if not hasattr(app, "get_graph"):
+                continue
+            try:
+                app.get_graph()
+                app.get_input_jsonschema()
+                app.get_output_jsonschema()
+                logger.info(f"[🔥 Registry] Warmed '{name}'")
+            except Exception as e:
+                logger.warning(f"[⚠️ Registry] Could not warm '{name}': {str(e)}")
+
+        for name, warmer in self._warmers.items():
+            start = time.perf_counter()
+            try:
+                result = warmer()
+                if inspect.isawaitable(result):
+                    await result
+                logger.info(f"[🔥 Registry] Warmed {name} in {(time.perf_counter() - start) * 1000:.1f} ms")
+            except Exception as e:
+                logger.warning(f"[⚠️ Registry] Could not warm {name}: {str(e)}")
+
+    async def aclose(self) -> None:
+        """Close pooled clients held by built entries (anything with an `aclose`). Called when FastAPI shuts down."""
+        for name, app in list(self._apps.items()):
+            if not hasattr(app, "aclose"):
+                continue
+            try:
+                await app.aclose()
+                logger.info(f"[🧹 Registry] Closed '{name}'")
+            except Exception as e:
+                logger.warning(f"[⚠️ Registry] Could not close '{name}': {str(e)}")
+
+    @property
+    def names(self):
+        return list(self._factories)
+
+
+# ==== Default Registry ====
+registry = AgentRegistry()
+registry.register("knowledge_oracle", init_oracle_agent)
+registry.register("knowledge", lambda: create_graph(registry.get("knowledge_oracle")))
+registry.register("nutrition", create_nutrition_graph)
+registry.register("nutrition_pipeline", create_nutrition_pipeline_graph)
+registry.register("news", lambda: create_news_agent_graph().compile())
+registry.register("google_oracle", GoogleOracle)
+registry.register("location", lambda: create_location_agent_graph(registry.get("google_oracle")).compile())
+registry.register("location_agent", lambda: LocationAgent(app=registry.get("location")))
+
+
+# ==== Client Warmers ====
+async def warm_postgres() -> None:
+    """Open a pooled asyncpg connection (TCP, TLS and auth) with a trivial query."""
+    from sqlalchemy import text
+    from postgres_db.database import async_engine
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def warm_router() -> None:
+    """Build the router centroids; this also opens the embeddings client's connection pool."""
+    from agents.orchestrator import intent_router
+    await intent_router._get_centroids()
+
+
+async def warm_local_indexes() -> None:
+    """Map every condition's local snapshot and load its BM25 postings."""
+    from agents.knowledgbase_agent.pinecone_utils import local_index, bm25_index
+    from agents.knowledgbase_agent.summary_store import KB_CONDITIONS
+
+    def load():
+        for condition in KB_CONDITIONS:
+            local_index.has_condition(condition)
+            bm25_index._snapshot(condition)
+    await asyncio.to_thread(load)
+
+
+registry.add_warmer("postgres pool", warm_postgres)
+registry.add_warmer("router centroids", warm_router)
+registry.add_warmer("local indexes", warm_local_indexes)
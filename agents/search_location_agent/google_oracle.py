@@ -1,7 +1,7 @@
 # src/apis/google_oracle.py
 
 import os
-import requests
+import httpx
 import logging
 from typing import Dict, Any, Optional
 from dotenv import load_dotenv
@@ -32,7 +32,10 @@ class GoogleOracle:
         self.geocode_url = "https://maps.googleapis.com/maps/api/geocode/json"
         self.place_details_url = "https://maps.googleapis.com/maps/api/place/details/json"
 
-    def validate_location(self, city: str, zipcode: str) -> Dict[str, Any]:
+        # Shared async HTTP client so repeated Places/Geocode calls reuse pooled connections
+        self.client = httpx.AsyncClient(timeout=httpx.Timeout(15.0))
+
+    async def validate_location(self, city: str, zipcode: str) -> Dict[str, Any]:
         """
         Validate if the location exists and get detailed information
         """
@@ -44,7 +47,7 @@ class GoogleOracle:
 
             address = f"{city} {zipcode}, USA"
             params = {"address": address, "key": self.api_key}
-            response = requests.get(self.geocode_url, params=params)
+            response = await self.client.get(self.geocode_url, params=params)
             data = response.json()
 
             logger.info(f"Geocode API response status: {data.get('status')}")
@@ -82,7 +85,7 @@ class GoogleOracle:
             logger.error(f"Location validation error: {str(e)}")
             return {"valid": False, "message": f"Error validating location: {str(e)}"}
 
-    def get_place_details(self, place_id: str) -> Dict[str, Any]:
+    async def get_place_details(self, place_id: str) -> Dict[str, Any]:
         """
         Get detailed information about a place using its ID
         """
@@ -92,7 +95,7 @@ class GoogleOracle:
                 "fields": "name,formatted_address,geometry,rating,user_ratings_total,website,formatted_phone_number,opening_hours",
                 "key": self.api_key
             }
-            response = requests.get(self.place_details_url, params=params)
+            response = await self.client.get(self.place_details_url, params=params)
             data = response.json()
 
             if data.get("status") == "OK" and data.get("result"):
@@ -116,7 +119,7 @@ class GoogleOracle:
             logger.error(f"Error getting place details: {str(e)}")
             return {"success": False, "message": f"Error getting place details: {str(e)}"}
 
-    def search_facilities(
+    async def search_facilities(
         self,
         city: str,
         zipcode: str = "",
@@ -142,7 +145,7 @@ class GoogleOracle:
             if not zipcode:
                 return {"success": False, "message": "Zipcode is required for the search", "facilities": []}
 
-            location_validation = self.validate_location(city, zipcode)
+            location_validation = await self.validate_location(city, zipcode)
             if not location_validation.get("valid"):
                 return {"success": False, "message": location_validation.get("message", "Invalid location"), "facilities": []}
 
@@ -173,7 +176,7 @@ class GoogleOracle:
 
                 logger.info(f"Text search query: {query}")
                 params = {"query": query, "key": self.api_key}
-                response = requests.get(self.text_search_url, params=params)
+                response = await self.client.get(self.text_search_url, params=params)
                 data = response.json()
 
                 if data.get("status") == "OK" and data.get("results"):
@@ -209,7 +212,7 @@ class GoogleOracle:
                     "type": place_type,
                     "key": self.api_key
                 }
-                response = requests.get(self.nearby_search_url, params=params)
+                response = await self.client.get(self.nearby_search_url, params=params)
                 data = response.json()
 
                 if data.get("status") == "OK":
@@ -248,7 +251,7 @@ class GoogleOracle:
             logger.error(f"Facility search error: {str(e)}")
             return {"success": False, "message": f"Error searching facilities: {str(e)}", "facilities": []}
 
-    def consult(self, query: Dict[str, Any]) -> Dict[str, Any]:
+    async def consult(self, query: Dict[str, Any]) -> Dict[str, Any]:
         """
         Main consultation method for the Google Oracle.
 
@@ -274,9 +277,13 @@ class GoogleOracle:
         if not zipcode:
             return {"success": False, "message": "Zipcode is required for the search", "facilities": []}
 
-        return self.search_facilities(
+        return await self.search_facilities(
             city=city,
             zipcode=zipcode,
             facility_type=facility_type,
             chronic_condition=chronic_condition
         )
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        await self.client.aclose()
@@ -1,12 +1,17 @@
 # src/orchestration/graph.py
  
 import os
-from typing import Dict, Any, List, Annotated, TypedDict, Literal
+from functools import partial
+from typing import Dict, Any, List, Annotated, Literal, Optional
+from typing_extensions import TypedDict
 from dotenv import load_dotenv
 from langchain.output_parsers.openai_functions import JsonOutputFunctionsParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
+from agents.search_location_agent.google_oracle import GoogleOracle
+from agents.sync_runner import run_sync
+from agents.llm_metrics import LLMMetricsCallback
 import json
 import logging
  
@@ -26,19 +31,15 @@ class LocationAgentState(TypedDict):
     messages: List[Dict[str, str]]
     next_step: str
  
-# Define node functions (each will be a step in our graph)
-def extract_location_information(state: LocationAgentState) -> LocationAgentState:
-    """Extract location information from the user query."""
-    query = state["query"]
-    chronic_condition = state.get("chronic_condition", "")
-   
-    logger.info(f"Extracting location info from query: {query}")
-   
+# Define the extraction chain (built once per compiled graph)
+def init_location_extractor():
+    """Build the LLM chain that extracts location details from a query."""
     # Initialize the LLM
     llm = ChatOpenAI(
         model="gpt-4o",
         temperature=0,
-        api_key=os.getenv("OPENAI_API_KEY")
+        api_key=os.getenv("OPENAI_API_KEY"),
+        callbacks=[LLMMetricsCallback("location.extractor")]
     )
    
     # Create a prompt template
@@ -75,11 +76,19 @@ def extract_location_information(state: LocationAgentState) -> LocationAgentStat
     }
    
     # Create the chain
-    chain = prompt | llm.bind_functions(functions=[function_def]) | JsonOutputFunctionsParser()
+    return prompt | llm.bind_functions(functions=[function_def]) | JsonOutputFunctionsParser()
+ 
+# Define node functions (each will be a step in our graph)
+async def extract_location_information(state: LocationAgentState, chain) -> LocationAgentState:
+    """Extract location information from the user query."""
+    query = state["query"]
+    chronic_condition = state.get("chronic_condition", "")
+   
+    logger.info(f"Extracting location info from query: {query}")
    
     try:
         # Run the chain
-        result = chain.invoke({"query": query})
+        result = await chain.ainvoke({"query": query})
        
         # Use chronic condition from state if not found in query
         if not result.get("chronic_condition") and chronic_condition:
@@ -129,15 +138,13 @@ def extract_location_information(state: LocationAgentState) -> LocationAgentStat
             "next_step": END
         }
  
-def search_healthcare_facilities(state: LocationAgentState) -> LocationAgentState:
+async def search_healthcare_facilities(state: LocationAgentState, oracle) -> LocationAgentState:
     """
     Search for healthcare facilities based on the extracted information.
 
     - For 'pharmacy', the chronic condition is ignored (general results are returned).
     """
     try:
-        from agents.search_location_agent.google_oracle import GoogleOracle
-
         location_details = state["location_details"]
         city = location_details.get("city", "")
         zipcode = location_details.get("zipcode", "")
@@ -174,13 +181,10 @@ def search_healthcare_facilities(state: LocationAgentState) -> LocationAgentStat
 
         logger.info(f"Searching facilities in {city} {zipcode}, type: {facility_type}, condition: {chronic_condition}")
 
-        # Initialize the oracle
-        oracle = GoogleOracle()
-
         # Omit chronic condition for pharmacy searches
         condition_to_use = "" if facility_type in ["pharmacy", "mental_health_group"] else chronic_condition
 
-        search_results = oracle.consult({
+        search_results = await oracle.consult({
             "city": city,
             "zipcode": zipcode,
             "facility_type": facility_type,
@@ -559,14 +563,19 @@ def decide_next_step(state: LocationAgentState) -> Literal["extract_location", "
     return state["next_step"]
  
 # Create and configure the graph
-def create_location_agent_graph() -> StateGraph:
+def create_location_agent_graph(oracle: Optional[GoogleOracle] = None) -> StateGraph:
     """Create the location agent graph workflow."""
+    # Build the LLM chain and Google client once; nodes reuse them on every request.
+    # The registry passes its shared GoogleOracle so it can be closed on shutdown.
+    extractor = init_location_extractor()
+    oracle = oracle or GoogleOracle()
+
     # Initialize the graph
     workflow = StateGraph(LocationAgentState)
    
     # Add nodes to the graph
-    workflow.add_node("extract_location", extract_location_information)
-    workflow.add_node("search_facilities", search_healthcare_facilities)
+    workflow.add_node("extract_location", partial(extract_location_information, chain=extractor))
+    workflow.add_node("search_facilities", partial(search_healthcare_facilities, oracle=oracle))
     workflow.add_node("format_results", format_search_results)
    
     # Add conditional edges
@@ -603,14 +612,13 @@ def create_location_agent_graph() -> StateGraph:
     return workflow
  
 # Function to run the graph
-def run_location_agent(query: str, chronic_condition: str = "") -> Dict[str, Any]:
+async def arun_location_agent(query: str, chronic_condition: str = "", app: Optional[Any] = None) -> Dict[str, Any]:
     """Run the location agent with the given query."""
     try:
-        # Create the graph
-        graph = create_location_agent_graph()
-       
-        # Create a compiled graph for execution
-        app = graph.compile()
+        # Reuse the compiled graph held by the process-wide registry
+        if app is None:
+            from agents.registry import registry
+            app = registry.get("location")
        
         # Initialize the state
         initial_state = {
@@ -625,7 +633,7 @@ def run_location_agent(query: str, chronic_condition: str = "") -> Dict[str, Any
         logger.info(f"Running location agent with query: {query}, condition: {chronic_condition}")
        
         # Run the graph
-        result = app.invoke(initial_state)
+        result = await app.ainvoke(initial_state)
        
         # Extract the final results
         return {
@@ -645,4 +653,9 @@ def run_location_agent(query: str, chronic_condition: str = "") -> Dict[str, Any
                 {"role": "user", "content": query},
                 {"role": "assistant", "content": f"Sorry, I encountered an error: {str(e)}"}
             ]
-        }
\ No newline at end of file
+        }
+
+
+def run_location_agent(query: str, chronic_condition: str = "", app: Optional[Any] = None) -> Dict[str, Any]:
+    """Blocking wrapper around `arun_location_agent` for scripts and notebooks."""
+    return run_sync(arun_location_agent(query, chronic_condition, app=app))
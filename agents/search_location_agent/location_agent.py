@@ -7,6 +7,8 @@ from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 import requests
 
+from agents.sync_runner import run_sync
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -20,15 +22,22 @@ load_dotenv()
 class LocationAgent:
     """Agent for finding healthcare facilities based on location and chronic condition."""
 
-    def __init__(self):
-        """Initialize the location agent."""
+    def __init__(self, app: Optional[Any] = None):
+        """
+        Initialize the location agent.
+
+        Args:
+            app: Compiled location graph to run queries against. When omitted,
+                 the graph held by the process-wide agent registry is used.
+        """
         if not os.getenv("OPENAI_API_KEY"):
             raise ValueError("OPENAI_API_KEY environment variable not set")
         if not os.getenv("GOOGLE_API_KEY"):
             raise ValueError("GOOGLE_API_KEY environment variable not set")
+        self.app = app
         logger.info("Location agent initialized successfully")
 
-    def process_query(self, query: str, zipcode: str = "", chronic_condition: str = "",
+    async def aprocess_query(self, query: str, zipcode: str = "", chronic_condition: str = "",
                      facility_type: str = "hospital", additional_params: Dict = None) -> Dict[str, Any]:
         """
         Process a query to find healthcare facilities.
@@ -45,7 +54,7 @@ class LocationAgent:
             Dict with search results.
         """
         try:
-            from agents.search_location_agent.graph import run_location_agent
+            from agents.search_location_agent.graph import arun_location_agent
 
             if additional_params is None:
                 additional_params = {}
@@ -75,7 +84,7 @@ class LocationAgent:
 
             logger.info(f"Processing query: {enhanced_query}, condition: {chronic_condition}")
 
-            result = run_location_agent(enhanced_query, chronic_condition)
+            result = await arun_location_agent(enhanced_query, chronic_condition, app=self.app)
 
             facilities = result.get('facilities', [])
             for facility in facilities:
@@ -112,6 +121,11 @@ class LocationAgent:
                 ]
             }
 
+    def process_query(self, query: str, zipcode: str = "", chronic_condition: str = "",
+                      facility_type: str = "hospital", additional_params: Dict = None) -> Dict[str, Any]:
+        """Blocking wrapper around `aprocess_query` for scripts and notebooks."""
+        return run_sync(self.aprocess_query(query, zipcode, chronic_condition, facility_type, additional_params))
+
     def _enhance_query_with_params(self, query: str, facility_type: str, additional_params: Dict) -> str:
         """
         Enhance the query with additional parameters based on facility type.
@@ -190,8 +204,9 @@ class LocationAgent:
         return enhanced_query
 
 
-def run_location_agent(query: str, zipcode: str = "", chronic_condition: str = "",
-                      facility_type: str = "hospital", additional_params: Dict = None) -> Dict[str, Any]:
+async def arun_location_agent(query: str, zipcode: str = "", chronic_condition: str = "",
+                              facility_type: str = "hospital", additional_params: Dict = None,
+                              agent: Optional[LocationAgent] = None) -> Dict[str, Any]:
     """
     Run the location agent with the given query.
 
@@ -201,9 +216,19 @@ def run_location_agent(query: str, zipcode: str = "", chronic_condition: str = "
         chronic_condition: Optional chronic condition to filter facilities.
         facility_type: Type of facility to search for.
         additional_params: Optional additional parameters specific to facility type.
+        agent: Pre-built LocationAgent. Defaults to the shared instance in the agent registry.
 
     Returns:
         Dict with search results.
     """
-    agent = LocationAgent()
-    return agent.process_query(query, zipcode, chronic_condition, facility_type, additional_params)
+    if agent is None:
+        from agents.registry import registry
+        agent = registry.get("location_agent")
+    return await agent.aprocess_query(query, zipcode, chronic_condition, facility_type, additional_params)
+
+
+def run_location_agent(query: str, zipcode: str = "", chronic_condition: str = "",
+                       facility_type: str = "hospital", additional_params: Dict = None,
+                       agent: Optional[LocationAgent] = None) -> Dict[str, Any]:
+    """Blocking wrapper around `arun_location_agent` for scripts and notebooks."""
+    return run_sync(arun_location_agent(query, zipcode, chronic_condition, facility_type, additional_params, agent=agent))
@@ -0,0 +1,41 @@
+# FILE: agents/sync_runner.py
+
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+# ==== Background Event Loop ====
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _runner_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="agents-sync-runner", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine to completion from blocking code (scripts, notebooks, scheduler jobs).
+
+    Every call runs on one long-lived background event loop. The module-level async
+    clients (AsyncOpenAI, Tavily, httpx, the asyncpg pool, LangChain's pooled HTTP
+    client) bind to the first loop that uses them, so with `asyncio.run` a second call
+    in the same process failed with "Event loop is closed".
+    """
+    loop = _runner_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() called from the runner loop itself; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
@@ -1,15 +1,18 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from pydantic import BaseModel
 from typing import List
 import logging
 import traceback
+import json
+import asyncio
  
 # ========== LangGraph Agent Imports ==========
 from langchain_core.messages import HumanMessage, AIMessage
-from agents.orchestrator import run_agents
-from agents.nutrition_agent.nutrition_orchestrator import run_nutrition_agents
+from agents.orchestrator import arun_agents, astream_agents, intent_router
+from agents.nutrition_agent.nutrition_orchestrator import arun_nutrition_agents
  
  
 # ========== Auth & DB Setup ==========
@@ -17,11 +20,22 @@ import postgres_db.models as models
 from postgres_db.database import engine
 import users
 
+# Server-side knowledge-assistant conversations
+from session_store import session_store
+
 # Location Agent
-from agents.search_location_agent.location_agent import run_location_agent
-from typing import Optional, Dict, Any
+from agents.search_location_agent.location_agent import arun_location_agent
+from typing import Optional, Dict, Any, Literal
  
-from agents.news_agent.news_controller import run_news_agent
+from agents.news_agent.news_controller import arun_news_agent
+
+# Compiled agent graphs (built once at startup)
+from agents.registry import registry
+
+# Precomputed condition summaries
+from agents.knowledgbase_agent.summary_store import summary_refresh_loop
+from agents.knowledgbase_agent.knowledgebase_tool import embeddings_model, answer_cache
+from agents.knowledgbase_agent.local_index import chunk_store
  
  
 # ========== Configure Logging ==========
@@ -63,6 +77,28 @@ async def global_exception_handler(request: Request, exc: Exception):
 # ========== Routers ==========
 app.include_router(users.router)
  
+# ========== Startup: Build & Warm Agents ==========
+@app.on_event("startup")
+async def build_agent_registry():
+    registry.build()
+    await registry.awarm()
+    logger.info(f"✅ Agent registry ready: {registry.names}")
+ 
+# ========== Startup: Precompute Condition Summaries ==========
+@app.on_event("startup")
+async def start_summary_refresh():
+    # Precomputes missing summaries, then regenerates any left stale by new ingestion
+    app.state.summary_refresh_task = asyncio.create_task(summary_refresh_loop())
+ 
+@app.on_event("shutdown")
+async def stop_summary_refresh():
+    app.state.summary_refresh_task.cancel()
+
+# ========== Shutdown: Close Pooled Clients ==========
+@app.on_event("shutdown")
+async def close_agent_clients():
+    await registry.aclose()
+ 
 # ========== Health Check ==========
 @app.get("/")
 async def root():
@@ -80,11 +116,24 @@ class AgentRequest(BaseModel):
  
 class AgentResponse(BaseModel):
     response: str
+
+class SessionCreateRequest(BaseModel):
+    condition: Optional[str] = None
+
+class SessionMessageRequest(BaseModel):
+    input: str
+    condition: Optional[str] = None  # switches the session's condition when given
+
+class SessionResponse(BaseModel):
+    session_id: str
+    condition: Optional[str]
+    messages: List[Message]
  
 class NutritionRequest(BaseModel):
     username: str
     cuisine_types: List[str]
     meal_types: List[str]
+    mode: Optional[Literal["pipeline", "agentic"]] = None  # "pipeline" (default, no LLM) or "agentic"; overrides NUTRITION_MODE
  
 class NutritionResponse(BaseModel):
     response: str
@@ -104,9 +153,35 @@ class NewsResponse(BaseModel):
     news: Dict[str, Any]  
  
  
+# ========== Helpers ==========
+def format_chat_history(chat_history: List[Message]) -> list:
+    formatted_history = []
+    for msg in chat_history:
+        if msg.type == "human":
+            formatted_history.append(HumanMessage(content=msg.content))
+        elif msg.type == "ai":
+            formatted_history.append(AIMessage(content=msg.content))
+    return formatted_history
+ 
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def require_session(session_id: str):
+    state = await session_store.get(session_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found")
+    return state
+
+def session_response(state) -> SessionResponse:
+    return SessionResponse(
+        session_id=state.id,
+        condition=state.condition,
+        messages=[Message(type=msg.type, content=msg.content) for msg in state.messages]
+    )
+ 
 # ========== Endpoint: Knowledge Assistant ==========
 @app.post("/agent", response_model=AgentResponse)
-def agent_endpoint(req: AgentRequest):
+async def agent_endpoint(req: AgentRequest):
     print("\n===================== 🚨 /agent called =====================")
     print(f"📥 Input: {req.input}")
     print(f"🩺 Condition: {req.condition}")
@@ -115,18 +190,14 @@ def agent_endpoint(req: AgentRequest):
         print(f"  [{msg.type.upper()}] {msg.content}")
  
     # Format chat history for LangGraph
-    formatted_history = []
-    for msg in req.chat_history:
-        if msg.type == "human":
-            formatted_history.append(HumanMessage(content=msg.content))
-        elif msg.type == "ai":
-            formatted_history.append(AIMessage(content=msg.content))
+    formatted_history = format_chat_history(req.chat_history)
  
     try:
-        response = run_agents(
+        response = await arun_agents(
             input_text=req.input,
             chat_history=formatted_history,
-            condition=req.condition
+            condition=req.condition,
+            app=registry.get("knowledge")
         )
         print(f"✅ Final Agent Response: {response[:300]}...\n")
         return AgentResponse(response=response)
@@ -135,21 +206,147 @@ def agent_endpoint(req: AgentRequest):
         logger.error(f"❌ Error in LangGraph agent execution: {str(e)}", exc_info=True)
         return AgentResponse(response="Sorry, something went wrong while processing your request.")
  
+# ========== Endpoint: Knowledge Assistant (SSE Streaming) ==========
+@app.post("/agent/stream")
+async def agent_stream_endpoint(req: AgentRequest):
+    """
+    Server-sent-event variant of /agent. Emits `tool`, `token` and `section`
+    events as soon as they are produced, then a final `done` event.
+    """
+    print("\n===================== 📡 /agent/stream called =====================")
+    print(f"📥 Input: {req.input}")
+    print(f"🩺 Condition: {req.condition}")
+ 
+    formatted_history = format_chat_history(req.chat_history)
+ 
+    async def event_stream():
+        try:
+            async for event in astream_agents(
+                input_text=req.input,
+                chat_history=formatted_history,
+                condition=req.condition,
+                oracle=registry.get("knowledge_oracle")
+            ):
+                yield format_sse(event["event"], event["data"])
+        except Exception as e:
+            logger.error(f"❌ Error in /agent/stream: {str(e)}", exc_info=True)
+            yield format_sse("error", "Sorry, something went wrong while processing your request.")
+        yield format_sse("done", {})
+ 
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+ 
+# ========== Endpoints: Knowledge Assistant Sessions ==========
+@app.post("/sessions", response_model=SessionResponse)
+async def create_session(req: SessionCreateRequest):
+    """
+    Start a server-side conversation; later messages send only the session id and the new input
+    """
+    return session_response(await session_store.create(req.condition))
+
+@app.get("/sessions/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str):
+    return session_response(await require_session(session_id))
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not await session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found")
+    return {"deleted": session_id}
+
+@app.post("/sessions/{session_id}/messages", response_model=AgentResponse)
+async def session_message_endpoint(session_id: str, req: SessionMessageRequest):
+    """
+    /agent for a stored session: the history comes from the session store, not the request
+    """
+    state = await require_session(session_id)
+    condition = req.condition or state.condition
+    print(f"\n===================== 💬 /sessions/{session_id}/messages =====================")
+    print(f"📥 Input: {req.input} | 🩺 Condition: {condition} | 📚 History: {len(state.messages)} messages")
+
+    try:
+        response = await arun_agents(
+            input_text=req.input,
+            chat_history=list(state.messages),
+            condition=condition,
+            app=registry.get("knowledge")
+        )
+    except Exception as e:
+        # Nothing is stored, so the history never holds a question without its answer
+        logger.error(f"❌ Error in session agent execution: {str(e)}", exc_info=True)
+        return AgentResponse(response="Sorry, something went wrong while processing your request.")
+
+    try:
+        await session_store.append_turn(state, req.input, response, condition=condition)
+    except Exception as e:
+        # The answer exists; failing to store it must not turn it into an error for the user
+        logger.error(f"❌ Could not store the exchange for session {session_id}: {str(e)}", exc_info=True)
+    return AgentResponse(response=response)
+
+@app.post("/sessions/{session_id}/messages/stream")
+async def session_message_stream_endpoint(session_id: str, req: SessionMessageRequest):
+    """
+    SSE variant of /sessions/{id}/messages; the message and the full reply are stored together once the stream completes
+    """
+    state = await require_session(session_id)
+    condition = req.condition or state.condition
+    print(f"\n===================== 📡 /sessions/{session_id}/messages/stream =====================")
+    print(f"📥 Input: {req.input} | 🩺 Condition: {condition} | 📚 History: {len(state.messages)} messages")
+
+    async def event_stream():
+        tokens, sections = [], {}
+        try:
+            async for event in astream_agents(
+                input_text=req.input,
+                chat_history=list(state.messages),
+                condition=condition,
+                oracle=registry.get("knowledge_oracle")
+            ):
+                if event["event"] == "token":
+                    tokens.append(event["data"])
+                elif event["event"] == "section":
+                    sections[event["data"]["index"]] = f"### {event['data']['question']}\n{event['data']['answer']}"
+                yield format_sse(event["event"], event["data"])
+        except Exception as e:
+            logger.error(f"❌ Error in session stream: {str(e)}", exc_info=True)
+            yield format_sse("error", "Sorry, something went wrong while processing your request.")
+            yield format_sse("done", {})
+            return
+
+        reply = "\n\n".join([sections[idx] for idx in sorted(sections)] + (["".join(tokens)] if tokens else []))
+        if reply:
+            try:
+                await session_store.append_turn(state, req.input, reply, condition=condition)
+            except Exception as e:
+                # The user already has the whole reply; log instead of sending an error event
+                logger.error(f"❌ Could not store the exchange for session {session_id}: {str(e)}", exc_info=True)
+        yield format_sse("done", {})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ========== Endpoint: Nutrition Assistant ==========
 @app.post("/nutrition", response_model=NutritionResponse)
-def nutrition_endpoint(req: NutritionRequest):
+async def nutrition_endpoint(req: NutritionRequest):
     print("\n===================== 🥗 /nutrition called =====================")
     print(f"👤 Username: {req.username}")
     print(f"🍛 Cuisines: {req.cuisine_types}")
     print(f"🕒 Meals: {req.meal_types}")
  
     try:
-        result = run_nutrition_agents(
+        result = await arun_nutrition_agents(
             username=req.username,
             cuisine_types=req.cuisine_types,
             meal_types=req.meal_types,
             input_text="",       # Optional for now; may be used in future chat prompts
-            chat_history=[]      # Expand to full conversation if needed
+            chat_history=[],     # Expand to full conversation if needed
+            mode=req.mode
         )
         print(f"✅ Nutrition Agent Output: {result[:300]}...\n")
         return NutritionResponse(response=result)
@@ -173,12 +370,13 @@ async def search_facilities(request: LocationSearchRequest):
         else:
             query = request.query
  
-        result = run_location_agent(
+        result = await arun_location_agent(
             query=query,
             zipcode=request.zipcode,
             chronic_condition=request.chronic_condition,
             facility_type=request.facility_type,
-            additional_params=request.additional_params
+            additional_params=request.additional_params,
+            agent=registry.get("location_agent")
         )
  
         return result
@@ -204,6 +402,31 @@ async def get_chronic_conditions():
     ]
 
  
+@app.get("/kb/cache-stats")
+async def get_kb_cache_stats():
+    """
+    Hit/miss counters for the knowledge-base embedding and answer caches, the chunk text store and the session hot tier
+    """
+    return {"embeddings": embeddings_model.stats(), "answers": answer_cache.stats(),
+            "chunks": chunk_store.stats(), "sessions": session_store.stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus exposition: LLM/embedding latency histograms and request, error, token and cost counters
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/kb/router-stats")
+async def get_kb_router_stats():
+    """
+    How often the knowledge-base router decided without the LLM oracle, with p50 latency per path
+    """
+    return intent_router.stats()
+
+ 
 @app.get("/facility-types")
 async def get_facility_types():
     """
@@ -217,12 +440,12 @@ async def get_facility_types():
     ]
  
 @app.post("/news", response_model=NewsResponse)
-def fetch_news(req: NewsRequest):
+async def fetch_news(req: NewsRequest):
     """
     Fetch latest news for a chronic condition using the news LangGraph agent
     """
     try:
-        result = run_news_agent(req.condition)
+        result = await arun_news_agent(req.condition, app=registry.get("news"))
         return NewsResponse(condition=req.condition, news=result)
  
     except Exception as e:
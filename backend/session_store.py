@@ -0,0 +1,143 @@
+# FILE: backend/session_store.py
+
+import os
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select, delete, update, func
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+
+from postgres_db.database import AsyncSessionLocal
+from postgres_db.models import ChatSession, ChatSessionMessage
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# ==== Config ====
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "512"))  # sessions kept in the hot tier
+
+
+def to_message(message_type: str, content: str) -> BaseMessage:
+    return HumanMessage(content=content) if message_type == "human" else AIMessage(content=content)
+
+
+# ==== Session State ====
+class SessionState:
+    """One conversation held in memory: its condition and LangChain message history."""
+
+    def __init__(self, session_id: str, condition: Optional[str], messages: List[BaseMessage]):
+        self.id = session_id
+        self.condition = condition
+        self.messages = messages
+        self.lock = asyncio.Lock()  # keeps message sequence numbers in order per session
+
+
+# ==== Session Store ====
+class SessionStore:
+    """
+    Conversation history for the knowledge assistant, persisted in Postgres
+    with an in-memory LRU hot tier. Active sessions are served from memory;
+    a cold session is loaded from Postgres once and then stays hot. Every
+    appended message is written through, so a restart loses nothing.
+    """
+
+    def __init__(self, max_size: int = SESSION_CACHE_SIZE):
+        self.max_size = max_size
+        self._hot: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._stats = {"hot_hits": 0, "db_loads": 0, "misses": 0}
+
+    def _remember(self, state: SessionState) -> SessionState:
+        self._hot[state.id] = state
+        self._hot.move_to_end(state.id)
+        while len(self._hot) > self.max_size:
+            self._hot.popitem(last=False)
+        return state
+
+    async def create(self, condition: Optional[str] = None) -> SessionState:
+        session_id = str(uuid.uuid4())
+        async with AsyncSessionLocal() as db:
+            db.add(ChatSession(id=session_id, condition=condition))
+            await db.commit()
+        logger.info(f"[💬 Sessions] Created {session_id} ({condition})")
+        return self._remember(SessionState(session_id, condition, []))
+
+    @staticmethod
+    async def _load_messages(db, session_id: str) -> List[BaseMessage]:
+        result = await db.execute(
+            select(ChatSessionMessage.type, ChatSessionMessage.content)
+            .where(ChatSessionMessage.session_id == session_id)
+            .order_by(ChatSessionMessage.seq)
+        )
+        return [to_message(message_type, content) for message_type, content in result.all()]
+
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        state = self._hot.get(session_id)
+        if state is not None:
+            self._hot.move_to_end(session_id)
+            self._stats["hot_hits"] += 1
+            return state
+
+        async with AsyncSessionLocal() as db:
+            session = await db.get(ChatSession, session_id)
+            if session is None:
+                self._stats["misses"] += 1
+                return None
+            messages = await self._load_messages(db, session_id)
+
+        self._stats["db_loads"] += 1
+        return self._remember(SessionState(session_id, session.condition, messages))
+
+    async def append_turn(self, state: SessionState, human: str, ai: str, condition: Optional[str] = None) -> None:
+        """
+        Add one completed exchange (the user's message and the reply) in a single
+        transaction, in memory and in Postgres. Only called once the reply exists, so a
+        failed request never leaves a human message without its answer.
+
+        The next sequence number is read from Postgres under a row lock on the
+        session, not from the hot tier: another worker may have appended to the
+        same session. When it has, the in-memory history is reloaded.
+        """
+        async with state.lock:
+            async with AsyncSessionLocal() as db:
+                session = await db.get(ChatSession, state.id, with_for_update=True)
+                if session is None:
+                    raise LookupError(f"Session '{state.id}' no longer exists")
+                seq = (await db.execute(
+                    select(func.coalesce(func.max(ChatSessionMessage.seq) + 1, 0))
+                    .where(ChatSessionMessage.session_id == state.id)
+                )).scalar_one()
+                db.add_all([
+                    ChatSessionMessage(session_id=state.id, seq=seq, type="human", content=human),
+                    ChatSessionMessage(session_id=state.id, seq=seq + 1, type="ai", content=ai),
+                ])
+                # Also bumps updated_at, even when the condition is unchanged
+                await db.execute(update(ChatSession).where(ChatSession.id == state.id).values(
+                    condition=condition or state.condition))
+                await db.commit()
+
+                if seq == len(state.messages):
+                    state.messages.extend([to_message("human", human), to_message("ai", ai)])
+                else:
+                    logger.info(f"[💬 Sessions] {state.id} was updated elsewhere; reloading its history")
+                    state.messages = await self._load_messages(db, state.id)
+            if condition:
+                state.condition = condition
+
+    async def delete(self, session_id: str) -> bool:
+        self._hot.pop(session_id, None)
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(ChatSessionMessage).where(ChatSessionMessage.session_id == session_id))
+            result = await db.execute(delete(ChatSession).where(ChatSession.id == session_id))
+            await db.commit()
+        return result.rowcount > 0
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "hot_sessions": len(self._hot)}
+
+
+# ==== Default Store ====
+session_store = SessionStore()
@@ -0,0 +1,74 @@
+# FILE: benchmarks/chunk_store.py
+"""
+Measure what keeping chunk texts out of Pinecone saves: response bytes and
+latency of a Pinecone query returning full metadata versus one returning
+ids/scores only, followed by hydrating the texts from the local chunk store.
+Run it before `local_index.py --strip-text` to compare both shapes on the
+same index; queries are snapshot vectors plus noise, so no embedding calls.
+
+    python agents/knowledgbase_agent/local_index.py --conditions CKD   # snapshot + chunk store
+    python benchmarks/chunk_store.py --conditions CKD --queries 30 --top-k 50
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.knowledgbase_agent.pinecone_utils import index, local_index, chunk_store
+from benchmarks.vector_backends import sample_queries, summarize
+
+
+def response_bytes(response) -> int:
+    return len(json.dumps(response.to_dict(), default=str).encode("utf-8"))
+
+
+def run_shape(queries, condition: str, top_k: int, with_metadata: bool):
+    latencies, sizes = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = index.query(vector=query.tolist(), top_k=top_k, filter={"condition": condition},
+                               include_metadata=with_metadata)
+        matches = [{"id": m["id"], "score": m["score"], "metadata": m.get("metadata") or {}}
+                   for m in response.get("matches", [])]
+        if not with_metadata:
+            matches = chunk_store.hydrate(matches)
+        latencies.append((time.perf_counter() - start) * 1000)
+        sizes.append(response_bytes(response))
+    return latencies, sizes
+
+
+def main(conditions, count: int, top_k: int, noise: float):
+    report = {}
+    for condition in conditions:
+        snapshot = local_index._snapshot(condition)
+        if snapshot is None:
+            print(f"⚠️ No local snapshot for {condition}, skipping.")
+            continue
+
+        queries = sample_queries(snapshot.matrix, count, noise)
+        entry = {"queries": len(queries), "top_k": top_k, "chunk_store_rows": chunk_store.count(condition)}
+        for label, with_metadata in (("pinecone_metadata", True), ("ids_plus_local_hydrate", False)):
+            latencies, sizes = run_shape(queries, condition, top_k, with_metadata)
+            entry[label] = {**summarize(latencies), "response_bytes_mean": int(statistics.mean(sizes))}
+
+        before = entry["pinecone_metadata"]["response_bytes_mean"]
+        after = entry["ids_plus_local_hydrate"]["response_bytes_mean"]
+        entry["response_bytes_drop"] = f"{100 * (before - after) / max(1, before):.1f}%"
+        report[condition] = entry
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Pinecone metadata payloads vs local chunk hydration")
+    parser.add_argument("--conditions", nargs="+", default=["CKD"])
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument("--noise", type=float, default=0.01)
+    args = parser.parse_args()
+
+    print(json.dumps(main(args.conditions, args.queries, args.top_k, args.noise), indent=2))
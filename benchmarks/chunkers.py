@@ -0,0 +1,114 @@
+# FILE: benchmarks/chunkers.py
+"""
+Micro-benchmark of the legacy `recursive_split` against the streaming
+tiktoken chunker on a large markdown document. With no `--file`, a synthetic
+document of `--pages` pages (headings, paragraphs, bullet lists) is generated.
+
+    python benchmarks/chunkers.py --pages 500
+    python benchmarks/chunkers.py --file CKD_1.md
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.knowledgbase_agent.text_splitter import stream_chunks, get_encoding
+
+WORDS = ("kidney blood pressure glucose insulin diet sodium protein patient treatment stage "
+         "symptom fatigue swelling medication dialysis exercise cholesterol fiber risk doctor").split()
+
+
+# ==== Legacy splitter (word counts, not tiktoken) ====
+def token_count(text: str) -> int:
+    return len(text.split())
+
+
+def recursive_split(text, max_tokens=300):
+    if token_count(text) <= max_tokens:
+        return [text]
+
+    for splitter in ["\n\n", "\n", ". "]:
+        parts = text.split(splitter)
+        if len(parts) == 1:
+            continue
+
+        chunks, current = [], ""
+        for part in parts:
+            candidate = (current + splitter + part).strip() if current else part.strip()
+            if token_count(candidate) <= max_tokens:
+                current = candidate
+            else:
+                if current:
+                    chunks.extend(recursive_split(current, max_tokens))
+                current = part.strip()
+
+        if current:
+            chunks.extend(recursive_split(current, max_tokens))
+
+        return chunks
+
+    return [text]
+
+
+def synthetic_markdown(pages: int, words_per_page: int = 450, seed: int = 11) -> str:
+    rng = random.Random(seed)
+    out = []
+    for page in range(pages):
+        if page % 3 == 0:
+            out.append(f"## Section {page // 3 + 1}\n")
+        remaining = words_per_page
+        while remaining > 0:
+            n = min(remaining, rng.randint(40, 120))
+            sentence = " ".join(rng.choice(WORDS) for _ in range(n))
+            out.append(f"- {sentence}." if rng.random() < 0.2 else f"{sentence}.")
+            out.append("")
+            remaining -= n
+    return "\n".join(out)
+
+
+def measure(name: str, split_fn, text: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = list(split_fn(text))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    encoding = get_encoding()
+    sizes = [len(encoding.encode(chunk)) for chunk in chunks]
+    return {
+        "splitter": name,
+        "seconds": round(elapsed, 3),
+        "chunks": len(chunks),
+        "tokens_mean": round(statistics.mean(sizes), 1) if sizes else 0,
+        "tokens_max": max(sizes) if sizes else 0,
+        "peak_mem_mb": round(peak / 1e6, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark markdown chunkers")
+    parser.add_argument("--file", help="Markdown file to split (default: synthetic document)")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--max-tokens", type=int, default=300)
+    parser.add_argument("--overlap", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = synthetic_markdown(args.pages)
+
+    results = [
+        measure("recursive_split", lambda t: recursive_split(t, max_tokens=args.max_tokens), text),
+        measure("stream_chunks", lambda t: stream_chunks(t, max_tokens=args.max_tokens, overlap_tokens=args.overlap), text),
+    ]
+    print(json.dumps({"characters": len(text), "results": results}, indent=2))
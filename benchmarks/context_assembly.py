@@ -0,0 +1,129 @@
+# FILE: benchmarks/context_assembly.py
+"""
+Compare context assembly modes of `run_vector_search` on a fixed question set:
+prompt tokens, answer latency and answer quality. Quality is graded 1-5 by a
+judge model against the full retrieved context, so a mode that drops a needed
+fact scores lower even if its answer reads well.
+
+    python benchmarks/context_assembly.py --conditions CKD Type2 --budget 2500
+"""
+
+import os
+import sys
+import re
+import time
+import json
+import asyncio
+import argparse
+import statistics
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.knowledgbase_agent.knowledgebase_tool import (
+    embeddings_model, llm, count_tokens, retrieve_vector_context, build_vector_prompt, CONTEXT_CANDIDATES
+)
+from agents.knowledgbase_agent.pinecone_utils import hybrid_query_chunks
+
+MODES = ["all", "mmr"]
+
+QUESTIONS = {
+    "CKD": [
+        "What eGFR range defines stage 3 chronic kidney disease?",
+        "How much protein should someone with CKD eat per day?",
+        "Which foods are high in potassium and should be limited?",
+        "Why is phosphorus restricted in kidney disease?",
+        "How does blood pressure control slow CKD progression?",
+    ],
+    "Type2": [
+        "What HbA1c target is recommended for most adults with type 2 diabetes?",
+        "How does metformin lower blood glucose?",
+        "Which carbohydrates have a low glycemic index?",
+        "What are early symptoms of hypoglycemia?",
+        "How much physical activity is recommended per week?",
+    ],
+    "Hypertension": [
+        "What is the DASH diet?",
+        "How much sodium per day is recommended for people with high blood pressure?",
+        "Which classes of medication are first-line for hypertension?",
+        "How does alcohol affect blood pressure?",
+        "What blood pressure reading counts as stage 2 hypertension?",
+    ],
+    "Cholesterol": [
+        "What is the difference between LDL and HDL cholesterol?",
+        "Which foods help lower LDL cholesterol?",
+        "How do statins work?",
+        "What are the side effects of statins?",
+        "How does soluble fiber affect cholesterol?",
+    ],
+}
+
+JUDGE_PROMPT = """You are grading an answer to a medical question against reference material.
+
+Reference material:
+{reference}
+
+Question: {question}
+
+Answer:
+{answer}
+
+Score the answer from 1 (wrong or missing key facts) to 5 (correct and complete given the reference).
+Reply with the number only."""
+
+
+async def judge(question: str, answer: str, reference: str) -> int:
+    response = await llm.ainvoke(JUDGE_PROMPT.format(reference=reference, question=question, answer=answer))
+    match = re.search(r"[1-5]", response.content if response else "")
+    return int(match.group()) if match else 0
+
+
+async def run_question(question: str, condition: str, mode: str, reference: str, query_vector):
+    start = time.perf_counter()
+    context = await retrieve_vector_context(question, condition, query_vector, mode=mode)
+    response = await llm.ainvoke(build_vector_prompt(context or "", question))
+    latency = time.perf_counter() - start
+
+    answer = response.content.strip() if response else ""
+    return {
+        "prompt_tokens": count_tokens(build_vector_prompt(context or "", question)),
+        "latency_s": latency,
+        "quality": await judge(question, answer, reference),
+    }
+
+
+async def main(conditions, budget: int):
+    if budget:
+        import agents.knowledgbase_agent.knowledgebase_tool as knowledgebase_tool
+        knowledgebase_tool.CONTEXT_TOKEN_BUDGET = budget
+
+    report = {}
+    for condition in conditions:
+        rows = {mode: [] for mode in MODES}
+        for question in QUESTIONS.get(condition, []):
+            query_vector = await embeddings_model.aembed_query(question)
+            # The judge sees every candidate chunk, the widest context either mode could draw from
+            candidates = await asyncio.to_thread(hybrid_query_chunks, question, query_vector,
+                                                 condition=condition, top_k=CONTEXT_CANDIDATES)
+            reference = "\n\n".join(match["metadata"]["text"] for match in candidates)
+            for mode in MODES:
+                rows[mode].append(await run_question(question, condition, mode, reference, query_vector))
+
+        report[condition] = {
+            mode: {
+                "questions": len(results),
+                "prompt_tokens_mean": int(statistics.mean(r["prompt_tokens"] for r in results)),
+                "latency_s_median": round(statistics.median(r["latency_s"] for r in results), 2),
+                "quality_mean": round(statistics.mean(r["quality"] for r in results), 2),
+            }
+            for mode, results in rows.items() if results
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark context assembly modes for vector search")
+    parser.add_argument("--conditions", nargs="+", default=list(QUESTIONS))
+    parser.add_argument("--budget", type=int, default=None, help="Override CONTEXT_TOKEN_BUDGET")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(main(args.conditions, args.budget)), indent=2))
@@ -0,0 +1,84 @@
+# FILE: benchmarks/load_test.py
+"""
+Concurrent load test for the FastAPI agent endpoints.
+
+Fires `--requests` POSTs at one endpoint with `--concurrency` in flight and
+reports throughput and latency percentiles. Run it against a single uvicorn
+worker before and after a change to compare:
+
+    uvicorn main:app --workers 1
+    python benchmarks/load_test.py --endpoint /news --requests 400 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+# ==== Sample Payloads per Endpoint ====
+PAYLOADS = {
+    "/agent": {"input": "What are the symptoms?", "condition": "CKD", "chat_history": []},
+    "/nutrition": {"username": "demo", "cuisine_types": ["Indian"], "meal_types": ["Lunch"]},
+    "/news": {"condition": "Hypertension"},
+    "/search-facilities": {"query": "Boston", "zipcode": "02115", "chronic_condition": "CKD", "facility_type": "hospital"},
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def run_load(base_url: str, endpoint: str, total: int, concurrency: int, timeout: float, payload: dict):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one_request():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(endpoint, json=payload)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*[one_request() for _ in range(total)])
+        wall = time.perf_counter() - wall_start
+
+    return {
+        "endpoint": endpoint,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_s": round(wall, 2),
+        "throughput_rps": round(total / wall, 2) if wall else 0.0,
+        "p50_s": round(statistics.median(latencies), 3) if latencies else 0.0,
+        "p95_s": round(percentile(latencies, 95), 3),
+        "p99_s": round(percentile(latencies, 99), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a FastAPI agent endpoint")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="/news", choices=sorted(PAYLOADS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load(args.base_url, args.endpoint, args.requests,
+                                  args.concurrency, args.timeout, PAYLOADS[args.endpoint]))
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,77 @@
+# FILE: benchmarks/nutrition_modes.py
+"""
+Compare the nutrition orchestrator's deterministic pipeline against the
+agentic (gpt-4o-mini oracle) mode on wall time, LLM calls, tokens and cost
+for the same user and selections. Both modes hit the same Postgres and
+Snowflake, so the difference is the oracle round-trips.
+
+    python benchmarks/nutrition_modes.py --username alice --cuisines Indian --meals Breakfast Lunch --repeats 3
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import statistics
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.callbacks import get_usage_metadata_callback
+from agents.nutrition_agent.nutrition_orchestrator import (
+    arun_nutrition_agents, create_nutrition_graph, create_nutrition_pipeline_graph
+)
+
+MODES = {"pipeline": create_nutrition_pipeline_graph, "agentic": create_nutrition_graph}
+
+# gpt-4o-mini list price, USD per 1M tokens
+INPUT_PRICE_PER_M = float(os.getenv("GPT4O_MINI_INPUT_PRICE", "0.15"))
+OUTPUT_PRICE_PER_M = float(os.getenv("GPT4O_MINI_OUTPUT_PRICE", "0.60"))
+
+
+async def time_mode(app, username: str, cuisines, meals):
+    with get_usage_metadata_callback() as usage_cb:
+        start = time.perf_counter()
+        await arun_nutrition_agents("", username, cuisines, meals, [], app=app)
+        wall = time.perf_counter() - start
+
+    usage = {"input_tokens": 0, "output_tokens": 0}
+    for model_usage in usage_cb.usage_metadata.values():
+        usage["input_tokens"] += model_usage.get("input_tokens", 0)
+        usage["output_tokens"] += model_usage.get("output_tokens", 0)
+    return wall, usage
+
+
+async def main(username: str, cuisines, meals, repeats: int):
+    report = {}
+    for mode, factory in MODES.items():
+        app = factory()
+        walls, inputs, outputs = [], [], []
+        for _ in range(repeats):
+            wall, usage = await time_mode(app, username, cuisines, meals)
+            walls.append(wall)
+            inputs.append(usage["input_tokens"])
+            outputs.append(usage["output_tokens"])
+
+        input_tokens, output_tokens = statistics.mean(inputs), statistics.mean(outputs)
+        report[mode] = {
+            "wall_s_median": round(statistics.median(walls), 2),
+            "input_tokens": int(input_tokens),
+            "output_tokens": int(output_tokens),
+            "cost_usd_per_request": round(
+                (input_tokens * INPUT_PRICE_PER_M + output_tokens * OUTPUT_PRICE_PER_M) / 1_000_000, 6
+            ),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark nutrition pipeline vs agentic mode")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--cuisines", nargs="+", default=["Indian"])
+    parser.add_argument("--meals", nargs="+", default=["Breakfast", "Lunch"])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(main(args.username, args.cuisines, args.meals, args.repeats)), indent=2))
@@ -0,0 +1,56 @@
+# FILE: benchmarks/ocr_page_ranges.py
+"""
+Time Mistral OCR of one local PDF at several page-range sizes to pick
+OCR_PAGES_PER_REQUEST. The PDF is uploaded once; only the OCR phase is timed
+and nothing is written to S3. `0` means the whole document in one request.
+
+    python benchmarks/ocr_page_ranges.py guideline.pdf --sizes 0 10 20 50 --concurrency 4
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.knowledgbase_agent.mistral_ai import (
+    mistral_client,
+    count_pdf_pages,
+    page_ranges,
+    ocr_page_range,
+)
+
+
+def time_ranges(document_url: str, page_count: int, size: int, concurrency: int, label: str):
+    ranges = page_ranges(range(page_count), size, page_count) if size else [None]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(ranges))) as pool:
+        pages = [page for result in pool.map(lambda r: ocr_page_range(document_url, r, label), ranges) for page in result]
+    return {
+        "pages_per_request": size or page_count,
+        "requests": len(ranges),
+        "pages_returned": len(pages),
+        "wall_s": round(time.perf_counter() - start, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Mistral OCR page-range sizes")
+    parser.add_argument("pdf")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 10, 20, 50])
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        pdf_bytes = f.read()
+    page_count = count_pdf_pages(pdf_bytes)
+    label = os.path.basename(args.pdf)
+
+    uploaded = mistral_client.files.upload(file={"file_name": label, "content": pdf_bytes}, purpose="ocr")
+    signed_url = mistral_client.files.get_signed_url(file_id=uploaded.id, expiry=2)
+
+    results = [time_ranges(signed_url.url, page_count, size, args.concurrency, label) for size in args.sizes]
+    print(json.dumps({"pdf": label, "pages": page_count, "results": results}, indent=2))
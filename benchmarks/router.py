@@ -0,0 +1,81 @@
+# FILE: benchmarks/router.py
+"""
+Compare knowledge-base routing with the fast path (rules → centroid → oracle
+fallback) against the gpt-4o oracle on every message: how often the fast path
+decides, whether it agrees with the labels, and p50 routing latency.
+
+    python benchmarks/router.py --repeats 2
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import statistics
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.orchestrator import init_oracle_agent, intent_router, run_oracle
+
+MESSAGES = [
+    ("generate report", "generate_summary"),
+    ("Give me a complete overview of my condition", "generate_summary"),
+    ("summarize CKD for me", "generate_summary"),
+    ("I'd like the full report please", "generate_summary"),
+    ("Tell me everything about this disease", "generate_summary"),
+    ("What are the symptoms of stage 3 CKD?", "vector_search"),
+    ("Which fruits are low in potassium?", "vector_search"),
+    ("how much salt per day is safe", "vector_search"),
+    ("Can I drink coffee with high blood pressure?", "vector_search"),
+    ("side effects of statins", "vector_search"),
+    ("foods to avoid with gluten intolerance", "vector_search"),
+    ("tell me about insulin resistance", "vector_search"),
+    ("exercise tips", "vector_search"),
+    ("is oatmeal good for cholesterol", "vector_search"),
+    ("Can you summarize the side effects of metformin?", "vector_search"),
+    ("Summarize the dietary potassium limits", "vector_search"),
+    ("What is the overall picture for salt intake?", "vector_search"),
+]
+
+
+def state_for(text: str):
+    return {"input": text, "chat_history": [], "intermediate_steps": [], "condition": "CKD"}
+
+
+async def time_route(oracle, text: str, fast: bool):
+    import agents.orchestrator as orchestrator
+    orchestrator.ROUTER_MODE = "fast" if fast else "oracle"
+    start = time.perf_counter()
+    result = await run_oracle(state_for(text), oracle)
+    return (time.perf_counter() - start) * 1000, result["intermediate_steps"][-1].tool
+
+
+async def main(repeats: int):
+    oracle = init_oracle_agent()
+    report = {}
+    for label, fast in (("oracle_only", False), ("fast_path", True)):
+        latencies, correct = [], 0
+        for _ in range(repeats):
+            for text, expected in MESSAGES:
+                ms, tool_name = await time_route(oracle, text, fast)
+                latencies.append(ms)
+                correct += tool_name == expected
+        report[label] = {
+            "p50_ms": round(statistics.median(latencies), 1),
+            "accuracy": round(correct / (repeats * len(MESSAGES)), 3),
+        }
+
+    report["router_stats"] = intent_router.stats()
+    before, after = report["oracle_only"]["p50_ms"], report["fast_path"]["p50_ms"]
+    report["p50_drop"] = f"{100 * (before - after) / max(before, 1e-9):.1f}%"
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark fast-path routing vs the LLM oracle")
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(main(args.repeats)), indent=2))
@@ -0,0 +1,70 @@
+# FILE: benchmarks/summary_modes.py
+"""
+Compare the summary execution modes of `run_generate_summary` on wall time
+and token usage. Retrieval runs once per condition so only the LLM answering
+phase is timed.
+
+    python benchmarks/summary_modes.py --conditions CKD Type2 --repeats 3
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import statistics
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.callbacks import get_usage_metadata_callback
+from agents.knowledgbase_agent.knowledgebase_tool import retrieve_summary_context, iter_summary_answers
+
+MODES = ["sequential", "concurrent", "single"]
+
+
+async def time_mode(context: str, mode: str, concurrency: int):
+    with get_usage_metadata_callback() as usage_cb:
+        start = time.perf_counter()
+        answers = [item async for item in iter_summary_answers(context, mode=mode, concurrency=concurrency)]
+        wall = time.perf_counter() - start
+
+    usage = {"input_tokens": 0, "output_tokens": 0}
+    for model_usage in usage_cb.usage_metadata.values():
+        usage["input_tokens"] += model_usage.get("input_tokens", 0)
+        usage["output_tokens"] += model_usage.get("output_tokens", 0)
+    return wall, usage, len(answers)
+
+
+async def main(conditions, repeats: int, concurrency: int):
+    report = {}
+    for condition in conditions:
+        context = await retrieve_summary_context(condition)
+        if context is None:
+            print(f"⚠️ No context for {condition}, skipping.")
+            continue
+
+        for mode in MODES:
+            walls, inputs, outputs = [], [], []
+            for _ in range(repeats):
+                wall, usage, _ = await time_mode(context, mode, concurrency)
+                walls.append(wall)
+                inputs.append(usage["input_tokens"])
+                outputs.append(usage["output_tokens"])
+
+            report.setdefault(condition, {})[mode] = {
+                "wall_s_median": round(statistics.median(walls), 2),
+                "input_tokens": int(statistics.mean(inputs)),
+                "output_tokens": int(statistics.mean(outputs)),
+            }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark summary execution modes")
+    parser.add_argument("--conditions", nargs="+", default=["CKD"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=7)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(main(args.conditions, args.repeats, args.concurrency)), indent=2))
@@ -0,0 +1,89 @@
+# FILE: benchmarks/vector_backends.py
+"""
+Compare the local memory-mapped index against Pinecone on query latency and
+top-k agreement. Queries are taken from the snapshot itself (each chunk
+vector plus a little noise), so the local half runs fully offline:
+
+    python agents/knowledgbase_agent/local_index.py          # export snapshots first
+    python benchmarks/vector_backends.py --conditions CKD --queries 100
+    python benchmarks/vector_backends.py --conditions CKD --pinecone
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.knowledgbase_agent.local_index import LocalVectorIndex
+
+
+def sample_queries(snapshot_matrix, count: int, noise: float, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(snapshot_matrix), size=min(count, len(snapshot_matrix)), replace=False)
+    queries = np.asarray(snapshot_matrix[rows], dtype=np.float32)
+    return queries + rng.normal(0, noise, size=queries.shape).astype(np.float32)
+
+
+def time_backend(query_fn, queries):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(query_fn(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, results
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+        "mean_ms": round(statistics.mean(ordered), 3),
+    }
+
+
+def main(conditions, count: int, top_k: int, noise: float, with_pinecone: bool):
+    local = LocalVectorIndex()
+    if with_pinecone:
+        from agents.knowledgbase_agent.pinecone_utils import query_chunks_from_pinecone
+
+    report = {}
+    for condition in conditions:
+        snapshot = local._snapshot(condition)
+        if snapshot is None:
+            print(f"⚠️ No local snapshot for {condition}, skipping.")
+            continue
+
+        queries = sample_queries(snapshot.matrix, count, noise)
+        local_lat, local_res = time_backend(lambda q: local.query(q, condition, top_k=top_k), queries)
+        entry = {"chunks": int(snapshot.matrix.shape[0]), "queries": len(queries), "local": summarize(local_lat)}
+
+        if with_pinecone:
+            pc_lat, pc_res = time_backend(lambda q: query_chunks_from_pinecone(q.tolist(), condition, top_k=top_k), queries)
+            overlaps = [
+                len({m["id"] for m in a} & {m["id"] for m in b}) / max(1, len(b))
+                for a, b in zip(local_res, pc_res)
+            ]
+            entry["pinecone"] = summarize(pc_lat)
+            entry[f"overlap@{top_k}"] = round(statistics.mean(overlaps), 4)
+
+        report[condition] = entry
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark local vector index vs Pinecone")
+    parser.add_argument("--conditions", nargs="+", default=["CKD"])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=15)
+    parser.add_argument("--noise", type=float, default=0.01)
+    parser.add_argument("--pinecone", action="store_true", help="Also query Pinecone and report top-k overlap")
+    args = parser.parse_args()
+
+    print(json.dumps(main(args.conditions, args.queries, args.top_k, args.noise, args.pinecone), indent=2))
@@ -4,12 +4,77 @@ import streamlit as st
 import requests
 import json
 
-API_AGENT_ENDPOINT = "http://fastapi_service:8000/agent"
+API_SESSIONS_ENDPOINT = "http://fastapi_service:8000/sessions"
 
 CHRONIC_CONDITIONS = [
     "Cholesterol", "CKD", "Gluten", "Hypertension", "Polycystic", "Type2", "Obesity"
 ]
 
+def iter_sse_events(response):
+    """Parse a server-sent-event stream into (event, data) pairs as lines arrive."""
+    event, data_lines = None, []
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if event:
+                yield event, json.loads("\n".join(data_lines)) if data_lines else None
+            event, data_lines = None, []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+
+def get_session_id():
+    """Server-side conversation for this browser session; the backend keeps the history."""
+    if not st.session_state.get("session_id"):
+        response = requests.post(API_SESSIONS_ENDPOINT, json={"condition": st.session_state.condition}, timeout=30)
+        response.raise_for_status()
+        st.session_state.session_id = response.json()["session_id"]
+    return st.session_state.session_id
+
+
+def stream_agent_response(payload, placeholder):
+    """
+    Send one message to the session's /messages/stream endpoint and render tokens
+    and summary sections into `placeholder` as they arrive. If the session no
+    longer exists, the message is resent once on a new session. Returns the
+    full response text, or None on failure.
+    """
+    tokens, sections = [], {}
+
+    def render():
+        ordered = [sections[idx] for idx in sorted(sections)]
+        return "\n\n".join(ordered + (["".join(tokens)] if tokens else []))
+
+    for attempt in range(2):
+        url = f"{API_SESSIONS_ENDPOINT}/{get_session_id()}/messages/stream"
+        with requests.post(url, json=payload, stream=True, timeout=600) as response:
+            if response.status_code == 404 and attempt == 0:
+                # Session is gone on the server: start a new one and resend this message once
+                st.session_state.session_id = None
+                continue
+            if response.status_code != 200:
+                return None
+
+            for event, data in iter_sse_events(response):
+                if event == "token":
+                    tokens.append(data)
+                elif event == "section":
+                    sections[data["index"]] = f"### {data['question']}\n{data['answer']}"
+                elif event == "error":
+                    tokens.append(f"\n\n{data}")
+                elif event == "done":
+                    break
+                else:
+                    continue
+                placeholder.markdown(render())
+
+            return render()
+    return None
+
+
 def show_knowledge_base():
     if "condition" not in st.session_state:
         st.session_state.condition = CHRONIC_CONDITIONS[0]
@@ -54,15 +119,14 @@ def show_knowledge_base():
             st.session_state.chat_history.append({"type": "human", "content": user_input})
             payload = {
                 "input": user_input,
-                "condition": st.session_state.condition,
-                "chat_history": st.session_state.chat_history
+                "condition": st.session_state.condition
             }
 
+            placeholder = st.empty()
             with st.spinner("🤖 Thinking..."):
                 try:
-                    response = requests.post(API_AGENT_ENDPOINT, json=payload)
-                    if response.status_code == 200:
-                        result = response.json()["response"]
+                    result = stream_agent_response(payload, placeholder)
+                    if result is not None:
                         st.session_state.chat_history.append({"type": "ai", "content": result})
                     else:
                         st.error("❌ Something went wrong.")
@@ -74,15 +138,14 @@ def show_knowledge_base():
         st.session_state.chat_history.append({"type": "human", "content": "generate report"})
         payload = {
             "input": "generate report",
-            "condition": st.session_state.condition,
-            "chat_history": st.session_state.chat_history
+            "condition": st.session_state.condition
         }
 
+        placeholder = st.empty()
         with st.spinner("📄 Summarizing..."):
             try:
-                response = requests.post(API_AGENT_ENDPOINT, json=payload)
-                if response.status_code == 200:
-                    result = response.json()["response"]
+                result = stream_agent_response(payload, placeholder)
+                if result is not None:
                     st.session_state.chat_history.append({"type": "ai", "content": result})
                     st.session_state.last_summary = result
                     st.rerun()
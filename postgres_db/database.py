@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -15,6 +16,19 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine (asyncpg) for the agent request path
+def to_async_url(url: str) -> str:
+    """Convert a psycopg2-style PostgreSQL URL into its asyncpg equivalent."""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            url = "postgresql+asyncpg://" + url[len(prefix):]
+            break
+    # asyncpg takes `ssl` instead of libpq's `sslmode`
+    return url.replace("sslmode=", "ssl=")
+
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), pool_pre_ping=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -24,4 +38,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async database dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,6 +1,6 @@
 # FILE: postgres_db/models.py
 
-from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, Date
+from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, Date, Text, JSON, UniqueConstraint, ForeignKey
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -42,3 +42,42 @@ class CalorieTracking(Base):
     user_id = Column(Integer)
     date = Column(Date)
     total_calories = Column(Float)
+
+class KnowledgeCorpusVersion(Base):
+    __tablename__ = "kb_corpus_versions"
+
+    # Bumped by the ingestion pipeline whenever new material lands in Pinecone
+    condition = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ConditionSummary(Base):
+    __tablename__ = "condition_summaries"
+    __table_args__ = (UniqueConstraint("condition", "corpus_version", name="uq_condition_summary_version"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    condition = Column(String, index=True)
+    corpus_version = Column(Integer, nullable=False)
+    summary = Column(Text)
+    sections = Column(JSON)  # [{"question": ..., "answer": ...}] in question order
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ChatSession(Base):
+    __tablename__ = "chat_sessions"
+
+    # Knowledge-assistant conversation; the client only sends this id plus the new message
+    id = Column(String(36), primary_key=True)
+    condition = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ChatSessionMessage(Base):
+    __tablename__ = "chat_session_messages"
+    __table_args__ = (UniqueConstraint("session_id", "seq", name="uq_chat_session_message_seq"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(36), ForeignKey("chat_sessions.id", ondelete="CASCADE"), index=True, nullable=False)
+    seq = Column(Integer, nullable=False)  # position in the conversation
+    type = Column(String, nullable=False)  # "human" or "ai"
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,26 @@
+# FILE: tests/test_chunk_store.py
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.knowledgbase_agent.chunk_store import ChunkStore
+
+
+def test_hydrate_falls_back_then_drops_chunks_with_no_text(tmp_path):
+    store = ChunkStore(str(tmp_path / "chunks.sqlite3"))
+    store.put_many([("CKD_a", "stored text", {"condition": "CKD", "token_count": 2})])
+    matches = [{"id": "CKD_a", "score": 0.9, "metadata": {}},
+               {"id": "CKD_b", "score": 0.8, "metadata": {}},
+               {"id": "CKD_c", "score": 0.7, "metadata": {}}]
+
+    def fallback(ids):
+        assert ids == ["CKD_b", "CKD_c"]
+        return {"CKD_b": ("pinecone text", {"condition": "CKD", "token_count": 3})}
+
+    hydrated = store.hydrate(matches, fallback)
+
+    assert [(m["id"], m["metadata"]["text"]) for m in hydrated] == [("CKD_a", "stored text"), ("CKD_b", "pinecone text")]
+    assert store.stats() == {"store_hits": 1, "fallback_hits": 1, "missing": 1}
+    assert store.get_many(["CKD_b"]) == {"CKD_b": ("pinecone text", 3)}
@@ -0,0 +1,61 @@
+# FILE: tests/test_intent_router.py
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.intent_router import IntentRouter, is_standalone, is_summary_request
+
+
+class FailingEmbeddings:
+    """The centroid path is not under test; any embedding call defers to the oracle."""
+
+    async def aembed_query(self, text):
+        raise RuntimeError("no embeddings in tests")
+
+
+def route(text, condition="CKD", has_history=False):
+    return asyncio.run(IntentRouter(FailingEmbeddings()).route(text, condition, has_history=has_history))
+
+
+@pytest.mark.parametrize("text", [
+    "generate report",
+    "Give me a complete overview of my condition",
+    "summarize CKD for me",
+    "I'd like the full report please",
+    "Tell me everything about this disease",
+    "Can you summarize my condition?",
+])
+def test_whole_condition_requests_are_summaries(text):
+    assert is_summary_request(text, "CKD")
+    assert route(text) == ("generate_summary", "rule")
+
+
+@pytest.mark.parametrize("text", [
+    "Can you summarize the side effects of metformin?",
+    "What is the overall picture for salt intake?",
+])
+def test_specific_topics_are_searched(text):
+    assert not is_summary_request(text, "CKD")
+    assert route(text) == ("vector_search", "rule")
+
+
+def test_summary_of_a_topic_is_left_to_centroid_or_oracle():
+    assert route("Summarize the dietary potassium limits") is None
+
+
+@pytest.mark.parametrize("text", ["and for stage 3?", "is it safe?", "what about sodium?", "why?"])
+def test_follow_ups_with_history_go_to_oracle(text):
+    assert not is_standalone(text, "CKD")
+    assert route(text, has_history=True) is None
+    assert route(text, has_history=False) == ("vector_search", "rule")
+
+
+@pytest.mark.parametrize("text", ["Which fruits are low in potassium?", "What are the stages of CKD?",
+                                  "Is this disease hereditary?"])
+def test_standalone_questions_with_history_take_fast_path(text):
+    assert route(text, has_history=True) == ("vector_search", "rule")
@@ -0,0 +1,29 @@
+# FILE: tests/test_local_index.py
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.knowledgbase_agent.local_index import LocalVectorIndex, current_version, write_snapshot
+
+
+def test_reader_follows_the_pointer_to_matching_matrix_and_ids(tmp_path):
+    directory = str(tmp_path)
+    index = LocalVectorIndex(directory)
+    assert index.query([1.0, 0.0], "CKD") is None
+
+    write_snapshot("CKD", ["CKD_a", "CKD_b"], [[1.0, 0.0], [0.0, 1.0]], [{}, {}], directory)
+    assert [m["id"] for m in index.query([1.0, 0.0], "CKD", top_k=1)] == ["CKD_a"]
+
+    write_snapshot("CKD", ["CKD_c", "CKD_d", "CKD_e"], [[0.0, 1.0], [1.0, 0.0], [0.6, 0.8]], [{}, {}, {}], directory)
+    matches = index.query([1.0, 0.0], "CKD", top_k=3)
+    assert [m["id"] for m in matches] == ["CKD_d", "CKD_e", "CKD_c"]
+
+    write_snapshot("CKD", ["CKD_f"], [[1.0, 0.0]], [{}], directory)
+    version = current_version("CKD", directory)
+    files = sorted(name for name in os.listdir(directory) if name.endswith(".npy"))
+    assert len(files) == 2 and f"CKD.{version}.npy" in files
+    assert np.isclose(index.query([1.0, 0.0], "CKD")[0]["score"], 1.0)
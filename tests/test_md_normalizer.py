@@ -0,0 +1,57 @@
+# FILE: tests/test_md_normalizer.py
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.knowledgbase_agent.md_normalizer import normalize_markdown
+
+
+def test_references_section_ends_at_next_heading_of_any_level():
+    markdown = "# Intro\nCKD basics.\n# References\n1. Smith 2020\n## Chapter 2\nDiet advice.\n"
+    cleaned, report = normalize_markdown(markdown)
+    assert "Smith" not in cleaned
+    assert "## Chapter 2" in cleaned and "Diet advice." in cleaned
+    assert report["low_value_sections"] == 1
+
+
+def test_references_section_ends_at_page_marker():
+    markdown = "# References\n1. Smith 2020\n<!-- page 2 -->\nPotassium limits apply.\n"
+    cleaned, _ = normalize_markdown(markdown)
+    assert "Smith" not in cleaned and "Potassium limits apply." in cleaned
+
+
+def test_bare_numbers_are_page_numbers_only_at_page_edges():
+    markdown = ("Dose per day:\n500\nmg twice daily\n12\n"
+                "<!-- page 2 -->\n13\nTable value:\n40\nend of page\n")
+    cleaned, report = normalize_markdown(markdown)
+    assert "500" in cleaned and "40" in cleaned
+    assert "12" not in cleaned.split() and "13" not in cleaned.split()
+    assert report["page_numbers"] == 2
+
+
+def test_bare_numbers_kept_without_page_markers():
+    cleaned, report = normalize_markdown("Dose:\n500\n")
+    assert "500" in cleaned and report["page_numbers"] == 0
+
+
+def test_unmarked_document_pages_inferred_from_running_header():
+    topics = ["Sodium", "Potassium", "Phosphorus", "Protein"]
+    markdown = "".join(
+        f"Kidney Care Guide 2024\n{page}\n{topic} guidance for stage {page}.\nRead food labels for {topic}.\n"
+        f"Ask your dietitian about {topic}.\nDose of {topic}:\n500\nmg of {topic} a day at most.\n"
+        for page, topic in enumerate(topics, start=1)
+    )
+    cleaned, report = normalize_markdown(markdown)
+    assert report["page_source"] == "inferred" and report["pages"] == 4
+    assert "Kidney Care Guide" not in cleaned and report["repeated_lines"] == 4
+    assert report["page_numbers"] == 4
+    assert cleaned.split().count("500") == 4
+    assert all(f"{topic} guidance" in cleaned for topic in topics)
+
+
+def test_unmarked_document_without_running_header_is_one_page():
+    cleaned, report = normalize_markdown("Intro\n3\nCKD diet basics.\n")
+    assert report["page_source"] == "none" and report["pages"] == 1
+    assert "3" in cleaned.split()
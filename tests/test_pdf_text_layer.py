@@ -0,0 +1,56 @@
+# FILE: tests/test_pdf_text_layer.py
+
+import io
+import os
+import sys
+
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.knowledgbase_agent.pdf_text_layer import extract_text_layer, text_to_markdown
+
+LINES = ["Dietary Sodium Limits", "", "Most adults with CKD should keep sodium under 2 g a day. " * 3,
+         "", "Check labels", "", "Note", "", "Potassium", "", "1.2 Protein Intake"]
+
+
+def add_text(writer: PdfWriter, page, lines):
+    font = DictionaryObject({NameObject("/Type"): NameObject("/Font"), NameObject("/Subtype"): NameObject("/Type1"),
+                             NameObject("/BaseFont"): NameObject("/Helvetica")})
+    resources = page.setdefault(NameObject("/Resources"), DictionaryObject()).get_object()
+    resources[NameObject("/Font")] = DictionaryObject({NameObject("/F1"): writer._add_object(font)})
+    ops = ["BT /F1 9 Tf 20 750 Td 12 TL"] + [f"({line}) Tj T*" for line in lines] + ["ET"]
+    stream = DecodedStreamObject()
+    stream.set_data(("\n".join(ops)).encode("latin-1"))
+    # Drawn after whatever the page already shows
+    existing = page.get("/Contents")
+    contents = [existing.indirect_reference or existing] if existing is not None else []
+    page[NameObject("/Contents")] = ArrayObject(contents + [writer._add_object(stream)])
+
+
+def fixture_pdf() -> bytes:
+    """Two text pages; the second also shows a photo."""
+    photo = io.BytesIO()
+    Image.new("RGB", (200, 150), "red").save(photo, format="PDF")
+
+    writer = PdfWriter()
+    add_text(writer, writer.add_blank_page(612, 792), LINES)
+    add_text(writer, writer.add_page(PdfReader(photo).pages[0]), LINES)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def test_text_layer_flags_pages_with_images():
+    pages = extract_text_layer(fixture_pdf())
+    assert [has_images for _, has_images in pages] == [False, True]
+    assert all("Dietary Sodium Limits" in text for text, _ in pages)
+
+
+def test_only_standalone_title_lines_become_headings():
+    markdown = text_to_markdown("\n".join(LINES) + "\n\nCheck labels for hidden salt\nin sauces and bread.\n")
+    headings = [line for line in markdown.splitlines() if line.startswith("## ")]
+    assert headings == ["## Dietary Sodium Limits", "## 1.2 Protein Intake"]
+    assert "Check labels" in markdown and "Potassium" in markdown
@@ -0,0 +1,36 @@
+# FILE: tests/test_rank_fusion.py
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pinecone import ScoredVector
+
+from agents.knowledgbase_agent.bm25_index import as_match, reciprocal_rank_fusion
+
+
+def test_fuses_pinecone_scored_vectors_with_bm25_dicts():
+    dense = [
+        ScoredVector(id="a", score=0.91, metadata={"condition": "CKD", "token_count": 120}, values=[]),
+        ScoredVector(id="b", score=0.88, metadata={"condition": "CKD"}, values=[]),
+    ]
+    lexical = [
+        {"id": "b", "score": 7.2, "metadata": {"condition": "CKD"}},
+        {"id": "c", "score": 5.1, "metadata": {"condition": "CKD"}},
+    ]
+
+    fused = reciprocal_rank_fusion([dense, lexical], top_k=3, k=60)
+
+    assert [match["id"] for match in fused] == ["b", "a", "c"]
+    assert all(isinstance(match, dict) for match in fused)
+    assert fused[0]["score"] == 1 / 62 + 1 / 61
+    assert fused[1]["metadata"] == {"condition": "CKD", "token_count": 120}
+
+
+def test_as_match_copies_metadata():
+    vector = ScoredVector(id="a", score=0.5, metadata={"text": "x"}, values=[])
+    match = as_match(vector)
+    match["metadata"]["text"] = "changed"
+    assert match == {"id": "a", "score": 0.5, "metadata": {"text": "changed"}}
+    assert vector["metadata"] == {"text": "x"}
@@ -0,0 +1,48 @@
+# FILE: tests/test_semantic_cache.py
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.knowledgbase_agent.semantic_cache import SemanticAnswerCache, same_question_frame
+
+CACHED = "Can I take 500 mg of ibuprofen with CKD?"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SemanticAnswerCache(str(tmp_path / "semantic.sqlite3"))
+    cache.store("CKD", CACHED, np.ones(8), "Ask your nephrologist first.", corpus_version=1)
+    return cache
+
+
+def near(vector, seed):
+    """A vector with cosine > 0.99 to `vector`, as embeddings of near-identical wording score."""
+    noise = np.random.default_rng(seed).normal(scale=0.01, size=len(vector))
+    return np.asarray(vector, dtype=np.float32) + noise
+
+
+@pytest.mark.parametrize("question", [
+    "Can't I take 500 mg of ibuprofen with CKD?",
+    "Can I take 50 mg of ibuprofen with CKD?",
+    "Can I take 500 g of ibuprofen with CKD?",
+    "Can I take 500 mg of naproxen with CKD?",
+])
+def test_negated_dose_and_drug_variants_are_not_served(cache, question):
+    assert cache.lookup("CKD", question, near(np.ones(8), 1), corpus_version=1) is None
+    assert cache.stats()["guard_rejections"] == 1 and cache.stats()["hits"] == 0
+
+
+def test_rephrased_question_is_served(cache):
+    question = "With CKD, can I take ibuprofen 500 mg?"
+    assert cache.lookup("CKD", question, near(np.ones(8), 2), corpus_version=1) == "Ask your nephrologist first."
+    assert cache.lookup("Hypertension", question, near(np.ones(8), 3), corpus_version=1) is None
+
+
+def test_frame_ignores_plurals_and_punctuation():
+    assert same_question_frame("What fruits are high in potassium?", "what fruit are high in potassium")
+    assert not same_question_frame("Is dialysis painful?", "Is dialysis not painful?")
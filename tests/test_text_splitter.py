@@ -0,0 +1,83 @@
+# FILE: tests/test_text_splitter.py
+
+import os
+import sys
+import string
+
+import pytest
+import tiktoken
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.knowledgbase_agent import text_splitter
+from agents.knowledgbase_agent.text_splitter import stream_chunks
+
+# Small byte-level BPE (GPT-2 split pattern, letter-pair merges): real tiktoken behaviour
+# without downloading a vocabulary. Non-ASCII characters stay one token per byte.
+PAT_STR = r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+"""
+
+
+def build_encoding():
+    ranks = {bytes([i]): i for i in range(256)}
+    for first in " " + string.ascii_lowercase:
+        for second in string.ascii_lowercase:
+            ranks[(first + second).encode()] = len(ranks)
+    return tiktoken.Encoding("test_bpe", pat_str=PAT_STR, mergeable_ranks=ranks, special_tokens={})
+
+
+ENCODING = build_encoding()
+
+
+@pytest.fixture(autouse=True)
+def test_encoding(monkeypatch):
+    monkeypatch.setattr(text_splitter, "get_encoding", lambda name=None: ENCODING)
+
+
+def tokens(text):
+    return len(ENCODING.encode(text))
+
+
+def section(heading, count):
+    return heading + "\n" + "\n".join(f"line {i} about kidney diet and sodium" for i in range(count)) + "\n"
+
+
+def test_chunks_never_exceed_max_tokens():
+    markdown = (section("## Potassium and phosphorus limits", 40)
+                + "## Sodium\n" + "salt " * 400 + "\n"
+                + "# " + "very long heading " * 30 + "\n" + "body under it\n"
+                + section("### Dialysis", 25))
+    for max_tokens in (20, 50, 100):
+        chunks = list(stream_chunks(markdown, max_tokens=max_tokens, overlap_tokens=max_tokens // 4))
+        assert chunks and max(tokens(chunk) for chunk in chunks) <= max_tokens
+
+
+def test_long_line_is_windowed_on_character_boundaries():
+    line = "né日本語é" * 80
+    chunks = list(stream_chunks("## Notes\n" + line + "\n", max_tokens=40, overlap_tokens=5))
+    assert len(chunks) > 1
+    assert all("�" not in chunk for chunk in chunks)
+    assert all(tokens(chunk) <= 40 for chunk in chunks)
+    assert "".join(chunk.removeprefix("## Notes\n") for chunk in chunks) == line
+
+
+def test_heading_is_carried_into_every_chunk_of_its_section():
+    chunks = list(stream_chunks(section("## Stage 3 CKD", 30) + section("## Stage 4 CKD", 30),
+                                max_tokens=60, overlap_tokens=10))
+    stage3 = [chunk for chunk in chunks if chunk.startswith("## Stage 3 CKD")]
+    stage4 = [chunk for chunk in chunks if chunk.startswith("## Stage 4 CKD")]
+    assert len(stage3) > 1 and len(stage4) > 1 and len(stage3) + len(stage4) == len(chunks)
+    assert all("Stage 3" not in chunk for chunk in stage4)
+
+
+def test_consecutive_chunks_share_overlap_lines():
+    chunks = list(stream_chunks(section("## Diet", 30), max_tokens=100, overlap_tokens=25))
+    for previous, following in zip(chunks, chunks[1:]):
+        last_line = previous.splitlines()[-1]
+        body = following.splitlines()[1:]
+        assert last_line in body[:3]
+        assert tokens("\n".join(body[:body.index(last_line) + 1])) <= 25
+
+
+def test_overlap_must_be_smaller_than_max_tokens():
+    with pytest.raises(ValueError):
+        list(stream_chunks("text", max_tokens=10, overlap_tokens=10))